@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.fixture
+def job_db(tmp_path):
+    return tmp_path / "jobs.db"
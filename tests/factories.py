@@ -0,0 +1,30 @@
+from wso_register.batch import BatchJob
+from wso_register.wso_data import GroupData, SubmitterData
+
+
+def make_group(wso_id: int | None = 1, **changes) -> GroupData:
+    values = dict(
+        name=f"Group {wso_id}",
+        listing_page="https://example.org/groups/",
+        day_of_week=2,
+        start_hour=19,
+        start_minute=30,
+        duration=60,
+        wso_id=wso_id,
+        physical_location="Community Hall",
+        address_street_1="1 Main St",
+        address_city="Berkeley",
+        address_state="CA",
+        address_zip="94704",
+        address_country="US",
+        language="English",
+    )
+    values.update(changes)
+    return GroupData(**values)
+
+
+def make_job(wso_id: int | None = 1, **changes) -> BatchJob:
+    return BatchJob(
+        submitter=SubmitterData(name="Pat Example", phone="510-555-0100"),
+        group=make_group(wso_id, **changes),
+    )
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from wso_register import async_api, setup
+
+
+class SlowQuitDriver:
+    def __init__(self):
+        self.gone = threading.Event()
+
+    def quit(self):
+        time.sleep(0.3)
+        self.gone.set()
+
+
+class FakeSessions:
+    def __init__(self, driver: SlowQuitDriver):
+        self.driver = driver
+
+    @contextmanager
+    def session(self, start_url=None):
+        yield self.driver
+
+    def close(self):
+        pass
+
+
+def _fill_in(sessions):
+    with sessions.session() as driver:
+        # a WebDriver command, stuck until the browser goes away
+        driver.gone.wait(5)
+
+
+def test_a_cancelled_call_quits_its_browser_off_the_loop(monkeypatch):
+    monkeypatch.setattr(setup, "start_watchdog", lambda: None)
+
+    async def main() -> float:
+        driver = SlowQuitDriver()
+        async with async_api.AsyncSubmitter(max_browsers=1) as submitter:
+            submitter._sessions = FakeSessions(driver)
+            call = asyncio.create_task(submitter._run(_fill_in, None, None))
+            await asyncio.sleep(0.05)
+            call.cancel()
+            # the loop keeps running while the browser quits
+            started = time.monotonic()
+            await asyncio.sleep(0.01)
+            stalled = time.monotonic() - started
+            with pytest.raises(asyncio.CancelledError):
+                await call
+            assert driver.gone.is_set()
+        return stalled
+
+    assert asyncio.run(main()) < 0.2
@@ -0,0 +1,34 @@
+import os
+
+from wso_register import batch
+from wso_register.batch import BatchJob, BatchResult
+from wso_register.scheduler import Backoff, SubmissionScheduler, TokenBucket
+
+from .factories import make_job
+
+CRASHED = "crashed"
+
+
+def _crash_once(job: BatchJob) -> BatchResult:
+    # the first job to run takes its worker process down with it
+    try:
+        os.close(os.open(CRASHED, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return BatchResult(
+            wso_id=job.group.wso_id, name=job.group.name, form=job.form, ok=True
+        )
+    os._exit(1)
+
+
+def test_jobs_lost_with_a_broken_pool_are_retried_in_a_new_one(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch, "run_job", _crash_once)
+    monkeypatch.setattr(batch, "_start_worker", lambda profile: None)
+    scheduler = SubmissionScheduler(
+        bucket=TokenBucket(rate=100.0, burst=4), backoff=Backoff(base=0.01)
+    )
+    jobs = [make_job(wso_id) for wso_id in (1, 2, 3)]
+    results = list(batch.run_batch(jobs, 2, scheduler=scheduler))
+    assert sorted(result.wso_id for result in results) == [1, 2, 3]
+    assert all(result.ok for result in results), results
+    assert max(job.attempt for job in jobs) == 1
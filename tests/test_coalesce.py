@@ -0,0 +1,83 @@
+import pytest
+
+from wso_register.batch import PHYSICAL_FORM
+from wso_register.coalesce import Coalescer, coalesce, merge_jobs
+from wso_register.form_map import FORM_PLANS
+from wso_register.snapshots import SnapshotStore
+
+from .factories import make_job
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_changes_in_a_window_are_merged_into_the_latest():
+    clock = Clock()
+    coalescer = Coalescer(window=10.0, clock=clock)
+    coalescer.put(make_job(1, address_city="Oakland"))
+    clock.now = 5.0
+    coalescer.put(make_job(1, address_city="Albany"))
+    coalescer.put(make_job(2))
+    assert coalescer.ready() == []
+    assert coalescer.next_due() == 10.0
+    clock.now = 10.0
+    (job,) = coalescer.ready()
+    assert (job.group.wso_id, job.group.address_city) == (1, "Albany")
+    clock.now = 15.0
+    assert [job.group.wso_id for job in coalescer.ready()] == [2]
+    assert (coalescer.received, coalescer.merged, coalescer.released) == (3, 1, 2)
+
+
+def test_a_change_back_to_what_was_released_is_dropped():
+    clock = Clock()
+    coalescer = Coalescer(window=1.0, clock=clock)
+    coalescer.put(make_job(1))
+    assert len(coalescer.ready(flush=True)) == 1
+    coalescer.put(make_job(1))
+    assert coalescer.ready(flush=True) == []
+    coalescer.put(make_job(1, address_city="Oakland"))
+    assert len(coalescer.ready(flush=True)) == 1
+    assert coalescer.dropped == 1
+
+
+def test_a_change_matching_the_snapshot_is_dropped(tmp_path):
+    snapshots = SnapshotStore(tmp_path / "snapshots.db")
+    snapshots.record(FORM_PLANS[PHYSICAL_FORM], make_job(1).group)
+    coalescer = Coalescer(window=1.0, snapshots=snapshots)
+    coalescer.put(make_job(1))
+    coalescer.put(make_job(2))
+    assert [job.group.wso_id for job in coalescer.ready(flush=True)] == [2]
+
+
+def test_merged_sections_accumulate():
+    older = make_job(1)
+    older.sections = frozenset({"details"})
+    newer = make_job(1, address_city="Oakland")
+    newer.sections = frozenset({"cma"})
+    merged = merge_jobs(older, newer)
+    assert merged.sections == {"details", "cma"}
+    assert merged.group.address_city == "Oakland"
+    newer.sections = None
+    assert merge_jobs(older, newer).sections is None
+
+
+def test_a_closed_coalescer_takes_no_more_changes():
+    coalescer = Coalescer()
+    coalescer.close()
+    with pytest.raises(ValueError):
+        coalescer.put(make_job(1))
+    assert list(coalescer) == []
+
+
+def test_coalescing_a_stream_releases_each_group_once():
+    jobs = [make_job(1), make_job(2), make_job(1, address_city="Oakland")]
+    released = list(coalesce(jobs, window=60.0))
+    assert [(job.group.wso_id, job.group.address_city) for job in released] == [
+        (1, "Oakland"),
+        (2, "Berkeley"),
+    ]
@@ -0,0 +1,52 @@
+import pytest
+
+from wso_register.fingerprint import FingerprintCache, plan_signature
+from wso_register.form_map import FORM_PLANS
+from wso_register.http_submit import parse_form
+from wso_register.stand_in import STAND_IN_FORMS, form_html
+
+URL = "http://stand-in/physical"
+
+
+def _signature(form: str = "physical") -> dict:
+    plan = FORM_PLANS[form]
+    return parse_form(form_html(form), f"http://stand-in/{form}", plan).signature()
+
+
+@pytest.mark.parametrize("form", STAND_IN_FORMS)
+def test_the_stand_in_has_every_choice_the_plan_needs(form):
+    signature = _signature(form)
+    needed = plan_signature(FORM_PLANS[form])
+    for key in ("radio", "checkbox"):
+        assert set(needed[key]) <= set(signature[key]), key
+
+
+def test_unrelated_ids_and_choices_may_come_and_go(tmp_path):
+    cache = FingerprintCache(tmp_path / "fingerprints.json")
+    signature = _signature()
+    cache.check(URL, FORM_PLANS["physical"], signature)
+    changed = {
+        "ids": [*signature["ids"], "input_999"],
+        "radio": [*signature["radio"], "Maybe"],
+        "checkbox": signature["checkbox"],
+    }
+    FingerprintCache(cache.path).check(URL, FORM_PLANS["physical"], changed)
+    assert "input_999" not in cache.known()[URL]["signature"]["ids"]
+
+
+def test_a_missing_choice_fails_on_the_first_run(tmp_path):
+    cache = FingerprintCache(tmp_path / "fingerprints.json")
+    signature = _signature()
+    signature["radio"] = [value for value in signature["radio"] if value != "Change"]
+    with pytest.raises(ReferenceError, match="- radio: Change"):
+        cache.check(URL, FORM_PLANS["physical"], signature)
+    assert not cache.verified(URL) and not cache.known()
+
+
+def test_forget_drops_a_signature(tmp_path):
+    cache = FingerprintCache(tmp_path / "fingerprints.json")
+    cache.check(URL, FORM_PLANS["physical"], _signature())
+    assert cache.verified(URL)
+    assert cache.forget("http://elsewhere") == 0
+    assert cache.forget(URL) == 1
+    assert not cache.verified(URL) and not cache.known()
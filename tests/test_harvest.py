@@ -0,0 +1,135 @@
+import dataclasses
+import functools
+import os
+import threading
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from wso_register.harvest import HttpCache, harvest_groups, listing_meeting
+from wso_register.stand_in import listing_html, write_listing_pages
+
+from .factories import make_group
+
+
+class _ETagHandler(SimpleHTTPRequestHandler):
+    # validates with an ETag alone, as some listing sites do
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return super().send_head()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+        self._etag = etag
+        return super().send_head()
+
+    def end_headers(self):
+        if etag := getattr(self, "_etag", None):
+            self.send_header("ETag", etag)
+        super().end_headers()
+
+    def send_header(self, keyword, value):
+        # no Last-Modified to fall back on
+        if keyword != "Last-Modified":
+            super().send_header(keyword, value)
+
+    def log_message(self, *args):
+        pass
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def _static_server(directory, handler=_QuietHandler):
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(handler, directory=str(directory))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _listed_groups(site, root: str, groups: list) -> list:
+    paths = write_listing_pages(groups, site)
+    return [
+        dataclasses.replace(group, listing_page=root + path)
+        for group, path in zip(groups, paths)
+    ]
+
+
+def test_listing_pages_are_parsed_from_their_event():
+    group = make_group(7, public_email="group@example.org", start_minute=0)
+    meeting = listing_meeting(listing_html(group), "https://example.org/g/")
+    assert meeting["name"] == group.name
+    assert (meeting["day"], meeting["time"], meeting["end_time"]) == (
+        2,
+        "19:00",
+        "20:00",
+    )
+    assert (meeting["address"], meeting["city"]) == ("1 Main St", "Berkeley")
+    assert meeting["email"] == "group@example.org"
+
+
+def test_an_event_dated_in_a_graph_is_found():
+    html = (
+        "<script type='application/ld+json'>"
+        '{"@graph": [{"@type": "WebPage"}, {"@type": ["Thing", "SocialEvent"],'
+        ' "name": "Sunday Serenity", "startDate": "2026-01-04T10:00:00",'
+        ' "endDate": "2026-01-04T11:30:00"}]}</script>'
+    )
+    meeting = listing_meeting(html, "https://example.org/g/")
+    # Sunday is the WSO's day 0
+    assert (meeting["day"], meeting["time"], meeting["end_time"]) == (
+        0,
+        "10:00",
+        "11:30",
+    )
+
+
+@pytest.mark.parametrize("handler", [_QuietHandler, _ETagHandler])
+def test_unchanged_pages_are_not_fetched_again(tmp_path, handler):
+    site, cache = tmp_path / "site", HttpCache(tmp_path / "cache")
+    site.mkdir()
+    stale = [make_group(wso_id, name="Old Name") for wso_id in (1, 2)]
+    with _static_server(site, handler) as root:
+        groups = _listed_groups(site, root, [make_group(1), make_group(2)])
+        stale = [
+            dataclasses.replace(old, listing_page=new.listing_page)
+            for old, new in zip(stale, groups)
+        ]
+        harvests, harvester = harvest_groups(stale, cache)
+        assert [harvest.group.name for harvest in harvests] == ["Group 1", "Group 2"]
+        assert all(harvest.fetched for harvest in harvests)
+        assert (harvester.fetched, harvester.not_modified) == (2, 0)
+
+        harvests, harvester = harvest_groups(stale, cache)
+        assert [harvest.group.name for harvest in harvests] == ["Group 1", "Group 2"]
+        assert not any(harvest.fetched for harvest in harvests)
+        assert (harvester.fetched, harvester.not_modified) == (0, 2)
+
+        # a page that changes is fetched again
+        (moved,) = write_listing_pages([make_group(2, address_city="Albany")], site)
+        page = site / moved
+        os.utime(page, ns=(page.stat().st_mtime_ns + 10**9,) * 2)
+        harvests, harvester = harvest_groups(stale, cache)
+        assert [harvest.group.address_city for harvest in harvests] == [
+            "Berkeley",
+            "Albany",
+        ]
+        assert (harvester.fetched, harvester.not_modified) == (1, 1)
@@ -0,0 +1,83 @@
+import asyncio
+import gzip
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from wso_register.http_pool import ConnectionPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, self.headers.get("Cookie")))
+        path = urlsplit(self.path).path
+        if path == "/login":
+            self._respond(200, b"hello", ("Set-Cookie", "a=1"), ("Set-Cookie", "b=2"))
+        elif path == "/thanks":
+            self._respond(
+                200, gzip.compress(b"thank you"), ("Content-Encoding", "gzip")
+            )
+        else:
+            self._respond(200, b"")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        self.server.requests.append(("POST", self.path, body))
+        self._respond(303, b"", ("Location", "/thanks"))
+
+    def _respond(self, status: int, body: bytes, *headers):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def _server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_cookies_redirects_and_gzip():
+    async def run(root: str):
+        async with ConnectionPool(proxy="") as pool:
+            await pool.get(f"{root}/login")
+            response = await pool.post_form(f"{root}/form", [("name", "Pat & Co")])
+            return response
+
+    with _server() as (server, root):
+        response = asyncio.run(run(root))
+    assert (response.status, response.body) == (200, b"thank you")
+    assert response.url == f"{root}/thanks"
+    assert server.requests[1] == ("POST", "/form", "name=Pat+%26+Co")
+    # both cookies go back, and the form's result is fetched with a GET
+    method, path, cookies = server.requests[2]
+    assert (method, path) == ("GET", "/thanks")
+    assert sorted(cookies.split("; ")) == ["a=1", "b=2"]
+
+
+def test_requests_go_through_a_proxy():
+    async def run(proxy: str):
+        async with ConnectionPool(proxy=proxy) as pool:
+            return await pool.get("http://listings.example/meeting-1/")
+
+    with _server() as (server, root):
+        response = asyncio.run(run(root))
+    assert response.status == 200
+    assert server.requests == [("GET", "http://listings.example/meeting-1/", None)]
@@ -0,0 +1,158 @@
+import time
+
+from wso_register import jobs
+from wso_register.batch import BatchJob, BatchResult
+from wso_register.jobs import FAILED, IN_FLIGHT, PENDING, SUBMITTED, JobStore
+
+from .factories import make_job
+
+
+def _result(job: BatchJob, ok: bool = True) -> BatchResult:
+    return BatchResult(
+        wso_id=job.group.wso_id,
+        name=job.group.name,
+        form=job.form,
+        ok=ok,
+        job_id=job.job_id,
+    )
+
+
+def _submit_all(store: JobStore):
+    _submit_all_claimed(store, list(store.claim_pending()))
+
+
+def _submit_all_claimed(store: JobStore, claimed: list[BatchJob]):
+    for job in claimed:
+        store.finish(_result(job))
+
+
+def _lease_one(store: JobStore, owner: str, **options) -> BatchJob:
+    leased = store.lease_pending(owner, **options)
+    job = next(leased)
+    leased.close()
+    return job
+
+
+def test_enqueue_skips_a_repeat_of_the_pending_job(job_db):
+    store = JobStore(job_db)
+    assert store.enqueue([make_job(1), make_job(2)]) == 2
+    assert store.enqueue([make_job(1), make_job(2)]) == 0
+    assert store.counts()[PENDING] == 2
+
+
+def test_enqueue_skips_a_repeat_of_the_submitted_job(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1)])
+    _submit_all(store)
+    assert store.enqueue([make_job(1)]) == 0
+
+
+def test_enqueue_requeues_a_group_that_changes_back(job_db):
+    store = JobStore(job_db)
+    assert store.enqueue([make_job(1, address_city="Oakland")]) == 1
+    _submit_all(store)
+    assert store.enqueue([make_job(1, address_city="Berkeley")]) == 1
+    _submit_all(store)
+    assert store.enqueue([make_job(1, address_city="Oakland")]) == 1
+    assert store.counts()[PENDING] == 1
+    # while still pending, it is queued only once
+    assert store.enqueue([make_job(1, address_city="Oakland")]) == 0
+
+
+def test_enqueue_requeues_a_change_back_behind_a_pending_change(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1, address_city="Oakland")])
+    store.enqueue([make_job(1, address_city="Berkeley")])
+    assert store.enqueue([make_job(1, address_city="Oakland")]) == 1
+    cities = []
+    while claimed := list(store.claim_pending()):
+        cities += [job.group.address_city for job in claimed]
+        _submit_all_claimed(store, claimed)
+    assert cities == ["Oakland", "Berkeley", "Oakland"]
+
+
+def test_claim_holds_back_a_second_job_for_the_same_group(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1, address_city="Oakland"), make_job(1), make_job(2)])
+    claimed = list(store.claim_pending())
+    assert [job.group.wso_id for job in claimed] == [1, 2]
+    assert list(store.claim_pending()) == []
+    _submit_all_claimed(store, claimed)
+    (job,) = store.claim_pending()
+    assert (job.group.wso_id, job.group.address_city) == (1, "Berkeley")
+
+
+def test_stored_jobs_for_one_group_run_in_rounds(job_db, monkeypatch):
+    rounds = []
+
+    def run_batch(batch, *args):
+        batch = list(batch)
+        rounds.append([(job.group.wso_id, job.group.address_city) for job in batch])
+        return [_result(job) for job in batch]
+
+    monkeypatch.setattr(jobs, "run_batch", run_batch)
+    store = JobStore(job_db)
+    store.enqueue([make_job(1, address_city="Oakland"), make_job(1), make_job(2)])
+    assert len(list(jobs.run_stored_jobs(store))) == 3
+    assert rounds == [[(1, "Oakland"), (2, "Berkeley")], [(1, "Berkeley")]]
+    assert store.counts()[SUBMITTED] == 3
+
+
+def test_resume_returns_unleased_in_flight_jobs_to_pending(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1), make_job(2)])
+    claimed = store.claim_pending()
+    next(claimed)
+    claimed.close()
+    assert store.counts()[IN_FLIGHT] == 1
+    assert store.resume() == 1
+    assert store.counts()[PENDING] == 2
+
+
+def test_resume_leaves_leased_jobs_alone(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1)])
+    _lease_one(store, "worker-1")
+    assert store.resume() == 0
+    assert store.counts()[IN_FLIGHT] == 1
+
+
+def test_resume_retries_failed_jobs_only_when_asked(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1)])
+    (job,) = store.claim_pending()
+    store.finish(_result(job, ok=False))
+    assert store.resume() == 0
+    assert store.resume(retry_failed=True) == 1
+    assert store.counts()[FAILED] == 0
+
+
+def test_lease_holds_back_a_second_job_for_the_same_group(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1, address_city="Oakland"), make_job(1), make_job(2)])
+    leased = [job.group.wso_id for job in store.lease_pending("worker-1")]
+    assert leased == [1, 2]
+    assert store.counts()[PENDING] == 1
+
+
+def test_an_expired_lease_goes_to_the_next_worker(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1)])
+    job = _lease_one(store, "worker-1", duration=0.01)
+    time.sleep(0.02)
+    again = _lease_one(store, "worker-2")
+    assert again.job_id == job.job_id
+    # the first worker's late result no longer counts
+    assert not store.finish(_result(job), owner="worker-1")
+    assert store.finish(_result(again), owner="worker-2")
+    assert store.counts()[SUBMITTED] == 1
+
+
+def test_a_job_whose_leases_keep_expiring_fails(job_db):
+    store = JobStore(job_db)
+    store.enqueue([make_job(1)])
+    for owner in ("worker-1", "worker-2"):
+        _lease_one(store, owner, duration=0.01, max_deliveries=2)
+        time.sleep(0.02)
+    assert list(store.lease_pending("worker-3", max_deliveries=2)) == []
+    assert store.counts()[FAILED] == 1
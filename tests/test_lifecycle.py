@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from wso_register import lifecycle
+from wso_register.lifecycle import (
+    OWNER_VARIABLE,
+    browser_environment,
+    orphaned_browser_processes,
+)
+
+pytestmark = pytest.mark.skipif(not lifecycle.PROC.is_dir(), reason="needs /proc")
+
+
+def _sleeper(environment: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(30)"], env=environment
+    )
+
+
+def test_only_browsers_whose_starter_is_gone_are_orphans():
+    gone = subprocess.Popen([sys.executable, "-c", "pass"])
+    gone.wait()
+    ours = _sleeper(browser_environment())
+    # a process given a pid that its starter once had is not that starter
+    theirs = _sleeper({**os.environ, OWNER_VARIABLE: f"{os.getpid()}:0"})
+    dead = _sleeper({**os.environ, OWNER_VARIABLE: f"{gone.pid}:0"})
+    unmarked = _sleeper(dict(os.environ))
+    try:
+        orphans = orphaned_browser_processes()
+        assert theirs.pid in orphans and dead.pid in orphans
+        assert ours.pid not in orphans and unmarked.pid not in orphans
+        assert os.getpid() not in orphans
+    finally:
+        for process in (ours, theirs, dead, unmarked):
+            process.kill()
+            process.wait()
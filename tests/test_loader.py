@@ -0,0 +1,109 @@
+import io
+import json
+
+from wso_register.loader import RosterLoader, iter_json_array
+from wso_register.wso_data import SubmitterData
+
+SUBMITTER = SubmitterData(name="Pat Example", phone="510-555-0100")
+GOOD = dict(
+    wso_id=101,
+    name="Monday Night",
+    listing_page="x",
+    day_of_week=1,
+    start_hour=19,
+    start_minute=30,
+    duration=60,
+)
+HEADER = "wso_id,name,listing_page,day_of_week,start_hour,start_minute,duration"
+
+
+def _load(tmp_path, name: str, text: str) -> tuple[list, RosterLoader]:
+    path = tmp_path / name
+    path.write_text(text)
+    loader = RosterLoader(path, submitter=SUBMITTER)
+    return list(loader), loader
+
+
+def _reasons(loader: RosterLoader) -> dict[int, str]:
+    return {rejection.record: rejection.reason for rejection in loader.rejected}
+
+
+def test_csv_rows_are_loaded_and_bad_ones_rejected(tmp_path):
+    rows = [
+        HEADER,
+        "101,Monday Night,https://example.org/,1,19,30,60",
+        "102,Too Late,https://example.org/,1,25,0,60",
+        "103,No Length,https://example.org/,1,19,0,0",
+        "104,Someday,https://example.org/,7,19,0,60",
+        "105,Extra,https://example.org/,1,19,0,60,surprise",
+        ",No Id,https://example.org/,1,19,0,60",
+    ]
+    jobs, loader = _load(tmp_path, "roster.csv", "\n".join(rows) + "\n")
+    assert [job.group.wso_id for job in jobs] == [101]
+    reasons = _reasons(loader)
+    assert "start_hour out of range" in reasons[3]
+    assert "duration must be positive" in reasons[4]
+    assert "day_of_week out of range" in reasons[5]
+    assert reasons[6] == "1 more values than columns"
+    assert "no WSO id" in reasons[7]
+    assert loader.count == 6
+
+
+def test_a_short_csv_row_is_rejected_not_fatal(tmp_path):
+    rows = [HEADER, "101,Short Row,https://example.org/,1", "102,Fine,x,1,19,0,60"]
+    jobs, loader = _load(tmp_path, "roster.csv", "\n".join(rows) + "\n")
+    assert [job.group.wso_id for job in jobs] == [102]
+    reason = _reasons(loader)[2]
+    assert reason == "missing fields: start_hour, start_minute, duration"
+
+
+def test_a_short_csv_row_may_leave_out_optional_columns(tmp_path):
+    rows = [HEADER + ",address_city", "101,Short Row,x,1,19,0,60"]
+    jobs, loader = _load(tmp_path, "roster.csv", "\n".join(rows) + "\n")
+    assert [job.group.address_city for job in jobs] == [None]
+    assert not loader.rejected
+
+
+def test_json_lines_rejections(tmp_path):
+    good = GOOD
+    lines = [
+        json.dumps(good),
+        "{not json",
+        json.dumps([1, 2]),
+        json.dumps({**good, "colour": "blue"}),
+        json.dumps({**good, "duration": "an hour"}),
+        json.dumps({**good, "form": "carrier pigeon"}),
+        json.dumps({**good, "form": "virtual"}),
+    ]
+    jobs, loader = _load(tmp_path, "roster.jsonl", "\n".join(lines) + "\n")
+    assert len(jobs) == 1
+    reasons = _reasons(loader)
+    assert reasons[2].startswith("invalid JSON")
+    assert reasons[3] == "record is not an object"
+    assert reasons[4] == "unknown fields: colour"
+    assert reasons[5] == "duration must be a number: 'an hour'"
+    assert reasons[6] == "unknown form: carrier pigeon"
+    assert reasons[7] == "virtual form needs an online platform"
+
+
+def test_a_malformed_json_array_record_is_rejected_alone(tmp_path):
+    records = [json.dumps({**GOOD, "wso_id": wso_id}) for wso_id in (101, 103)]
+    text = f'[{records[0]}, {{"wso_id" 102, "name": "a, ]"}},\n{records[1]}]'
+    jobs, loader = _load(tmp_path, "roster.json", text)
+    assert [job.group.wso_id for job in jobs] == [101, 103]
+    assert list(_reasons(loader)) == [2]
+    assert _reasons(loader)[2].startswith("invalid JSON")
+    # wherever the chunks happen to end
+    for chunk_size in (1, 2, 7, 40):
+        first, bad, last = iter_json_array(io.StringIO(text), chunk_size)
+        assert (first["wso_id"], last["wso_id"]) == (101, 103)
+        assert bad.startswith("invalid JSON")
+
+
+def test_a_record_without_a_submitter_is_rejected(tmp_path):
+    rows = [HEADER, "101,Monday Night,x,1,19,30,60"]
+    path = tmp_path / "roster.csv"
+    path.write_text("\n".join(rows) + "\n")
+    loader = RosterLoader(path)
+    assert list(loader) == []
+    assert _reasons(loader) == {2: "no submitter"}
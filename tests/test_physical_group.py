@@ -0,0 +1,56 @@
+import pytest
+from selenium.common import InvalidSessionIdException, WebDriverException
+
+from wso_register import physical_group
+from wso_register.physical_group import Wait, await_outcome
+from wso_register.scheduler import AdaptiveTimeouts
+
+OUTCOME = {"confirmed": True, "text": "Thank you!"}
+
+
+class FakeDriver:
+    def __init__(self, *answers, alive: bool = True):
+        self.answers = list(answers)
+        self.alive = alive
+        self.calls = 0
+
+    def execute_async_script(self, *args):
+        self.calls += 1
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    @property
+    def window_handles(self):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+        return ["tab"]
+
+
+@pytest.fixture
+def wait(monkeypatch):
+    monkeypatch.setattr(
+        physical_group, "OUTCOME_TIMEOUTS", AdaptiveTimeouts(default=5.0)
+    )
+    monkeypatch.setattr(physical_group, "OUTCOME_RETRY_SECONDS", 0.0)
+    return Wait("submit", ("id", "input_2"), outcome=True)
+
+
+def test_await_outcome_looks_again_once_the_page_is_replaced(wait):
+    driver = FakeDriver(WebDriverException("document unloaded"), OUTCOME)
+    assert await_outcome(driver, wait) == OUTCOME
+    assert driver.calls == 2
+
+
+def test_await_outcome_gives_up_on_a_lost_session(wait):
+    driver = FakeDriver(InvalidSessionIdException("invalid session id"), OUTCOME)
+    with pytest.raises(InvalidSessionIdException):
+        await_outcome(driver, wait)
+
+
+def test_await_outcome_gives_up_on_a_crashed_browser(wait):
+    driver = FakeDriver(WebDriverException("disconnected"), OUTCOME, alive=False)
+    with pytest.raises(WebDriverException):
+        await_outcome(driver, wait)
+    assert driver.calls == 1
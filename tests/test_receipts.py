@@ -0,0 +1,39 @@
+from wso_register.batch import PHYSICAL_FORM
+from wso_register.receipts import ReceiptStore, make_receipt
+
+from .factories import make_job
+
+
+def _confirm(store: ReceiptStore, job, confirmed_at: float):
+    receipt = make_receipt(
+        job.form, job.submitter, job.group, job.sections, "Thank you!", 1.0
+    )
+    receipt.confirmed_at = confirmed_at
+    store.record(receipt)
+
+
+def _confirmed(store: ReceiptStore, job):
+    return store.confirmed(job.form, job.submitter, job.group, job.sections)
+
+
+def test_a_confirmed_change_is_recognized(tmp_path):
+    store = ReceiptStore(tmp_path / "receipts.db")
+    job = make_job(1)
+    assert _confirmed(store, job) is None
+    _confirm(store, job, 100.0)
+    assert _confirmed(store, job).form == PHYSICAL_FORM
+    assert _confirmed(store, make_job(1, address_city="Oakland")) is None
+
+
+def test_only_the_latest_receipt_counts(tmp_path):
+    store = ReceiptStore(tmp_path / "receipts.db")
+    oakland = make_job(1, address_city="Oakland")
+    berkeley = make_job(1, address_city="Berkeley")
+    _confirm(store, oakland, 100.0)
+    _confirm(store, berkeley, 200.0)
+    # going back to Oakland is a change that hasn't been submitted yet
+    assert _confirmed(store, oakland) is None
+    assert _confirmed(store, berkeley) is not None
+    _confirm(store, oakland, 300.0)
+    assert _confirmed(store, oakland) is not None
+    assert _confirmed(store, berkeley) is None
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from wso_register.dry_run import _dry_run_chunk, dry_run_job
+from wso_register.form_map import FORM_PLANS
+from wso_register.receipts import submission_digest
+from wso_register.roster import GroupRoster, RosterRow, job_rows, roster_rows
+from wso_register.snapshots import section_values
+
+from .factories import make_group, make_job
+
+CONTACT = dict(
+    street_address_1="2 Side St",
+    city="Albany",
+    state="CA",
+    zip="94706",
+    phone="(510) 555-0123",
+    email="contact@example.org",
+)
+GROUPS = [
+    make_group(1),
+    make_group(
+        2,
+        language="Spanish",
+        participant_types={"women", "aca"},
+        options={"asl", "ada", "unknown"},
+        members_only=True,
+        address_country="Canada",
+        cma_first_name="Alex",
+        cma_last_name="Doe",
+        **{f"cma_{name}": value for name, value in CONTACT.items()},
+        gr_first_name="Sam",
+        gr_last_name="Roe",
+        **{f"gr_{name}": value for name, value in CONTACT.items()},
+    ),
+    make_group(
+        3,
+        physical_location=None,
+        online_platform="Zoom",
+        online_url="https://zoom.us/j/1",
+        language="Klingon",
+        day_of_week=0,
+        start_hour=7,
+        start_minute=5,
+    ),
+]
+
+
+@pytest.mark.parametrize("form", sorted(FORM_PLANS))
+def test_rows_render_just_as_their_groups_do(form):
+    rows = list(GroupRoster(GROUPS))
+    submitter = make_job().submitter
+    for group, row in zip(GROUPS, rows):
+        assert isinstance(row, RosterRow)
+        plan = FORM_PLANS[form]
+        assert section_values(plan, row) == section_values(plan, group)
+        assert submission_digest(form, submitter, row) == submission_digest(
+            form, submitter, group
+        )
+        assert row.group() == group
+
+
+def test_dry_run_chunks_match_job_by_job():
+    jobs = [make_job(group.wso_id) for group in GROUPS]
+    for job, group in zip(jobs, GROUPS):
+        job.group = group
+    lines = _dry_run_chunk(jobs, "01-02-2026")
+    assert [json.loads(line) for line in lines] == [
+        dry_run_job(job, "01-02-2026") for job in jobs
+    ]
+
+
+def test_a_group_that_cant_be_normalized_fails_on_its_own():
+    jobs = [make_job(1), make_job(2, day_of_week="Tuesday")]
+    assert [type(group) for _, group in job_rows(jobs)] == [type(jobs[0].group)] * 2
+    results = [json.loads(line) for line in _dry_run_chunk(jobs, "01-02-2026")]
+    assert "error" not in results[0]
+    assert "error" in results[1]
+
+
+def test_roster_rows_keep_the_order_of_their_groups():
+    rows = roster_rows(GROUPS)
+    assert [row.wso_id for row in rows] == [1, 2, 3]
+    assert rows[1].has_cma() and rows[1].has_gr()
+    assert not rows[0].has_cma()
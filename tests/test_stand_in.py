@@ -0,0 +1,96 @@
+import pytest
+
+from wso_register import http_submit
+from wso_register.fingerprint import FingerprintCache, required_ids
+from wso_register.form_map import FORM_PLANS, PlanField, form_context
+from wso_register.http_submit import HttpExecutor, form_fields, parse_form
+from wso_register.stand_in import STAND_IN_FORMS, StandInServer, form_html
+
+from .factories import make_job
+
+TODAY = "01-02-2026"
+
+
+def _schema(form: str):
+    return parse_form(form_html(form), f"http://stand-in/{form}", FORM_PLANS[form])
+
+
+@pytest.mark.parametrize("form", STAND_IN_FORMS)
+def test_the_stand_in_has_every_id_the_plan_needs(form):
+    assert required_ids(FORM_PLANS[form]) <= set(_schema(form).ids)
+
+
+def test_a_plan_with_a_wrong_id_fails_against_the_stand_in():
+    plan = FORM_PLANS["physical"]
+    header = plan.pages[0]
+    renamed = header._replace(
+        fields=(PlanField(kind="text", element_id="input_999", value=None, when=None),)
+        + header.fields[1:]
+    )
+    plan = plan._replace(pages=(renamed, *plan.pages[1:]))
+    context = form_context(make_job().group, make_job().submitter, TODAY)
+    with pytest.raises(ReferenceError, match="input_999"):
+        form_fields(_schema("physical"), plan, context)
+
+
+def test_physical_form_fields_map_onto_the_stand_in():
+    job = make_job(7, options={"asl"}, participant_types={"women"})
+    context = form_context(job.group, job.submitter, TODAY)
+    fields = form_fields(_schema("physical"), FORM_PLANS["physical"], context)
+    posted = dict(fields)
+    assert posted["input_156"] == job.group.name
+    assert posted["input_13"] == "7"
+    assert posted["status_radio"] == "Change"
+    assert "lite_mode_96" not in posted
+    date = (
+        posted["q96_date[month]"],
+        posted["q96_date[day]"],
+        posted["q96_date[year]"],
+    )
+    assert date == ("01", "02", "2026")
+    assert posted["name_radio"] == "English"
+    assert posted["input_80"] == "Berkeley"
+    assert posted["input_30"] == "Tuesday"
+    assert (posted["input_31"], posted["input_32"], posted["input_33"]) == (
+        "7",
+        "30",
+        "PM",
+    )
+    assert ("details_checkbox", "Sign Language") in fields
+    assert posted["participants_checkbox"] == "Women"
+    assert (posted["input_45_area"], posted["input_45_phone"]) == ("510", "5550100")
+    # a group without a CMA or GR leaves their pages and checkboxes out
+    assert "input_102_4" not in posted and "first_66" not in posted
+
+
+def test_only_the_chosen_sections_are_mapped():
+    job = make_job(7)
+    context = form_context(job.group, job.submitter, TODAY, sections={"details"})
+    posted = dict(form_fields(_schema("physical"), FORM_PLANS["physical"], context))
+    assert "input_102_3" in posted and "input_30" in posted
+    assert "input_102_0" not in posted and "input_21" not in posted
+
+
+def test_virtual_form_fields_map_onto_the_stand_in():
+    job = make_job(8, online_platform="Zoom")
+    context = form_context(job.group, job.submitter, TODAY)
+    posted = dict(form_fields(_schema("virtual"), FORM_PLANS["virtual"], context))
+    assert posted["input_23"] == "Zoom"
+    assert posted["input_141"].startswith("This meeting meets both In-person")
+    assert posted["group_radio"] == "Change"
+
+
+def test_http_submissions_reach_the_stand_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        http_submit, "FINGERPRINTS", FingerprintCache(tmp_path / "fingerprints.json")
+    )
+    jobs = [make_job(wso_id) for wso_id in (1, 2, 3)]
+    with StandInServer() as server:
+        with HttpExecutor(
+            2, {"physical": server.records_url, "virtual": server.form_url("virtual")}
+        ) as executor:
+            results = [executor.submit_job(job).result(10) for job in jobs]
+        assert server.wait_for_submissions(3) == 3
+        names = {dict(sub["fields"])["input_156"] for sub in server.submissions}
+    assert all(result.ok and result.receipt for result in results), results
+    assert names == {job.group.name for job in jobs}
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+from selenium.common import WebDriverException
+
+from wso_register import tabs
+from wso_register.physical_group import Wait
+from wso_register.tabs import TabExecutor
+
+from .factories import make_job
+
+
+class FakeDriver:
+    """Just enough of a browser for the tab executor to go round its tabs."""
+
+    def __init__(self):
+        self.alive = True
+        self.handles = ["home"]
+        self.current = "home"
+        self.switch_to = self
+
+    def _check(self):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+
+    @property
+    def window_handles(self):
+        self._check()
+        return list(self.handles)
+
+    @property
+    def current_window_handle(self):
+        self._check()
+        return self.current
+
+    def new_window(self, kind):
+        self._check()
+        self.current = f"tab{len(self.handles)}"
+        self.handles.append(self.current)
+
+    def window(self, handle):
+        self._check()
+        self.current = handle
+
+    def find_element(self, *locator):
+        self._check()
+        return object()
+
+    def close(self):
+        self._check()
+        self.handles.remove(self.current)
+
+    def quit(self):
+        self.alive = False
+
+
+def _steps(driver: FakeDriver, job, kill: bool):
+    yield Wait("page", ("id", "ready"))
+    if kill:
+        # the browser dies while this form is being filled in
+        driver.alive = False
+        raise WebDriverException("disconnected")
+    yield Wait("page", ("id", "ready"))
+    return "Thank you"
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    launched = []
+
+    def chrome_session(start_url=None, profile=None):
+        launched.append(FakeDriver())
+        return launched[-1]
+
+    def job_steps(driver, job, url):
+        return _steps(driver, job, kill=job.group.address_city == "Crash")
+
+    monkeypatch.setattr(tabs, "chrome_session", chrome_session)
+    monkeypatch.setattr(tabs, "job_steps", job_steps)
+    monkeypatch.setattr(tabs, "start_watchdog", lambda: None)
+    return launched
+
+
+def test_forms_are_filled_in_across_tabs(drivers):
+    with TabExecutor(tabs=3, poll=0.001) as executor:
+        futures = [executor.submit_job(make_job(wso_id)) for wso_id in range(1, 6)]
+        results = [future.result(5) for future in futures]
+    assert all(result.ok and result.receipt for result in results), results
+    assert len(drivers) == 1
+
+
+def test_a_browser_dying_mid_round_fails_its_tabs_as_transient(drivers):
+    jobs = [make_job(1), make_job(2, address_city="Crash"), make_job(3), make_job(4)]
+    with TabExecutor(tabs=3, poll=0.001) as executor:
+        futures = [executor.submit_job(job) for job in jobs]
+        results = [future.result(5) for future in futures]
+    failed = [result for result in results if not result.ok]
+    assert failed, results
+    assert all(result.transient for result in failed)
+    assert not any("AttributeError" in result.error for result in failed)
+    # the jobs after the crash get a fresh browser
+    assert len(drivers) == 2
+    assert results[-1].ok
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_close_doesnt_hang_when_the_tabs_thread_fails(drivers, monkeypatch):
+    def broken_round(self):
+        raise RuntimeError("something unexpected")
+
+    monkeypatch.setattr(TabExecutor, "_round", broken_round)
+    executor = TabExecutor(tabs=1, poll=0.001)
+    future = executor.submit_job(make_job(1))
+    closer = threading.Thread(target=executor.close)
+    closer.start()
+    closer.join(5)
+    assert not closer.is_alive()
+    assert future.result(1).transient
+    # and a job submitted afterwards fails at once rather than waiting forever
+    assert not executor.submit_job(make_job(2)).result(1).ok
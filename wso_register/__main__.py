@@ -1,8 +1,19 @@
+import argparse
+import dataclasses
+import json
+import sys
+import time
+
+# Only what the argument parser needs is imported up front.  Each command
+# imports the rest itself, so those that never start a browser don't pay
+# for selenium and can run in tight loops from cron or CI.
+from .batch import BACKENDS, BROWSER_BACKEND, DEFAULT_WORKERS, FORMS, PHYSICAL_FORM
+from .jobs import DEFAULT_LEASE
+from .loader import FORMATS, RosterLoader
+from .profiles import DEFAULT_PROFILE, PROFILES, session_profile
+from .scheduler import DEFAULT_MAX_ATTEMPTS, DEFAULT_RATE
+from .worker import DEFAULT_POLL
 from .wso_data import GroupData, SubmitterData
-from .physical_group import (
-    execute_physical_group_change,
-    execute_temporary_virtual_group_change,
-)
 
 SUBMITTER_DATA = SubmitterData(name="Dan B (D26 Web Admin)", phone="510-926-0499")
 TUESDAY_GROUP_DATA = GroupData(
@@ -19,5 +30,498 @@ TUESDAY_GROUP_DATA = GroupData(
     online_platform="Zoom",
 )
 
-# execute_physical_group_change(SUBMITTER_DATA, TUESDAY_GROUP_DATA)
-execute_temporary_virtual_group_change(SUBMITTER_DATA, TUESDAY_GROUP_DATA)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    if extra and args.command is not bench:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.extra = extra
+    tracing_on = getattr(args, "trace_json", None) or getattr(args, "trace_prom", None)
+    if not tracing_on:
+        return args.command(args, parser)
+    from . import tracing
+
+    tracing.enable()
+    try:
+        return args.command(args, parser)
+    finally:
+        if args.trace_json:
+            tracing.TRACER.write_json(args.trace_json)
+        if args.trace_prom:
+            tracing.TRACER.write_prometheus(args.trace_prom)
+
+
+def roster_parser(required: bool = True) -> argparse.ArgumentParser:
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "roster",
+        metavar="ROSTER",
+        nargs=None if required else "?",
+        help="CSV, JSON Lines, job list or meeting-listing export",
+    )
+    options.add_argument("--format", choices=FORMATS, help="roster file format")
+    options.add_argument(
+        "--form",
+        choices=FORMS,
+        default=PHYSICAL_FORM,
+        help="form to use for jobs that don't specify one",
+    )
+    return options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="wso_register")
+    parser.set_defaults(command=None)
+    commands = parser.add_subparsers(title="commands", metavar="COMMAND")
+    roster_options = roster_parser()
+    optional_roster = roster_parser(required=False)
+
+    store_options = argparse.ArgumentParser(add_help=False)
+    store_options.add_argument("--job-store", metavar="PATH", help="job store database")
+    store_options.add_argument(
+        "--shared-store",
+        action="store_true",
+        help="the job store is on storage shared with workers on other hosts",
+    )
+    store_options.add_argument(
+        "--snapshots", metavar="PATH", help="database of what was last submitted"
+    )
+    store_options.add_argument(
+        "--receipt-store", metavar="PATH", help="receipt database"
+    )
+
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="browsers to run, or forms in progress with the http and tabs backends",
+    )
+    run_options.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=BROWSER_BACKEND,
+        help="'http' posts the forms without a browser, falling back to one "
+        "for forms it can't map; 'tabs' fills in forms in tabs of one browser",
+    )
+    run_options.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="skip groups and sections unchanged since their last submission",
+    )
+    run_options.add_argument(
+        "--resubmit",
+        action="store_true",
+        help="submit changes again even if an earlier run's receipt shows "
+        "they went through",
+    )
+    run_options.add_argument(
+        "--coalesce",
+        type=float,
+        metavar="SECONDS",
+        help="merge repeated changes to a group that arrive within this window, "
+        "and drop them if they match what this run last released (with "
+        "--changed-only, what was last submitted)",
+    )
+    run_options.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help="submissions per second to start at; adapts to how Jotform copes",
+    )
+    run_options.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="tries per group when submissions time out or the browser fails",
+    )
+    run_options.add_argument(
+        "--profile",
+        choices=PROFILES,
+        default=DEFAULT_PROFILE.name,
+        help="browser setup: 'lean' runs headless and skips what the forms don't need",
+    )
+    run_options.add_argument(
+        "--recycle-after",
+        type=int,
+        metavar="FORMS",
+        help="replace each browser after this many forms (0 for never)",
+    )
+    run_options.add_argument(
+        "--max-browser-mb",
+        type=int,
+        metavar="MB",
+        help="replace a browser once it uses this much memory (0 for no limit)",
+    )
+    run_options.add_argument(
+        "--trace-json",
+        metavar="PATH",
+        help="time each step of the submissions and write p50/p95/p99 as JSON",
+    )
+    run_options.add_argument(
+        "--trace-prom",
+        metavar="PATH",
+        help="write the step timings as a Prometheus textfile",
+    )
+
+    command = commands.add_parser(
+        "validate",
+        parents=[roster_options],
+        help="load and check a roster without submitting anything",
+    )
+    command.set_defaults(command=validate)
+
+    for name, help_text in (
+        ("plan", "list the groups and sections a submission would change"),
+        ("diff", "show each field a submission would change"),
+    ):
+        command = commands.add_parser(name, parents=[roster_options], help=help_text)
+        command.add_argument(
+            "--snapshots", metavar="PATH", help="snapshot database to compare with"
+        )
+        command.set_defaults(command=plan, details=name == "diff")
+
+    command = commands.add_parser(
+        "dry-run",
+        parents=[roster_options],
+        help="write each group's form payload as JSON Lines",
+    )
+    command.add_argument(
+        "-o", "--output", default="-", help="file to write ('-' for stdout)"
+    )
+    command.add_argument(
+        "--date",
+        metavar="MM-DD-YYYY",
+        help="date to enter in the forms (default today), for repeatable dry runs",
+    )
+    command.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    command.set_defaults(command=dry_run)
+
+    command = commands.add_parser(
+        "harvest",
+        parents=[roster_options],
+        help="refresh a roster's groups from their listing pages",
+    )
+    command.add_argument(
+        "-o", "--output", default="-", help="job list to write ('-' for stdout)"
+    )
+    command.add_argument(
+        "--connections", type=int, help="listing pages to fetch at once"
+    )
+    command.set_defaults(command=harvest)
+
+    command = commands.add_parser(
+        "submit",
+        parents=[optional_roster, store_options, run_options],
+        help="queue a roster's groups and submit them",
+    )
+    command.add_argument(
+        "--resume",
+        action="store_true",
+        help="finish the jobs left in the job store by an earlier run",
+    )
+    command.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="with --resume, also retry jobs that failed in an earlier run",
+    )
+    command.add_argument(
+        "--example",
+        action="store_true",
+        help="submit the built-in example group instead of a roster",
+    )
+    command.set_defaults(command=submit, worker=False)
+
+    command = commands.add_parser(
+        "worker",
+        parents=[optional_roster, store_options, run_options],
+        help="lease jobs from the job store alongside other workers",
+    )
+    command.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE,
+        metavar="SECONDS",
+        help="how long a worker's jobs stay leased to it without a heartbeat",
+    )
+    command.add_argument(
+        "--poll",
+        type=float,
+        default=DEFAULT_POLL,
+        metavar="SECONDS",
+        help="how often an idle worker looks for new jobs",
+    )
+    command.add_argument(
+        "--until-idle",
+        action="store_true",
+        help="stop once no jobs are left pending or in flight",
+    )
+    command.set_defaults(
+        command=submit, worker=True, resume=False, retry_failed=False, example=False
+    )
+
+    command = commands.add_parser(
+        "receipts", help="list the confirmations of earlier submissions"
+    )
+    command.add_argument("--wso-id", type=int, help="just this group's")
+    command.add_argument("--receipt-store", metavar="PATH", help="receipt database")
+    command.set_defaults(command=receipts)
+
+    command = commands.add_parser(
+        "fingerprints", help="list (or forget) the known-good form structures"
+    )
+    forget = command.add_mutually_exclusive_group()
+    forget.add_argument(
+        "--forget", metavar="URL", help="drop this form's, e.g. after a redesign"
+    )
+    forget.add_argument("--forget-all", action="store_true", help="drop them all")
+    command.add_argument("--fingerprint-file", metavar="PATH", help="signature file")
+    command.set_defaults(command=fingerprints)
+
+    command = commands.add_parser(
+        "bench",
+        add_help=False,
+        help="time the forms against local stand-ins (see 'bench --help')",
+    )
+    command.set_defaults(command=bench)
+    return parser
+
+
+def load_roster(args: argparse.Namespace) -> RosterLoader | None:
+    if not args.roster:
+        return None
+    return RosterLoader(
+        args.roster,
+        submitter=SUBMITTER_DATA,
+        form=args.form,
+        file_format=args.format,
+    )
+
+
+def report_roster(roster: RosterLoader | None, out=sys.stdout):
+    if roster:
+        print(roster.summary(), file=out)
+        for rejection in roster.rejected:
+            print(f"  rejected record {rejection.record}: {rejection.reason}", file=out)
+
+
+def validate(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    roster = load_roster(args)
+    for _ in roster:
+        pass
+    report_roster(roster)
+    return 1 if roster.rejected else 0
+
+
+def plan(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from .form_map import FORM_PLANS
+    from .roster import job_rows
+    from .snapshots import SnapshotStore
+
+    roster = load_roster(args)
+    snapshots = SnapshotStore(args.snapshots)
+    changed = 0
+    for job, group in job_rows(roster):
+        form_plan = FORM_PLANS[job.form]
+        label = f"[{job.form}] {job.group.wso_id} {job.group.name}"
+        sections = snapshots.changed_sections(form_plan, group)
+        if sections is None:
+            print(f"{label}: unchanged")
+            continue
+        changed += 1
+        if snapshots.get(job.group.wso_id, job.form) is None:
+            print(f"{label}: new")
+        else:
+            print(f"{label}: {', '.join(sorted(sections))}")
+        if args.details:
+            for line in snapshots.field_changes(form_plan, group):
+                print(f"  {line}")
+    snapshots.close()
+    print(f"{changed} of {roster.accepted} groups to submit")
+    report_roster(roster)
+    return 1 if roster.rejected else 0
+
+
+def dry_run(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from .dry_run import write_dry_run
+
+    roster = load_roster(args)
+    if args.output == "-":
+        count, failures = write_dry_run(roster, sys.stdout, args.workers, args.date)
+    else:
+        with open(args.output, "w") as out:
+            count, failures = write_dry_run(roster, out, args.workers, args.date)
+    print(f"{count} payloads rendered, {failures} failed", file=sys.stderr)
+    report_roster(roster, sys.stderr)
+    return 1 if failures or roster.rejected else 0
+
+
+def harvest(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from .harvest import DEFAULT_MAX_CONNECTIONS, write_harvest
+
+    roster = load_roster(args)
+    connections = args.connections or DEFAULT_MAX_CONNECTIONS
+    if args.output == "-":
+        harvests, harvester = write_harvest(
+            roster, sys.stdout, max_connections=connections
+        )
+    else:
+        with open(args.output, "w") as out:
+            harvests, harvester = write_harvest(
+                roster, out, max_connections=connections
+            )
+    failures = 0
+    for result in harvests:
+        if result.error:
+            print(f"  {result.listing_page}: {result.error}", file=sys.stderr)
+            failures += 1
+    print(
+        f"{len(harvests)} groups harvested: {harvester.fetched} pages fetched, "
+        f"{harvester.not_modified} unchanged, {failures} failed",
+        file=sys.stderr,
+    )
+    report_roster(roster, sys.stderr)
+    return 1 if failures or roster.rejected else 0
+
+
+def submit(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from .coalesce import Coalescer, coalesce
+    from .jobs import JobStore, run_stored_jobs
+    from .receipts import ReceiptStore
+    from .scheduler import SubmissionScheduler, TokenBucket
+    from .snapshots import SnapshotStore
+    from .worker import Worker
+
+    profile = session_profile(args.profile)
+    if args.recycle_after is not None:
+        profile = dataclasses.replace(profile, max_uses=args.recycle_after or None)
+    if args.max_browser_mb is not None:
+        profile = dataclasses.replace(profile, max_rss_mb=args.max_browser_mb or None)
+    if not args.worker and args.example:
+        from .physical_group import execute_temporary_virtual_group_change
+        from .setup import SessionManager
+
+        with SessionManager(profile=profile) as sessions:
+            execute_temporary_virtual_group_change(
+                SUBMITTER_DATA, TUESDAY_GROUP_DATA, sessions
+            )
+        return 0
+    if not args.worker and not args.roster and not args.resume:
+        parser.error("submit needs a roster, --resume or --example")
+    if args.retry_failed and not args.resume:
+        parser.error("--retry-failed only applies with --resume")
+    roster = load_roster(args)
+    worker = None
+    if args.worker:
+        worker = Worker(
+            args.job_store,
+            shared=args.shared_store,
+            lease=args.lease,
+            poll=args.poll,
+            until_idle=args.until_idle,
+        )
+        store = worker.store
+    else:
+        store = JobStore(args.job_store, shared=args.shared_store)
+    if args.resume and (requeued := store.resume(retry_failed=args.retry_failed)):
+        print(f"{requeued} unfinished jobs requeued")
+    snapshots = SnapshotStore(args.snapshots) if args.changed_only else None
+    receipt_store = ReceiptStore(args.receipt_store, skip_confirmed=not args.resubmit)
+    if roster:
+        jobs, coalescer = roster, None
+        if args.coalesce is not None:
+            coalescer = Coalescer(args.coalesce, snapshots)
+            jobs = coalesce(roster, coalescer=coalescer)
+        print(f"{store.enqueue(jobs)} new jobs queued")
+        if coalescer:
+            print(coalescer.summary())
+    submitted = skipped = confirmed = failures = 0
+    scheduler = SubmissionScheduler(
+        bucket=TokenBucket(rate=args.rate, burst=args.workers),
+        max_attempts=args.max_attempts,
+    )
+    if worker:
+        print(f"worker {worker.name} leasing jobs from {store.path}")
+        results = worker.run(
+            args.workers, snapshots, scheduler, profile, args.backend, receipt_store
+        )
+    else:
+        results = run_stored_jobs(
+            store,
+            args.workers,
+            snapshots,
+            scheduler,
+            profile,
+            args.backend,
+            receipt_store,
+        )
+    for result in results:
+        if result.skipped and result.receipt:
+            when = time.strftime(
+                "%Y-%m-%d %H:%M", time.localtime(result.receipt.confirmed_at)
+            )
+            print(
+                f"[{result.form}] {result.wso_id} {result.name}:"
+                f" already confirmed {when}"
+            )
+            confirmed += 1
+            continue
+        if result.skipped:
+            print(f"[{result.form}] {result.wso_id} {result.name}: unchanged")
+            skipped += 1
+            continue
+        status = "ok" if result.ok else f"FAILED ({result.error})"
+        print(
+            f"[{result.form}] {result.wso_id} {result.name}: {status} "
+            f"in {result.elapsed:.1f}s"
+        )
+        submitted += result.ok
+        failures += not result.ok
+    print(
+        f"{submitted} groups submitted, {failures} failed, {skipped} unchanged,"
+        f" {confirmed} already confirmed"
+    )
+    if worker and worker.lost_leases:
+        print(
+            f"{worker.lost_leases} jobs finished after their lease ran out;"
+            " they may have been submitted again elsewhere"
+        )
+    report_roster(roster)
+    return 1 if failures or (roster and roster.rejected) else 0
+
+
+def receipts(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from .receipts import ReceiptStore
+
+    store = ReceiptStore(args.receipt_store)
+    for receipt in store.receipts(args.wso_id):
+        print(json.dumps(dataclasses.asdict(receipt)))
+    store.close()
+    return 0
+
+
+def fingerprints(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from .fingerprint import FingerprintCache
+
+    cache = FingerprintCache(args.fingerprint_file)
+    if args.forget or args.forget_all:
+        forgotten = cache.forget(args.forget)
+        print(f"forgot {forgotten} form signature(s)", file=sys.stderr)
+        return 0 if forgotten or args.forget_all else 1
+    for url, entry in sorted(cache.known().items()):
+        print(json.dumps({"url": url, **entry}))
+    return 0
+
+
+def bench(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    from . import bench as bench_module
+
+    return bench_module.main(args.extra)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from typing import Callable, Collection, Iterator
+
+from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
+
+from .physical_group import (
+    execute_physical_group_change,
+    execute_temporary_virtual_group_change,
+)
+from .profiles import session_profile
+from .setup import SessionManager
+from .wso_data import GroupData, SubmitterData
+
+DEFAULT_MAX_BROWSERS = 2
+
+
+class AsyncSubmitter:
+    """Runs change submissions for an asyncio application.
+
+    At most `max_browsers` submissions run at once, each on a pooled browser
+    in a worker thread; the rest wait on a semaphore, so they hold no thread
+    or browser and can be cancelled for free.  A call that is cancelled or
+    runs past its deadline has its browser shut down, and the slot is only
+    handed on once the worker thread has let go of it.
+    """
+
+    def __init__(
+        self,
+        max_browsers: int = DEFAULT_MAX_BROWSERS,
+        profile: str | None = None,
+    ):
+        self.max_browsers = max_browsers
+        self._sessions = SessionManager(
+            max_size=max_browsers, profile=session_profile(profile)
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_browsers, thread_name_prefix="wso-register"
+        )
+        self._slots = asyncio.Semaphore(max_browsers)
+
+    async def execute_physical_group_change(
+        self,
+        submitter: SubmitterData,
+        group: GroupData,
+        sections: Collection[str] | None = None,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        start_url: str | None = None,
+    ) -> str | None:
+        return await self._run(
+            execute_physical_group_change,
+            timeout,
+            deadline,
+            submitter,
+            group,
+            sections=sections,
+            start_url=start_url,
+        )
+
+    async def execute_temporary_virtual_group_change(
+        self,
+        submitter: SubmitterData,
+        group: GroupData,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        start_url: str | None = None,
+    ) -> str | None:
+        return await self._run(
+            execute_temporary_virtual_group_change,
+            timeout,
+            deadline,
+            submitter,
+            group,
+            start_url=start_url,
+        )
+
+    async def _run(
+        self,
+        execute: Callable,
+        timeout: float | None,
+        deadline: float | None,
+        *args,
+        **kwargs,
+    ):
+        # deadlines are in event loop time, and cover waiting for a slot
+        loop = asyncio.get_running_loop()
+        if timeout is not None:
+            expires = loop.time() + timeout
+            deadline = expires if deadline is None else min(deadline, expires)
+        call = _CallSessions(self._sessions)
+        async with asyncio.timeout_at(deadline):
+            async with self._slots:
+                future = loop.run_in_executor(
+                    self._executor,
+                    functools.partial(execute, *args, sessions=call, **kwargs),
+                )
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # quitting a browser blocks, so it is left to a thread;
+                    # the worker lets go of the slot once the browser is gone
+                    loop.run_in_executor(None, call.abort)
+                    with suppress(Exception):
+                        await future
+                    raise
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        await loop.run_in_executor(None, self._sessions.close)
+
+    async def __aenter__(self) -> "AsyncSubmitter":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class _CallSessions:
+    """Lends one pooled browser to one call, and lets the loop take it back."""
+
+    def __init__(self, sessions: SessionManager):
+        self._sessions = sessions
+        self._driver: ChromeDriver | None = None
+        self._aborted = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, start_url: str | None = None) -> Iterator[ChromeDriver]:
+        if self._aborted:
+            raise CancelledError()
+        with self._sessions.session(start_url) as driver:
+            with self._lock:
+                self._driver = driver
+                aborted = self._aborted
+            if aborted:
+                raise CancelledError()
+            try:
+                yield driver
+            finally:
+                with self._lock:
+                    self._driver = None
+
+    def abort(self):
+        with self._lock:
+            self._aborted = True
+            driver = self._driver
+        if driver is not None:
+            # the worker's next WebDriver command fails, and the session
+            # it is in throws the browser away
+            with suppress(Exception):
+                driver.quit()
@@ -0,0 +1,274 @@
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    BrokenExecutor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from contextlib import ExitStack
+from dataclasses import dataclass
+from multiprocessing.util import Finalize
+from typing import Iterable, Iterator
+
+from .form_map import FORM_PLANS
+from .profiles import SessionProfile
+from .receipts import Receipt, ReceiptStore, make_receipt
+from .roster import roster_rows
+from .scheduler import SubmissionScheduler, TokenBucket
+from .snapshots import SnapshotStore
+from .tracing import TRACER
+from .wso_data import GroupData, SubmitterData
+
+PHYSICAL_FORM = "physical"
+VIRTUAL_FORM = "virtual"
+FORMS = (PHYSICAL_FORM, VIRTUAL_FORM)
+DEFAULT_WORKERS = 4
+
+BROWSER_BACKEND = "browser"
+HTTP_BACKEND = "http"  # posts the forms without a browser
+TABS_BACKEND = "tabs"  # one browser, with a tab for each form in progress
+BACKENDS = (BROWSER_BACKEND, HTTP_BACKEND, TABS_BACKEND)
+
+
+@dataclass(kw_only=True)
+class BatchJob:
+    submitter: SubmitterData
+    group: GroupData
+    form: str = PHYSICAL_FORM
+    sections: frozenset[str] | None = None  # None means all of them
+    job_id: int | None = None  # set for jobs from a JobStore
+    attempt: int = 0
+
+
+@dataclass(kw_only=True)
+class BatchResult:
+    wso_id: int | None
+    name: str
+    form: str
+    ok: bool
+    job_id: int | None = None
+    skipped: bool = False
+    error: str = ""
+    transient: bool = False  # the error may go away if retried
+    fallback: bool = False  # nothing was submitted; a browser may manage it
+    elapsed: float = 0.0
+    trace: dict | None = None  # the worker's spans, when tracing
+    receipt: Receipt | None = None  # once the form has confirmed it
+
+
+# each worker process keeps a warm browser for all the jobs it runs
+_worker_sessions = None
+_worker_profile: SessionProfile | None = None
+
+
+def _get_worker_sessions():
+    global _worker_sessions
+    if _worker_sessions is None:
+        from .setup import SessionManager
+
+        _worker_sessions = SessionManager(max_size=1, profile=_worker_profile)
+        Finalize(None, _worker_sessions.close, exitpriority=10)
+    return _worker_sessions
+
+
+def _start_worker(profile: SessionProfile | None = None):
+    global _worker_profile
+    _worker_profile = profile
+    # launch the browser before the first job arrives; if that fails,
+    # the first job will hit (and report) the same error
+    try:
+        _get_worker_sessions().warm()
+    except Exception:
+        pass
+
+
+def run_job(job: BatchJob) -> BatchResult:
+    from selenium.common import WebDriverException
+
+    from .physical_group import (
+        execute_physical_group_change,
+        execute_temporary_virtual_group_change,
+    )
+
+    start = time.perf_counter()
+    error = confirmation = None
+    try:
+        sessions = _get_worker_sessions()
+        if job.form == VIRTUAL_FORM:
+            confirmation = execute_temporary_virtual_group_change(
+                job.submitter, job.group, sessions
+            )
+        else:
+            confirmation = execute_physical_group_change(
+                job.submitter, job.group, sessions, sections=job.sections
+            )
+    except Exception as err:
+        error = err
+    # timeouts and browser hiccups, as opposed to bad data or a changed form
+    transient = isinstance(error, WebDriverException)
+    result = job_result(job, start, error, confirmation, transient=transient)
+    if TRACER.enabled:
+        result.trace = TRACER.drain()
+    return result
+
+
+def job_result(
+    job: BatchJob,
+    start: float,
+    error: Exception | None = None,
+    confirmation: str | None = None,
+    transient: bool = False,
+) -> BatchResult:
+    """How `job`, begun at `start` (by perf_counter), went.
+
+    `transient` says whether the error may go away if the job is retried.
+    """
+    result = BatchResult(
+        wso_id=job.group.wso_id,
+        name=job.group.name,
+        form=job.form,
+        ok=error is None,
+        job_id=job.job_id,
+        elapsed=time.perf_counter() - start,
+    )
+    if error is not None:
+        result.error = f"{type(error).__name__}: {error}"
+        result.transient = transient
+    elif confirmation is not None:
+        result.receipt = make_receipt(
+            job.form,
+            job.submitter,
+            job.group,
+            job.sections,
+            confirmation,
+            result.elapsed,
+        )
+    return result
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    workers: int = DEFAULT_WORKERS,
+    snapshots: SnapshotStore | None = None,
+    scheduler: SubmissionScheduler | None = None,
+    profile: SessionProfile | None = None,
+    backend: str = BROWSER_BACKEND,
+    receipts: ReceiptStore | None = None,
+) -> Iterator[BatchResult]:
+    # jobs are pulled from the iterable only as workers free up, so a
+    # streaming roster never has to be in memory all at once
+    max_pending = workers * 2
+    scheduler = scheduler or SubmissionScheduler(bucket=TokenBucket(burst=workers))
+    jobs = iter(jobs)
+    more_jobs = True
+    with ExitStack() as stack:
+        browsers = None
+
+        def run_in_browser(job: BatchJob) -> Future:
+            # with the HTTP backend, browsers only start if a job needs one;
+            # a pool broken by a worker's death is replaced by a new one
+            nonlocal browsers
+            if browsers is not None:
+                try:
+                    return browsers.submit(run_job, job)
+                except BrokenExecutor:
+                    pass
+            browsers = stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_start_worker,
+                    initargs=(profile,),
+                )
+            )
+            return browsers.submit(run_job, job)
+
+        start = run_in_browser
+        if backend == HTTP_BACKEND:
+            from .http_submit import HttpExecutor
+
+            start = stack.enter_context(HttpExecutor(workers)).submit_job
+        elif backend == TABS_BACKEND:
+            from .tabs import TabExecutor
+
+            start = stack.enter_context(TabExecutor(workers, profile)).submit_job
+        pending: dict[Future, BatchJob] = {}
+        while True:
+            while len(pending) < max_pending and scheduler.bucket.delay() == 0:
+                if (job := scheduler.ready_retry()) is None and more_jobs:
+                    job = next(jobs, None)
+                    more_jobs = job is not None
+                if job is None:
+                    break
+                check_receipt = (
+                    receipts is not None and receipts.skip_confirmed and not job.attempt
+                )
+                check_snapshot = snapshots is not None and not job.attempt
+                if check_receipt or check_snapshot:
+                    # both checks render the form; the group's WSO values are
+                    # worked out once for the two of them
+                    (group,) = roster_rows([job.group])
+                if check_receipt and (
+                    receipt := receipts.confirmed(
+                        job.form, job.submitter, group, job.sections
+                    )
+                ):
+                    # this very change went through on an earlier run
+                    yield BatchResult(
+                        wso_id=job.group.wso_id,
+                        name=job.group.name,
+                        form=job.form,
+                        ok=True,
+                        job_id=job.job_id,
+                        skipped=True,
+                        receipt=receipt,
+                    )
+                    continue
+                if check_snapshot:
+                    plan = FORM_PLANS[job.form]
+                    job.sections = snapshots.changed_sections(plan, group)
+                    if job.sections is None:
+                        yield BatchResult(
+                            wso_id=job.group.wso_id,
+                            name=job.group.name,
+                            form=job.form,
+                            ok=True,
+                            job_id=job.job_id,
+                            skipped=True,
+                        )
+                        continue
+                scheduler.bucket.take()
+                pending[start(job)] = job
+            timeout = None
+            if len(pending) < max_pending:
+                timeout = scheduler.wait_timeout(more_jobs)
+                if timeout is None and not pending:
+                    break
+            if not pending:
+                time.sleep(timeout)
+                continue
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenExecutor as err:
+                    # a worker process died (killed, or out of memory),
+                    # taking every job its pool had with it
+                    result = job_result(job, time.perf_counter(), err, transient=True)
+                if result.trace:
+                    TRACER.merge(result.trace)
+                if result.fallback:
+                    pending[run_in_browser(job)] = job
+                    continue
+                if result.ok:
+                    scheduler.bucket.succeeded()
+                    if snapshots is not None:
+                        snapshots.record(FORM_PLANS[job.form], job.group)
+                    if receipts is not None and result.receipt:
+                        receipts.record(result.receipt)
+                elif result.transient:
+                    scheduler.bucket.throttled()
+                    if scheduler.retry(job):
+                        continue
+                yield result
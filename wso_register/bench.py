@@ -0,0 +1,424 @@
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from . import tracing
+from .batch import (
+    BACKENDS,
+    BROWSER_BACKEND,
+    DEFAULT_WORKERS,
+    FORMS,
+    HTTP_BACKEND,
+    PHYSICAL_FORM,
+    TABS_BACKEND,
+    VIRTUAL_FORM,
+    BatchJob,
+)
+from .paths import state_path
+from .profiles import DEFAULT_PROFILE, PROFILES, session_profile
+from .stand_in import StandInServer
+from .wso_data import (
+    WSO_LANGUAGES,
+    WSO_OPTIONS,
+    WSO_PARTICIPANT_TYPES,
+    GroupData,
+    SubmitterData,
+)
+
+BENCH_RESULTS = "bench.jsonl"
+BENCH_SUBMITTER = SubmitterData(name="Bench Submitter", phone="510-555-0100")
+CITIES = (("Berkeley", "94704"), ("Oakland", "94612"), ("Albany", "94706"))
+
+
+def synthetic_groups(count: int, seed: int = 0) -> list[GroupData]:
+    # the same seed gives the same groups, so runs are comparable
+    rng = random.Random(seed)
+    groups = []
+    for index in range(count):
+        city, zip_code = rng.choice(CITIES)
+        contact = {}
+        if rng.random() < 0.5:
+            contact.update(
+                cma_first_name="Casey",
+                cma_last_name=f"Mailer{index}",
+                cma_street_address_1=f"{index} Main St",
+                cma_city=city,
+                cma_state="CA",
+                cma_zip=zip_code,
+                cma_phone="510-555-0101",
+                cma_email=f"cma{index}@example.org",
+            )
+        if rng.random() < 0.5:
+            contact.update(
+                gr_first_name="Gray",
+                gr_last_name=f"Rep{index}",
+                gr_street_address_1=f"{index} Oak Ave",
+                gr_city=city,
+                gr_state="CA",
+                gr_zip=zip_code,
+                gr_phone="510-555-0102",
+                gr_email=f"gr{index}@example.org",
+            )
+        groups.append(
+            GroupData(
+                name=f"Bench Group {index}",
+                listing_page=f"https://example.org/meetings/bench-{index}/",
+                wso_id=100000 + index,
+                day_of_week=rng.randrange(7),
+                start_hour=rng.randrange(24),
+                start_minute=rng.choice((0, 15, 30, 45)),
+                duration=rng.choice((60, 90)),
+                members_only=rng.random() < 0.3,
+                participant_types=set(rng.sample(list(WSO_PARTICIPANT_TYPES), 1)),
+                options=set(rng.sample(list(WSO_OPTIONS), 2)),
+                language=rng.choice((None, *WSO_LANGUAGES.values())),
+                physical_location=f"Hall {index}",
+                address_street_1=f"{index} Center St",
+                address_city=city,
+                address_state="CA",
+                address_zip=zip_code,
+                public_email=f"group{index}@example.org",
+                online_platform="Zoom" if rng.random() < 0.5 else None,
+                online_url=f"https://zoom.us/j/{index}",
+                **contact,
+            )
+        )
+    return groups
+
+
+def run_bench(
+    form: str,
+    groups: list[GroupData],
+    batched: bool = True,
+    latency: float = 0.0,
+    page_delay: int = 0,
+    asset_latency: float = 0.0,
+    profile: str = DEFAULT_PROFILE.name,
+    backend: str = BROWSER_BACKEND,
+    concurrency: int = DEFAULT_WORKERS,
+) -> dict:
+    if form == VIRTUAL_FORM:
+        # the virtual form is only for groups that meet online
+        groups = [group for group in groups if group.online_platform]
+    tracing.enable()
+    with StandInServer(
+        latency=latency, page_delay=page_delay, asset_latency=asset_latency
+    ) as server:
+        if backend == BROWSER_BACKEND:
+            received, seconds = _run_browser(form, groups, server, batched, profile)
+        else:
+            received, seconds = _run_concurrent(
+                form, groups, server, backend, profile, concurrency
+            )
+    steps = tracing.TRACER.summary()["steps"]
+    return {
+        "commit": current_commit(),
+        "timestamp": time.time(),
+        "form": form,
+        "profile": profile,
+        "backend": backend,
+        "batched": batched,
+        "groups": len(groups),
+        "received": received,
+        "seconds": seconds,
+        "groups_per_second": len(groups) / seconds if seconds else 0.0,
+        "page_ready": steps.get(f"page_ready:{form}"),
+        "pages": {
+            step.removeprefix("fill_page:"): distribution
+            for step, distribution in steps.items()
+            if step.startswith("fill_page:")
+        },
+        "commands": sum(
+            distribution["count"]
+            for step, distribution in steps.items()
+            if step.startswith("command:")
+        ),
+    }
+
+
+def _run_browser(
+    form: str,
+    groups: list[GroupData],
+    server: StandInServer,
+    batched: bool,
+    profile: str,
+) -> tuple[int, float]:
+    from .physical_group import (
+        execute_physical_group_change,
+        execute_temporary_virtual_group_change,
+    )
+    from .setup import SessionManager
+
+    with SessionManager(max_size=1, profile=session_profile(profile)) as sessions:
+        # the browser launch is a one-time cost, so keep it out of the rate
+        sessions.warm()
+        tracing.TRACER.drain()
+        start = time.perf_counter()
+        for group in groups:
+            if form == VIRTUAL_FORM:
+                execute_temporary_virtual_group_change(
+                    BENCH_SUBMITTER,
+                    group,
+                    sessions,
+                    batched,
+                    start_url=server.form_url(VIRTUAL_FORM),
+                )
+            else:
+                execute_physical_group_change(
+                    BENCH_SUBMITTER,
+                    group,
+                    sessions,
+                    batched,
+                    start_url=server.records_url,
+                )
+        received = server.wait_for_submissions(len(groups))
+        return received, time.perf_counter() - start
+
+
+def _run_concurrent(
+    form: str,
+    groups: list[GroupData],
+    server: StandInServer,
+    backend: str,
+    profile: str,
+    concurrency: int,
+) -> tuple[int, float]:
+    form_urls = {
+        PHYSICAL_FORM: server.records_url,
+        VIRTUAL_FORM: server.form_url(VIRTUAL_FORM),
+    }
+    if backend == TABS_BACKEND:
+        from .tabs import TabExecutor
+
+        executor = TabExecutor(concurrency, session_profile(profile), form_urls)
+    else:
+        from .http_submit import HttpExecutor
+
+        executor = HttpExecutor(concurrency, form_urls)
+    with executor:
+        # leave out whatever an earlier run traced
+        tracing.TRACER.drain()
+        start = time.perf_counter()
+        futures = [
+            executor.submit_job(
+                BatchJob(submitter=BENCH_SUBMITTER, group=group, form=form)
+            )
+            for group in groups
+        ]
+        for future in futures:
+            if not (result := future.result()).ok:
+                raise RuntimeError(f"{result.name}: {result.error}")
+        received = server.wait_for_submissions(len(groups))
+        return received, time.perf_counter() - start
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_results(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open() as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_result(path: Path, result: dict):
+    with path.open("a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def find_baseline(results: list[dict], result: dict, ref: str) -> dict | None:
+    # the latest comparable run at the given commit, or at any other one
+    for candidate in reversed(results):
+        if (
+            candidate["form"] != result["form"]
+            or candidate.get("backend", BROWSER_BACKEND) != result["backend"]
+            or candidate["batched"] != result["batched"]
+            or candidate.get("profile", DEFAULT_PROFILE.name) != result["profile"]
+        ):
+            continue
+        if ref == "last" and candidate["commit"] != result["commit"]:
+            return candidate
+        if ref != "last" and candidate["commit"].startswith(ref):
+            return candidate
+    return None
+
+
+def comparison(baseline: dict, result: dict) -> list[str]:
+    rows = [
+        (
+            "groups/s",
+            baseline["groups_per_second"],
+            result["groups_per_second"],
+        )
+    ]
+    if (before := baseline.get("page_ready")) and (after := result["page_ready"]):
+        rows.append(("page ready p50", before["p50"], after["p50"]))
+        rows.append(("page ready p95", before["p95"], after["p95"]))
+    for page, distribution in result["pages"].items():
+        if before := baseline["pages"].get(page):
+            rows.append((f"{page} p50", before["p50"], distribution["p50"]))
+            rows.append((f"{page} p95", before["p95"], distribution["p95"]))
+    lines = [f"{'':16} {_label(baseline):>22} {_label(result):>22}   change"]
+    for label, before, after in rows:
+        change = (after - before) / before * 100 if before else 0.0
+        lines.append(f"{label:16} {before:22.4f} {after:22.4f} {change:+7.1f}%")
+    return lines
+
+
+def _label(result: dict) -> str:
+    return f"{result['commit']} {_setup(result)}"
+
+
+def _setup(result: dict) -> str:
+    backend = result.get("backend", BROWSER_BACKEND)
+    if backend == HTTP_BACKEND:
+        return "http"
+    profile = result.get("profile", DEFAULT_PROFILE.name)
+    return profile if backend == BROWSER_BACKEND else f"{backend} {profile}"
+
+
+def report(result: dict) -> list[str]:
+    lines = [
+        f"[{result['form']}, {_setup(result)}"
+        f"{'' if result['batched'] else ', unbatched'}] "
+        f"{result['groups']} groups in {result['seconds']:.2f}s: "
+        f"{result['groups_per_second']:.2f} groups/s, "
+        f"{result['commands']} WebDriver commands, "
+        f"{result['received']} submissions received"
+    ]
+    pages = result["pages"]
+    if result["page_ready"]:
+        pages = {"(page ready)": result["page_ready"], **pages}
+    for page, distribution in pages.items():
+        lines.append(
+            f"  {page:14} p50 {distribution['p50'] * 1000:7.1f}ms"
+            f"  p95 {distribution['p95'] * 1000:7.1f}ms"
+            f"  p99 {distribution['p99'] * 1000:7.1f}ms"
+        )
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="wso_register.bench",
+        description="time both change forms against local stand-in pages",
+    )
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--form", choices=(*FORMS, "both"), default="both")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--unbatched", action="store_true", help="fill fields one command at a time"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to each response"
+    )
+    parser.add_argument(
+        "--page-delay",
+        type=int,
+        default=0,
+        help="milliseconds before each form page appears",
+    )
+    parser.add_argument(
+        "--asset-latency",
+        type=float,
+        default=0.25,
+        help="seconds added to each image, stylesheet and script",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        action="append",
+        help="browser setup to time; give two to compare them",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=BROWSER_BACKEND,
+        help="'http' posts the forms without a browser; 'tabs' fills in "
+        "several at once in one browser",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="forms in progress with the http and tabs backends",
+    )
+    parser.add_argument(
+        "--results",
+        metavar="PATH",
+        help=f"where results are kept (default {BENCH_RESULTS} in the state dir)",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="keep this run as a baseline"
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="COMMIT",
+        help="compare with a saved run at this commit ('last' for the latest)",
+    )
+    args = parser.parse_args(argv)
+    results_path = Path(args.results) if args.results else state_path(BENCH_RESULTS)
+    forms = (PHYSICAL_FORM, VIRTUAL_FORM) if args.form == "both" else (args.form,)
+    groups = synthetic_groups(args.groups, args.seed)
+    saved = load_results(results_path)
+    missing = False
+    for form in forms:
+        results = []
+        # profiles are browser setups; the http backend has just the one
+        profiles = args.profile or (DEFAULT_PROFILE.name,)
+        if args.backend == HTTP_BACKEND:
+            profiles = profiles[:1]
+        for profile in profiles:
+            result = run_bench(
+                form,
+                groups,
+                not args.unbatched,
+                args.latency,
+                args.page_delay,
+                args.asset_latency,
+                profile,
+                args.backend,
+                args.concurrency,
+            )
+            results.append(result)
+            print("\n".join(report(result)))
+            if args.baseline:
+                if baseline := find_baseline(saved, result, args.baseline):
+                    print("\n".join(comparison(baseline, result)))
+                else:
+                    print(
+                        f"no saved {form} {_setup(result)} run at {args.baseline}"
+                        " to compare with"
+                    )
+                    missing = True
+            if args.save:
+                save_result(results_path, result)
+        for before, after in zip(results, results[1:]):
+            print("\n".join(comparison(before, after)))
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from .batch import BatchJob
+from .form_map import FORM_PLANS
+from .roster import RosterRow, job_rows
+from .snapshots import SnapshotStore, section_values
+from .wso_data import GroupData
+
+DEFAULT_WINDOW = 120.0  # seconds
+
+
+@dataclass(kw_only=True)
+class _Pending:
+    job: BatchJob
+    due: float
+
+
+class Coalescer:
+    """Holds each group's changes for a while and releases only the latest.
+
+    The first change to a group starts its window; later changes within
+    the window replace it.  When the window closes the group is released
+    once, unless it matches what was last submitted (per the snapshot
+    store, or else what this coalescer last released), in which case it
+    is dropped.  Changes may be put from any thread; iterating releases
+    groups as their windows close, until the coalescer is closed and empty.
+    """
+
+    def __init__(
+        self,
+        window: float = DEFAULT_WINDOW,
+        snapshots: SnapshotStore | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.snapshots = snapshots
+        self.clock = clock
+        self.received = 0
+        self.merged = 0
+        self.dropped = 0
+        self.released = 0
+        # a fixed window means insertion order is also due order
+        self._pending: dict[tuple[str, int | None], _Pending] = {}
+        self._last_released: dict[tuple[str, int | None], dict] = {}
+        self._closed = False
+        self._changed = threading.Condition()
+
+    def put(self, job: BatchJob):
+        with self._changed:
+            if self._closed:
+                raise ValueError("Cannot add changes to a closed coalescer")
+            self.received += 1
+            key = (job.form, job.group.wso_id)
+            if pending := self._pending.get(key):
+                pending.job = merge_jobs(pending.job, job)
+                self.merged += 1
+            else:
+                self._pending[key] = _Pending(job=job, due=self.clock() + self.window)
+            self._changed.notify_all()
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def ready(self, flush: bool = False) -> list[BatchJob]:
+        """Take the groups whose window has closed (or all of them)."""
+        now = self.clock()
+        jobs = []
+        with self._changed:
+            while self._pending:
+                key, pending = next(iter(self._pending.items()))
+                if not flush and pending.due > now:
+                    break
+                del self._pending[key]
+                jobs.append(pending.job)
+        released = [job for job, row in job_rows(jobs) if not self._unchanged(job, row)]
+        self.dropped += len(jobs) - len(released)
+        self.released += len(released)
+        return released
+
+    def next_due(self) -> float | None:
+        with self._changed:
+            if not self._pending:
+                return None
+            return next(iter(self._pending.values())).due
+
+    def __iter__(self) -> Iterator[BatchJob]:
+        while True:
+            with self._changed:
+                while not self._closed:
+                    if self._pending:
+                        wait = next(iter(self._pending.values())).due - self.clock()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._changed.wait(wait)
+                closed = self._closed
+                if closed and not self._pending:
+                    return
+            yield from self.ready(flush=closed)
+
+    def summary(self) -> str:
+        return (
+            f"{self.received} changes coalesced into {self.released} submissions"
+            f" ({self.merged} merged, {self.dropped} unchanged)"
+        )
+
+    def _unchanged(self, job: BatchJob, group: GroupData | RosterRow) -> bool:
+        plan = FORM_PLANS[job.form]
+        if self.snapshots is not None:
+            return self.snapshots.changed_sections(plan, group) is None
+        key = (job.form, job.group.wso_id)
+        values = section_values(plan, group)
+        if self._last_released.get(key) == values:
+            return True
+        self._last_released[key] = values
+        return False
+
+
+def merge_jobs(older: BatchJob, newer: BatchJob) -> BatchJob:
+    # each change carries the whole group, so the newest one wins; only
+    # the sections to submit accumulate
+    if older.sections is None or newer.sections is None:
+        sections = None
+    else:
+        sections = older.sections | newer.sections
+    return BatchJob(
+        submitter=newer.submitter,
+        group=newer.group,
+        form=newer.form,
+        sections=sections,
+        job_id=newer.job_id,
+    )
+
+
+def coalesce(
+    jobs: Iterable[BatchJob],
+    window: float = DEFAULT_WINDOW,
+    snapshots: SnapshotStore | None = None,
+    coalescer: Coalescer | None = None,
+) -> Iterator[BatchJob]:
+    """Coalesce a stream of jobs read in this thread, e.g. from a roster."""
+    coalescer = coalescer or Coalescer(window, snapshots)
+    for job in jobs:
+        coalescer.put(job)
+        yield from coalescer.ready()
+    coalescer.close()
+    yield from coalescer.ready(flush=True)
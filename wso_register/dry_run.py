@@ -0,0 +1,136 @@
+import dataclasses
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Collection, Iterable, Iterator, TextIO
+
+from .batch import DEFAULT_WORKERS, VIRTUAL_FORM, BatchJob
+from .form_map import (
+    PHYSICAL_GROUP_CHANGE_PLAN,
+    TEMP_VIRTUAL_GROUP_CHANGE_PLAN,
+    FormContext,
+    FormPlan,
+    form_context,
+    require_online,
+    require_registered,
+)
+from .roster import RosterRow, job_rows
+from .wso_data import GroupData, SubmitterData
+
+DRY_RUN_CHUNK_SIZE = 200
+
+
+def form_payload(plan: FormPlan, context: FormContext) -> dict:
+    """Everything the fillers would enter for one group, page by page."""
+    group = context.group
+    return {
+        "form": plan.name,
+        "wso_id": group.wso_id,
+        "name": group.name,
+        "has_cma": bool(group.has_cma()),
+        "has_gr": bool(group.has_gr()),
+        "sections": (
+            sorted(context.sections & plan.sections) if plan.selective else None
+        ),
+        "pages": [
+            {
+                "page": page.name,
+                "wait": page.wait_id,
+                "click": page.click,
+                "fields": [
+                    [field.kind, field.target, field.value]
+                    for field in page.render(context)
+                ],
+            }
+            for page in plan.active_pages(context)
+        ],
+    }
+
+
+def dry_run_physical_group_change(
+    submitter: SubmitterData,
+    group: GroupData | RosterRow,
+    sections: Collection[str] | None = None,
+    today: str | None = None,
+) -> dict:
+    require_registered(group)
+    context = form_context(group, submitter, today, sections)
+    return form_payload(PHYSICAL_GROUP_CHANGE_PLAN, context)
+
+
+def dry_run_temporary_virtual_group_change(
+    submitter: SubmitterData,
+    group: GroupData | RosterRow,
+    today: str | None = None,
+) -> dict:
+    require_online(group)
+    context = form_context(group, submitter, today)
+    return form_payload(TEMP_VIRTUAL_GROUP_CHANGE_PLAN, context)
+
+
+def dry_run_job(job: BatchJob, today: str | None = None) -> dict:
+    try:
+        if job.form == VIRTUAL_FORM:
+            return dry_run_temporary_virtual_group_change(
+                job.submitter, job.group, today
+            )
+        return dry_run_physical_group_change(
+            job.submitter, job.group, job.sections, today
+        )
+    except Exception as err:
+        return {
+            "form": job.form,
+            "wso_id": job.group.wso_id,
+            "name": job.group.name,
+            "error": f"{type(err).__name__}: {err}",
+        }
+
+
+def _dry_run_chunk(jobs: list[BatchJob], today: str | None) -> list[str]:
+    # lines are serialized in the worker so only strings cross back, and
+    # the chunk's groups are normalized together, so the schedules,
+    # languages and countries a roster repeats are worked out once each
+    return [
+        json.dumps(dry_run_job(dataclasses.replace(job, group=row), today))
+        for job, row in job_rows(jobs, len(jobs) or 1)
+    ]
+
+
+def dry_run_lines(
+    jobs: Iterable[BatchJob],
+    workers: int = DEFAULT_WORKERS,
+    today: str | None = None,
+    chunk_size: int = DRY_RUN_CHUNK_SIZE,
+) -> Iterator[str]:
+    """JSON Lines payloads for the jobs, in roster order."""
+    jobs = iter(jobs)
+    if workers <= 1:
+        while chunk := list(islice(jobs, chunk_size)):
+            yield from _dry_run_chunk(chunk, today)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # a few chunks per worker in flight, collected in the order submitted
+        pending: deque[Future] = deque()
+        while True:
+            while len(pending) < workers * 2:
+                if not (chunk := list(islice(jobs, chunk_size))):
+                    break
+                pending.append(executor.submit(_dry_run_chunk, chunk, today))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def write_dry_run(
+    jobs: Iterable[BatchJob],
+    out: TextIO,
+    workers: int = DEFAULT_WORKERS,
+    today: str | None = None,
+) -> tuple[int, int]:
+    count = errors = 0
+    for line in dry_run_lines(jobs, workers, today):
+        out.write(line + "\n")
+        count += 1
+        errors += '"error": ' in line
+    return count, errors
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .form_map import CHECKBOX, RADIO, FormPlan
+from .paths import state_path
+
+FINGERPRINT_FILE = "fingerprints.json"
+
+# Collects, in one round trip, the id of every form control and the value
+# of every radio and checkbox, including those on pages not shown yet.
+FINGERPRINT_SCRIPT = """
+const roots = [document].concat(
+  Array.from(document.querySelectorAll("template"), t => t.content));
+const ids = new Set(), radio = new Set(), checkbox = new Set();
+for (const root of roots) {
+  root.querySelectorAll("input, select, textarea, button").forEach(el => {
+    if (el.id) ids.add(el.id);
+    if (el.type === "radio") radio.add(el.value);
+    if (el.type === "checkbox") checkbox.add(el.value);
+  });
+}
+return {ids: Array.from(ids), radio: Array.from(radio),
+        checkbox: Array.from(checkbox)};
+"""
+SIGNATURE_KEYS = ("ids", "radio", "checkbox")
+
+
+def normalize_signature(raw: dict) -> dict[str, list[str]]:
+    return {key: sorted(set(raw.get(key) or ())) for key in SIGNATURE_KEYS}
+
+
+def required_ids(plan: FormPlan) -> frozenset[str]:
+    ids = {page.wait_id for page in plan.pages}
+    ids.update(
+        field.element_id
+        for page in plan.pages
+        for field in page.fields
+        if field.element_id
+    )
+    return frozenset(ids)
+
+
+def plan_signature(plan: FormPlan) -> dict[str, list[str]]:
+    """The ids and choice values the plan's fillers depend on."""
+    choices = {choice for page in plan.pages for choice in page.choices}
+    return {
+        "ids": sorted(required_ids(plan)),
+        "radio": sorted(value for kind, value in choices if kind == RADIO),
+        "checkbox": sorted(value for kind, value in choices if kind == CHECKBOX),
+    }
+
+
+def signature_diff(known: dict, current: dict) -> list[str]:
+    lines = []
+    for key in SIGNATURE_KEYS:
+        before, after = set(known.get(key, ())), set(current.get(key, ()))
+        lines += [f"- {key}: {value}" for value in sorted(before - after)]
+        lines += [f"+ {key}: {value}" for value in sorted(after - before)]
+    return lines
+
+
+class FingerprintCache:
+    """Known-good form signatures by form URL, on disk and checked per process."""
+
+    def __init__(self, path: str | Path | None = None):
+        self._path = Path(path) if path else None
+        self._verified: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        # resolved lazily so importing this module doesn't touch the disk
+        return self._path or state_path(FINGERPRINT_FILE)
+
+    def verified(self, url: str) -> bool:
+        return url in self._verified
+
+    def check(self, url: str, plan: FormPlan, raw_signature: dict):
+        # only what the fillers depend on counts: the page may gain or lose
+        # anything else (a banner's button, a promotion's radio) harmlessly
+        present = normalize_signature(raw_signature)
+        needed = plan_signature(plan)
+        signature = {
+            key: [value for value in needed[key] if value in set(present[key])]
+            for key in SIGNATURE_KEYS
+        }
+        problems = [
+            f"{line} (needed by the {plan.name} form)"
+            for line in signature_diff(needed, signature)
+        ]
+        if problems:
+            details = "\n".join(problems)
+            raise ReferenceError(
+                f"{plan.name} form at {url} doesn't have the expected"
+                f" structure:\n{details}"
+            )
+        with self._lock:
+            known_signatures = self._load()
+            if known_signatures.get(url, {}).get("signature") != signature:
+                known_signatures[url] = {
+                    "form": plan.name,
+                    "signature": signature,
+                    "updated": time.time(),
+                }
+                self._save(known_signatures)
+            self._verified.add(url)
+
+    def known(self) -> dict[str, dict]:
+        """The known-good signatures, by form URL."""
+        with self._lock:
+            return self._load()
+
+    def forget(self, url: str | None = None) -> int:
+        """Drop the signature for `url`, or all of them; how many went."""
+        with self._lock:
+            known_signatures = self._load()
+            urls = list(known_signatures) if url is None else [url]
+            self._verified.difference_update(urls)
+            forgotten = [u for u in urls if known_signatures.pop(u, None) is not None]
+            if forgotten:
+                self._save(known_signatures)
+            return len(forgotten)
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, known_signatures: dict):
+        # several worker processes may save at once; the last one wins
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}")
+        temporary.write_text(json.dumps(known_signatures, indent=2, sort_keys=True))
+        temporary.replace(self.path)
@@ -0,0 +1,423 @@
+from datetime import datetime
+from operator import attrgetter, methodcaller
+from typing import Callable, Iterable, NamedTuple
+
+from .wso_data import (
+    WSO_ATTENDEES,
+    WSO_LANGUAGES,
+    WSO_OPTIONS,
+    WSO_PARTICIPANT_TYPES,
+    GroupData,
+    SubmitterData,
+)
+
+RECORDS_ENDPOINT = "https://al-anon.org/for-members/group-resources/group-records"
+PHYSICAL_GROUP_CHANGE_PATH = (
+    "/changes-existing-al-anon-group/group-records-change-form/"
+)
+TEMP_VIRTUAL_GROUP_CHANGE_ENDPOINT = "https://form.jotform.com/201006291804141"
+# where each form starts, by form name
+FORM_URLS = {
+    "physical": RECORDS_ENDPOINT + PHYSICAL_GROUP_CHANGE_PATH,
+    "virtual": TEMP_VIRTUAL_GROUP_CHANGE_ENDPOINT,
+}
+
+TEXT = "text"
+SELECT = "select"
+RADIO = "radio"
+CHECKBOX = "checkbox"
+
+# locator column value for radios and checkboxes found by their value
+BY_VALUE = "@value"
+# the values such radios and checkboxes can be filled in with
+STATUS_CHOICES = ("Change",)
+LANGUAGE_CHOICES = ("English", *WSO_LANGUAGES.values())
+PARTICIPANT_CHOICES = tuple(WSO_PARTICIPANT_TYPES.values())
+OPTION_CHOICES = tuple(WSO_OPTIONS.values())
+
+
+# Field values and conditions are functions of the FormContext below.
+def constant(value: str) -> Callable:
+    return lambda context: value
+
+
+def group_attr(name: str) -> Callable:
+    return attrgetter(f"group.{name}")
+
+
+def group_method(name: str, *args) -> Callable:
+    call = methodcaller(name, *args)
+    return lambda context: call(context.group)
+
+
+def group_part(name: str, index: int) -> Callable:
+    # one piece of a value the form asks for in several fields
+    call = methodcaller(name)
+    return lambda context: call(context.group)[index]
+
+
+def in_sections(section: str) -> Callable:
+    return lambda context: section in context.sections
+
+
+def all_of(*conditions: Callable) -> Callable:
+    return lambda context: all(condition(context) for condition in conditions)
+
+
+def virtual_meeting_details(context: "FormContext") -> str:
+    group = context.group
+    return (
+        f"This meeting meets {group.meeting_type()}.\n\n"
+        f"All details are at: {group.listing_page}"
+    )
+
+
+# Each page lists the element that signals it is ready (and is clicked to
+# move on, if `click` is set) and its fields as (kind, locator, value)
+# triples.  The values are functions of the form's context; a field or
+# page with a "when" function is skipped unless it returns true.  Radios
+# and checkboxes located by value may get None (nothing to click) or a
+# collection of values (click each of them); the page's "choices" list
+# every value they may get, by kind.  Pages that belong to a section are
+# only filled when that section is being submitted; a "selective" form
+# can submit just some of its sections, others have to submit all of them.
+PHYSICAL_GROUP_CHANGE_FORM = {
+    "name": "physical",
+    "frame": "Group Records Change",
+    "selective": True,
+    "pages": [
+        {
+            "name": "header",
+            "wait": "form-pagebreak-next_97",
+            "fields": [
+                (TEXT, "input_156", group_attr("name")),
+                (TEXT, "input_13", group_attr("wso_id")),
+                (TEXT, "input_16", constant("26")),
+                (TEXT, "input_17", constant("California North")),
+            ],
+        },
+        {
+            "name": "status",
+            "choices": {RADIO: STATUS_CHOICES},
+            "wait": "form-pagebreak-next_98",
+            "fields": [
+                (RADIO, BY_VALUE, constant("Change")),
+                (TEXT, "lite_mode_96", attrgetter("today")),
+            ],
+        },
+        {
+            "name": "summary",
+            "wait": "form-pagebreak-next_19",
+            "fields": [
+                (CHECKBOX, "input_102_0", None, in_sections("name_address")),
+                (CHECKBOX, "input_102_1", None, in_sections("participants")),
+                (CHECKBOX, "input_102_2", None, in_sections("contact")),
+                (CHECKBOX, "input_102_3", None, in_sections("details")),
+                (
+                    CHECKBOX,
+                    "input_102_4",
+                    None,
+                    all_of(in_sections("cma"), group_method("has_cma")),
+                ),
+                (
+                    CHECKBOX,
+                    "input_102_5",
+                    None,
+                    all_of(in_sections("gr"), group_method("has_gr")),
+                ),
+            ],
+        },
+        {
+            "name": "name",
+            "choices": {RADIO: LANGUAGE_CHOICES},
+            "section": "name_address",
+            "wait": "form-pagebreak-next_116",
+            "fields": [
+                (TEXT, "input_21", group_attr("name")),
+                (RADIO, BY_VALUE, group_method("wso_language")),
+                (TEXT, "input_23", group_method("wso_meeting_place")),
+                (TEXT, "input_24_addr_line1", group_attr("address_street_1")),
+                (TEXT, "input_24_addr_line2", group_attr("address_street_2")),
+                (TEXT, "input_80", group_method("wso_city")),
+                (TEXT, "input_81", group_method("wso_state")),
+                (TEXT, "input_82", group_method("wso_zip")),
+                (TEXT, "input_83", group_method("wso_country")),
+                (TEXT, "input_25", group_attr("public_email")),
+            ],
+        },
+        {
+            "name": "participants",
+            "choices": {CHECKBOX: PARTICIPANT_CHOICES},
+            "section": "participants",
+            "wait": "form-pagebreak-next_134",
+            "fields": [
+                (CHECKBOX, BY_VALUE, group_method("wso_participant_type")),
+            ],
+        },
+        {
+            "name": "public_phone",
+            "choices": {CHECKBOX: PARTICIPANT_CHOICES},
+            "section": "contact",
+            "wait": "form-pagebreak-next_135",
+            "fields": [
+                (CHECKBOX, BY_VALUE, group_method("wso_participant_type")),
+            ],
+        },
+        {
+            "name": "details",
+            "choices": {RADIO: WSO_ATTENDEES, CHECKBOX: OPTION_CHOICES},
+            "section": "details",
+            "wait": "form-pagebreak-next_133",
+            "fields": [
+                (SELECT, "input_30", group_part("wso_schedule", 0)),
+                (SELECT, "input_31", group_part("wso_schedule", 1)),
+                (SELECT, "input_32", group_part("wso_schedule", 2)),
+                (SELECT, "input_33", group_part("wso_schedule", 3)),
+                (RADIO, BY_VALUE, group_method("wso_attendees")),
+                (TEXT, "input_78", group_method("wso_language", False)),
+                (TEXT, "input_47", constant("")),
+                (CHECKBOX, BY_VALUE, group_method("wso_options")),
+                (TEXT, "input_39", group_method("wso_location")),
+            ],
+        },
+        {
+            "name": "cma",
+            "section": "cma",
+            "wait": "form-pagebreak-next_64",
+            "when": group_method("has_cma"),
+            "fields": [
+                (TEXT, "first_66", group_attr("cma_first_name")),
+                (TEXT, "last_66", group_attr("cma_last_name")),
+                (TEXT, "input_67_addr_line1", group_attr("cma_street_address_1")),
+                (TEXT, "input_67_addr_line2", group_attr("cma_street_address_2")),
+                (TEXT, "input_84", group_attr("cma_city")),
+                (TEXT, "input_85", group_attr("cma_state")),
+                (TEXT, "input_86", group_attr("cma_zip")),
+                (TEXT, "input_87", group_method("wso_cma_country")),
+                (TEXT, "input_68_area", group_part("wso_cma_phone", 0)),
+                (TEXT, "input_68_phone", group_part("wso_cma_phone", 1)),
+                (TEXT, "input_69", group_attr("cma_email")),
+            ],
+        },
+        {
+            "name": "gr",
+            "section": "gr",
+            "wait": "form-pagebreak-next_148",
+            "when": group_method("has_gr"),
+            "fields": [
+                (TEXT, "first_74", group_attr("gr_first_name")),
+                (TEXT, "last_74", group_attr("gr_last_name")),
+                (TEXT, "input_73_addr_line1", group_attr("gr_street_address_1")),
+                (TEXT, "input_73_addr_line2", group_attr("gr_street_address_2")),
+                (TEXT, "input_88", group_attr("gr_city")),
+                (TEXT, "input_89", group_attr("gr_state")),
+                (TEXT, "input_90", group_attr("gr_zip")),
+                (TEXT, "input_91", group_method("wso_gr_country")),
+                (TEXT, "input_72_area", group_part("wso_gr_phone", 0)),
+                (TEXT, "input_72_phone", group_part("wso_gr_phone", 1)),
+                (TEXT, "input_71", group_attr("gr_email")),
+                (TEXT, "input_95", group_attr("gr_comment")),
+            ],
+        },
+    ],
+}
+
+SUBMIT_PAGE = {
+    "name": "submit",
+    "wait": "input_2",
+    "fields": [
+        (TEXT, "input_43", attrgetter("submitter.name")),
+        (TEXT, "lite_mode_44", attrgetter("today")),
+        (TEXT, "input_45_area", lambda context: context.submitter.wso_phone()[0]),
+        (TEXT, "input_45_phone", lambda context: context.submitter.wso_phone()[1]),
+        (TEXT, "input_46", attrgetter("submitter.email")),
+    ],
+}
+PHYSICAL_GROUP_CHANGE_FORM["pages"].append(SUBMIT_PAGE)
+
+TEMP_VIRTUAL_GROUP_CHANGE_FORM = {
+    "name": "virtual",
+    "pages": [
+        {
+            "name": "group",
+            "choices": {RADIO: STATUS_CHOICES},
+            "section": "virtual",
+            "wait": "input_13",
+            "click": False,
+            "fields": [
+                (TEXT, "input_13", group_attr("wso_id")),
+                (TEXT, "input_112", group_attr("name")),
+                (TEXT, "input_113", group_method("wso_city")),
+                (TEXT, "input_114", group_method("wso_state")),
+                (TEXT, "input_16", constant("26")),
+                (TEXT, "input_17", constant("California North")),
+                (RADIO, BY_VALUE, constant("Change")),
+                (TEXT, "lite_mode_96", attrgetter("today")),
+                (TEXT, "input_23", group_attr("online_platform")),
+                (TEXT, "input_141", virtual_meeting_details),
+            ],
+        },
+        SUBMIT_PAGE,
+    ],
+}
+
+
+class FormContext(NamedTuple):
+    group: GroupData
+    submitter: SubmitterData | None
+    today: str
+    sections: frozenset[str] | None  # None means all of them
+
+
+class Field(NamedTuple):
+    kind: str
+    by: str  # "id" or "xpath", as in selenium's By
+    target: str
+    value: str = ""
+
+
+class PlanField(NamedTuple):
+    kind: str
+    element_id: str | None  # None for radios and checkboxes found by value
+    value: Callable | None
+    when: Callable | None
+
+
+class PlanPage(NamedTuple):
+    name: str
+    section: str | None
+    wait_id: str
+    click: bool
+    when: Callable | None
+    fields: tuple[PlanField, ...]
+    choices: tuple[tuple[str, str], ...] = ()  # (kind, value) it may click
+
+    def entries(self, context: FormContext) -> list[tuple[str, str | None, str]]:
+        """(kind, element id, value) for each field to set, as plain values.
+
+        Radios and checkboxes found by value have no element id, and one
+        entry for each value to click.
+        """
+        entries = []
+        for field in self.fields:
+            if field.when and not field.when(context):
+                continue
+            value = field.value(context) if field.value else ""
+            if field.element_id:
+                value = "" if value is None else str(value)
+                entries.append((field.kind, field.element_id, value))
+            else:
+                entries.extend((field.kind, None, v) for v in _values(value))
+        return entries
+
+    def render(self, context: FormContext) -> list[Field]:
+        return [
+            by_id(kind, element_id, value) if element_id else by_value(kind, value)
+            for kind, element_id, value in self.entries(context)
+        ]
+
+
+class FormPlan(NamedTuple):
+    name: str
+    frame_title: str | None
+    selective: bool
+    sections: frozenset[str]
+    pages: tuple[PlanPage, ...]
+
+    def active_pages(self, context: FormContext) -> Iterable[PlanPage]:
+        for page in self.pages:
+            if page.when and not page.when(context):
+                continue
+            if self.selective and page.section:
+                if page.section not in context.sections:
+                    continue
+            yield page
+
+
+def form_context(
+    group: GroupData,
+    submitter: SubmitterData | None,
+    today: str | None = None,
+    sections: Iterable[str] | None = None,
+) -> FormContext:
+    return FormContext(
+        group,
+        submitter,
+        datetime.today().strftime("%m-%d-%Y") if today is None else today,
+        ALL_SECTIONS if sections is None else frozenset(sections),
+    )
+
+
+def require_registered(group: GroupData):
+    if not group.wso_id:
+        raise ValueError("Cannot submit change form for non-registered group")
+
+
+def require_online(group: GroupData):
+    require_registered(group)
+    if not group.online_platform:
+        raise ValueError("Cannot submit virtual change form for a non-online group")
+
+
+def by_id(kind: str, element_id: str, value="") -> Field:
+    return Field(kind, "id", element_id, "" if value is None else str(value))
+
+
+def by_value(kind: str, value: str) -> Field:
+    return Field(kind, "xpath", f"//input[@type='{kind}' and @value='{value}']")
+
+
+def _values(value) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return sorted(value)
+
+
+def compile_form(spec: dict) -> FormPlan:
+    pages = []
+    for page in spec["pages"]:
+        fields = []
+        for kind, locator, value, *when in page["fields"]:
+            fields.append(
+                PlanField(
+                    kind=kind,
+                    element_id=None if locator == BY_VALUE else locator,
+                    value=value,
+                    when=when[0] if when else None,
+                )
+            )
+        pages.append(
+            PlanPage(
+                name=page["name"],
+                section=page.get("section"),
+                wait_id=page["wait"],
+                click=page.get("click", True),
+                when=page.get("when"),
+                fields=tuple(fields),
+                choices=tuple(
+                    (kind, value)
+                    for kind, values in page.get("choices", {}).items()
+                    for value in values
+                ),
+            )
+        )
+    return FormPlan(
+        name=spec["name"],
+        frame_title=spec.get("frame"),
+        selective=spec.get("selective", False),
+        sections=frozenset(page.section for page in pages if page.section),
+        pages=tuple(pages),
+    )
+
+
+PHYSICAL_GROUP_CHANGE_PLAN = compile_form(PHYSICAL_GROUP_CHANGE_FORM)
+TEMP_VIRTUAL_GROUP_CHANGE_PLAN = compile_form(TEMP_VIRTUAL_GROUP_CHANGE_FORM)
+FORM_PLANS = {
+    plan.name: plan
+    for plan in (PHYSICAL_GROUP_CHANGE_PLAN, TEMP_VIRTUAL_GROUP_CHANGE_PLAN)
+}
+ALL_SECTIONS = (
+    PHYSICAL_GROUP_CHANGE_PLAN.sections | TEMP_VIRTUAL_GROUP_CHANGE_PLAN.sections
+)
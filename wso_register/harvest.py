@@ -0,0 +1,300 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable, TextIO
+
+from .batch import BatchJob
+from .http_pool import DEFAULT_MAX_CONNECTIONS, DEFAULT_MAX_PER_HOST, ConnectionPool
+from .jobs import job_payload
+from .loader import RecordError, listing_group_data
+from .paths import state_path
+from .wso_data import WSO_DAYS, GroupData
+
+CACHE_DIR = "http-cache"
+
+# the listing data a page can't carry, so harvesting leaves it alone
+TYPE_FIELDS = ("members_only", "participant_types", "options", "language")
+
+
+class HttpCache:
+    """Listing pages fetched before, with the validators to refetch them."""
+
+    def __init__(self, directory: str | Path | None = None):
+        self._directory = Path(directory) if directory else None
+
+    @property
+    def directory(self) -> Path:
+        # resolved lazily so importing this module doesn't touch the disk
+        directory = self._directory or state_path(CACHE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def get(self, url: str) -> dict | None:
+        try:
+            return json.loads(self._path(url).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, entry: dict):
+        path = self._path(url)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}")
+        temporary.write_text(json.dumps(entry, sort_keys=True))
+        temporary.replace(path)
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+
+class _JsonLdParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.blocks: list[str] = []
+        self._in_json_ld = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script" and dict(attrs).get("type") == "application/ld+json":
+            self._in_json_ld = True
+            self.blocks.append("")
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_json_ld = False
+
+    def handle_data(self, data):
+        if self._in_json_ld:
+            self.blocks[-1] += data
+
+
+def listing_meeting(html: str, url: str) -> dict:
+    """A listing page's meeting, from its schema.org Event, in export form.
+
+    Meeting-listing sites put an Event in each meeting page's JSON-LD; its
+    fields are translated to those of a meeting-listing export record.
+    """
+    parser = _JsonLdParser()
+    parser.feed(html)
+    parser.close()
+    for block in parser.blocks:
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        if event := _find_event(data):
+            return _event_meeting(event, url)
+    raise RecordError(f"no meeting data on {url}")
+
+
+def _find_event(data) -> dict | None:
+    if isinstance(data, list):
+        return next(filter(None, map(_find_event, data)), None)
+    if not isinstance(data, dict):
+        return None
+    kinds = data.get("@type")
+    kinds = kinds if isinstance(kinds, list) else [kinds]
+    if any(isinstance(kind, str) and kind.endswith("Event") for kind in kinds):
+        return data
+    return _find_event(data.get("@graph"))
+
+
+def _event_meeting(event: dict, url: str) -> dict:
+    meeting = {"name": event.get("name"), "url": url}
+    schedule = event.get("eventSchedule")
+    schedule = schedule[0] if isinstance(schedule, list) and schedule else schedule
+    if isinstance(schedule, dict) and schedule.get("startTime"):
+        day = schedule.get("byDay")
+        day = day[0] if isinstance(day, list) and day else day
+        day_name = str(day or "").rsplit("/", 1)[-1]
+        if day_name in WSO_DAYS:
+            meeting["day"] = WSO_DAYS.index(day_name)
+        meeting["time"] = schedule["startTime"][:5]
+        if end_time := schedule.get("endTime"):
+            meeting["end_time"] = end_time[:5]
+    elif start := event.get("startDate"):
+        try:
+            start = datetime.fromisoformat(start)
+        except ValueError:
+            raise RecordError(f"bad meeting start on {url}: {start!r}")
+        # Python counts days from Monday, the WSO from Sunday
+        meeting["day"] = (start.weekday() + 1) % 7
+        meeting["time"] = start.strftime("%H:%M")
+        if end := event.get("endDate"):
+            try:
+                meeting["end_time"] = datetime.fromisoformat(end).strftime("%H:%M")
+            except ValueError:
+                pass
+    locations = event.get("location") or []
+    for location in locations if isinstance(locations, list) else [locations]:
+        if not isinstance(location, dict):
+            continue
+        if location.get("@type") == "VirtualLocation":
+            meeting["conference_url"] = location.get("url")
+            continue
+        meeting["location"] = location.get("name")
+        meeting["location_notes"] = location.get("description")
+        address = location.get("address")
+        if isinstance(address, str):
+            meeting["address"] = address
+        elif isinstance(address, dict):
+            country = address.get("addressCountry")
+            meeting.update(
+                address=address.get("streetAddress"),
+                city=address.get("addressLocality"),
+                state=address.get("addressRegion"),
+                postal_code=address.get("postalCode"),
+                country=country.get("name") if isinstance(country, dict) else country,
+            )
+    for contact in (event, event.get("organizer")):
+        if isinstance(contact, dict) and contact.get("email"):
+            meeting["email"] = contact["email"].removeprefix("mailto:")
+            break
+    return meeting
+
+
+def listing_fields(html: str, url: str) -> dict:
+    """The GroupData fields a listing page gives values for."""
+    data = listing_group_data(listing_meeting(html, url))
+    for name in TYPE_FIELDS:
+        data.pop(name)
+    return {
+        name: value for name, value in data.items() if value not in (None, "", set())
+    }
+
+
+@dataclasses.dataclass(kw_only=True)
+class Harvest:
+    listing_page: str
+    group: GroupData | None = None
+    fetched: bool = False  # False if the cached copy was still current
+    error: str = ""
+
+
+class Harvester:
+    """Refreshes groups from their listing pages, many pages at a time.
+
+    Pages come through a pool of kept-alive connections.  Each page is
+    cached on disk with its ETag and Last-Modified, and refetched with a
+    conditional request, so a page that hasn't changed costs one small
+    response and no parsing.
+    """
+
+    def __init__(
+        self,
+        cache: HttpCache | None = None,
+        pool: ConnectionPool | None = None,
+    ):
+        self.cache = cache or HttpCache()
+        self.pool = pool or ConnectionPool()
+        self.fetched = 0
+        self.not_modified = 0
+        self._pages: dict[str, asyncio.Future] = {}
+
+    async def page_fields(self, url: str) -> tuple[dict, bool]:
+        # groups sharing a listing page share one fetch of it
+        if url not in self._pages:
+            self._pages[url] = asyncio.ensure_future(self._page_fields(url))
+        return await asyncio.shield(self._pages[url])
+
+    async def harvest_group(self, group: GroupData | str) -> Harvest:
+        url = group if isinstance(group, str) else group.listing_page
+        harvest = Harvest(listing_page=url)
+        try:
+            fields, harvest.fetched = await self.page_fields(url)
+            if isinstance(group, str):
+                harvest.group = GroupData(**fields)
+            else:
+                harvest.group = dataclasses.replace(group, **fields)
+        except (OSError, TimeoutError, ValueError, TypeError) as err:
+            harvest.error = f"{type(err).__name__}: {err}"
+        return harvest
+
+    async def harvest(self, groups: Iterable[GroupData | str]) -> list[Harvest]:
+        return await asyncio.gather(*map(self.harvest_group, groups))
+
+    async def close(self):
+        await self.pool.close()
+
+    async def __aenter__(self) -> "Harvester":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _page_fields(self, url: str) -> tuple[dict, bool]:
+        cached = self.cache.get(url)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        response = await self.pool.get(url, headers)
+        if response.status == 304 and cached:
+            self.not_modified += 1
+            return cached["fields"], False
+        if response.status != 200:
+            raise ConnectionError(f"HTTP {response.status} fetching {url}")
+        self.fetched += 1
+        html = response.body.decode(_charset(response.headers), errors="replace")
+        fields = listing_fields(html, url)
+        self.cache.put(
+            url,
+            {
+                "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched": time.time(),
+                "fields": fields,
+            },
+        )
+        return fields, True
+
+
+def _charset(headers: dict[str, str]) -> str:
+    for parameter in headers.get("content-type", "").split(";")[1:]:
+        name, _, value = parameter.strip().partition("=")
+        if name.lower() == "charset" and value:
+            return value.strip('"')
+    return "utf-8"
+
+
+def harvest_groups(
+    groups: Iterable[GroupData | str],
+    cache: HttpCache | None = None,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+) -> tuple[list[Harvest], Harvester]:
+    """Harvest outside of an event loop."""
+
+    async def run():
+        pool = ConnectionPool(max_connections, max_per_host)
+        async with Harvester(cache, pool) as harvester:
+            return await harvester.harvest(groups), harvester
+
+    return asyncio.run(run())
+
+
+def write_harvest(
+    jobs: Iterable[BatchJob],
+    out: TextIO,
+    cache: HttpCache | None = None,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+) -> tuple[list[Harvest], Harvester]:
+    """Write the jobs as a job list, with groups refreshed from their pages.
+
+    A group whose page can't be harvested is written as it was.
+    """
+    jobs = list(jobs)
+    harvests, harvester = harvest_groups(
+        (job.group for job in jobs), cache, max_connections, max_per_host
+    )
+    for job, harvest in zip(jobs, harvests):
+        if harvest.group:
+            job = dataclasses.replace(job, group=harvest.group)
+        out.write(job_payload(job) + "\n")
+    return harvests, harvester
@@ -0,0 +1,173 @@
+import asyncio
+import dataclasses
+import email.message
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import Request, getproxies, proxy_bypass
+
+import urllib3
+
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_MAX_PER_HOST = 4  # be a polite client of the sites we use
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 2  # for connections that fail, or drop before a GET's answer
+MAX_REDIRECTS = 5
+USER_AGENT = "wso-register"
+
+
+@dataclasses.dataclass(kw_only=True)
+class Response:
+    url: str
+    status: int
+    headers: dict[str, str]  # with lower-case names
+    body: bytes
+
+
+class _CookieResponse:
+    # what a CookieJar reads of a response: every one of its headers
+    def __init__(self, headers: urllib3.HTTPHeaderDict):
+        self._message = email.message.Message()
+        for name, value in headers.items():
+            self._message[name] = value
+
+    def info(self) -> email.message.Message:
+        return self._message
+
+
+class ConnectionPool:
+    """Kept-alive HTTP connections, with their cookies, for asyncio callers.
+
+    urllib3 does the HTTP, in threads: at most `max_connections` requests
+    are in flight, and at most `max_per_host` of them to any one host.
+    Proxies are taken from the environment, as urllib does, unless one is
+    given ("" for none).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+        proxy: str | None = None,
+    ):
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self._proxies = (
+            getproxies() if proxy is None else dict.fromkeys(("http", "https"), proxy)
+        )
+        self._options = dict(
+            num_pools=max_connections,
+            maxsize=max_per_host,
+            block=True,
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            retries=urllib3.Retry(total=DEFAULT_RETRIES, redirect=False),
+        )
+        self._managers: dict[str | None, urllib3.PoolManager] = {}
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(
+            max_connections, thread_name_prefix="http-pool"
+        )
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        return await self.request("GET", url, headers)
+
+    async def post_form(
+        self,
+        url: str,
+        fields: list[tuple[str, str]],
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        headers = dict(headers or {})
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return await self.request("POST", url, headers, urlencode(fields).encode())
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        body: bytes = b"",
+    ) -> Response:
+        loop = asyncio.get_running_loop()
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await loop.run_in_executor(
+                self._threads, self._request, method, url, headers or {}, body
+            )
+            location = response.headers.get("location")
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                return response
+            url = urljoin(url, location)
+            if response.status in (301, 302, 303):
+                # as browsers do, the form's result page is fetched with a GET
+                method, body = "GET", b""
+                headers = {
+                    name: value
+                    for name, value in (headers or {}).items()
+                    if name.lower() != "content-type"
+                }
+        raise ConnectionError(f"Too many redirects fetching {url}")
+
+    async def close(self):
+        await asyncio.to_thread(self._threads.shutdown)
+        with self._lock:
+            for manager in self._managers.values():
+                manager.clear()
+            self._managers.clear()
+
+    async def __aenter__(self) -> "ConnectionPool":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _request(
+        self, method: str, url: str, headers: dict[str, str], body: bytes
+    ) -> Response:
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise ValueError(f"Can't fetch {url}")
+        request = Request(url, headers=headers, method=method)
+        self.cookies.add_cookie_header(request)
+        headers = {
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": "gzip",
+            **headers,
+            **request.unredirected_hdrs,
+        }
+        try:
+            response = self._manager(url).urlopen(
+                method,
+                url,
+                body=body or None,
+                headers=headers,
+                redirect=False,
+                pool_timeout=self.timeout,
+            )
+        except urllib3.exceptions.HTTPError as err:
+            # callers tell failures worth retrying by the builtin types
+            reason = getattr(err, "reason", None) or err
+            if isinstance(reason, urllib3.exceptions.TimeoutError):
+                raise TimeoutError(f"Timed out fetching {url}") from err
+            raise ConnectionError(f"{reason} fetching {url}") from err
+        self.cookies.extract_cookies(_CookieResponse(response.headers), request)
+        return Response(
+            url=url,
+            status=response.status,
+            headers={name.lower(): value for name, value in response.headers.items()},
+            body=response.data,
+        )
+
+    def _manager(self, url: str) -> urllib3.PoolManager:
+        parts = urlsplit(url)
+        proxy = self._proxies.get(parts.scheme)
+        if proxy and proxy_bypass(parts.hostname or ""):
+            proxy = None
+        with self._lock:
+            if (manager := self._managers.get(proxy)) is None:
+                if proxy:
+                    manager = urllib3.ProxyManager(proxy, **self._options)
+                else:
+                    manager = urllib3.PoolManager(**self._options)
+                self._managers[proxy] = manager
+            return manager
@@ -0,0 +1,444 @@
+import asyncio
+import concurrent.futures
+import dataclasses
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from .batch import VIRTUAL_FORM, BatchJob, BatchResult, job_result
+from .fingerprint import FingerprintCache
+from .form_map import (
+    CHECKBOX,
+    FORM_PLANS,
+    FORM_URLS,
+    RADIO,
+    SELECT,
+    FormContext,
+    FormPlan,
+    form_context,
+    require_online,
+    require_registered,
+)
+from .http_pool import DEFAULT_MAX_CONNECTIONS, ConnectionPool
+from .receipts import CONFIRMATIONS
+from .tracing import span
+
+# Submits the change forms without a browser: each form is read once to
+# learn the name its fields are posted under, and from then on a change is
+# a single POST of the fields a browser would have filled in.
+
+FINGERPRINTS = FingerprintCache()
+
+
+@dataclasses.dataclass(kw_only=True)
+class Control:
+    kind: str  # the input type, or "select" or "textarea"
+    name: str | None
+    value: str = ""  # the value it is posted with, or starts out with
+    options: tuple[tuple[str, str], ...] = ()  # (value, text) for selects
+
+
+@dataclasses.dataclass(kw_only=True)
+class FormSchema:
+    """How a form's fields are posted, as read from its HTML."""
+
+    url: str  # the page the form is on
+    action: str
+    ids: list[str]  # of every control and button
+    hidden: list[tuple[str, str]]
+    controls: dict[str, Control]  # by element id
+    # radios and checkboxes by (page group, kind, value); pages without a
+    # next button of their own are grouped with the page after them
+    choices: dict[tuple[int, str, str], Control]
+    page_groups: dict[str, int]  # page name to its group
+
+    def signature(self) -> dict[str, list[str]]:
+        # what the browser path's fingerprint script would have collected
+        return {
+            "ids": self.ids,
+            "radio": [value for _, kind, value in self.choices if kind == RADIO],
+            "checkbox": [value for _, kind, value in self.choices if kind == CHECKBOX],
+        }
+
+
+class _FormParser(HTMLParser):
+    def __init__(self, plan: FormPlan):
+        super().__init__(convert_charrefs=True)
+        self.action: str | None = None
+        self.ids: list[str] = []
+        self.hidden: list[tuple[str, str]] = []
+        self.controls: dict[str, Control] = {}
+        self.choices: dict[tuple[int, str, str], Control] = {}
+        self.frames: dict[str, str] = {}  # iframe title to its source
+        self.page_groups: dict[str, int] = {}
+        self._boundaries: list[str] = []
+        group = 0
+        for page in plan.pages:
+            self.page_groups[page.name] = group
+            if page.click:
+                self._boundaries.append(page.wait_id)
+                group += 1
+        self._group = 0
+        self._select: Control | None = None
+        self._option: list | None = None
+        self._textarea: Control | None = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        element_id = attrs.get("id")
+        if element_id and tag in ("input", "select", "textarea", "button"):
+            self.ids.append(element_id)
+        if tag == "form" and self.action is None:
+            self.action = attrs.get("action", "")
+        elif tag == "iframe" and attrs.get("title"):
+            self.frames[attrs["title"]] = attrs.get("src", "")
+        elif tag == "input":
+            kind = attrs.get("type", "text").lower()
+            control = Control(
+                kind=kind,
+                name=attrs.get("name") or None,
+                value=attrs.get("value", "on" if kind in (RADIO, CHECKBOX) else ""),
+            )
+            if kind == "hidden":
+                if control.name:
+                    self.hidden.append((control.name, control.value))
+            elif kind in (RADIO, CHECKBOX):
+                self.choices.setdefault((self._group, kind, control.value), control)
+            if element_id:
+                self.controls[element_id] = control
+        elif tag == "select":
+            self._select = Control(kind=SELECT, name=attrs.get("name") or None)
+            if element_id:
+                self.controls[element_id] = self._select
+        elif tag == "option" and self._select is not None:
+            self._option = [attrs.get("value"), ""]
+        elif tag == "textarea":
+            self._textarea = Control(kind="textarea", name=attrs.get("name") or None)
+            if element_id:
+                self.controls[element_id] = self._textarea
+        # a page's next button ends it
+        if (
+            element_id
+            and self._group < len(self._boundaries)
+            and element_id == self._boundaries[self._group]
+        ):
+            self._group += 1
+
+    def handle_endtag(self, tag):
+        if tag == "option" and self._option is not None:
+            self._end_option()
+        elif tag == "select" and self._select is not None:
+            if self._option is not None:
+                self._end_option()
+            self._select = None
+        elif tag == "textarea":
+            self._textarea = None
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option[1] += data
+        elif self._textarea is not None:
+            self._textarea.value += data
+
+    def _end_option(self):
+        value, text = self._option
+        text = text.strip()
+        self._select.options += ((text if value is None else value, text),)
+        self._option = None
+
+
+def parse_form(html: str, url: str, plan: FormPlan) -> FormSchema:
+    parser = _FormParser(plan)
+    parser.feed(html)
+    parser.close()
+    if parser.action is None:
+        raise ReferenceError(f"{plan.name} form at {url} has no form element")
+    return FormSchema(
+        url=url,
+        action=urljoin(url, parser.action),
+        ids=parser.ids,
+        hidden=parser.hidden,
+        controls=parser.controls,
+        choices=parser.choices,
+        page_groups=parser.page_groups,
+    )
+
+
+def frame_source(html: str, url: str, plan: FormPlan) -> str:
+    parser = _FormParser(plan)
+    parser.feed(html)
+    parser.close()
+    if plan.frame_title not in parser.frames:
+        raise ReferenceError(
+            f"{plan.frame_title} page doesn't have the correct structure"
+        )
+    return urljoin(url, parser.frames[plan.frame_title])
+
+
+def form_fields(
+    schema: FormSchema, plan: FormPlan, context: FormContext
+) -> list[tuple[str, str]]:
+    """The name and value of each field a browser would post for a change."""
+    fields = []
+    for page in plan.active_pages(context):
+        group = schema.page_groups[page.name]
+        for kind, element_id, value in page.entries(context):
+            if element_id is None:
+                control = schema.choices.get((group, kind, value))
+                if control is None:
+                    raise ReferenceError(
+                        f"{plan.name} form has no {kind} for {value!r}"
+                        f" on its {page.name} page"
+                    )
+                fields.append((control.name, control.value))
+                continue
+            if (control := schema.controls.get(element_id)) is None:
+                raise ReferenceError(f"{plan.name} form has no {element_id}")
+            if control.kind in (RADIO, CHECKBOX):
+                fields.append((control.name, control.value))
+            elif control.kind == SELECT:
+                if value:
+                    fields.append((control.name, select_option(control, value)))
+            elif control.name:
+                # the browser path types after whatever the field starts with
+                fields.append((control.name, control.value + value))
+            elif element_id.startswith("lite_mode_"):
+                fields.extend(_lite_date(schema, element_id, value))
+            else:
+                raise ReferenceError(f"{plan.name} form's {element_id} has no name")
+    if any(name is None for name, _ in fields):
+        raise ReferenceError(f"{plan.name} form has unnamed radios or checkboxes")
+    posted = {name for name, _ in fields}
+    hidden = [(name, value) for name, value in schema.hidden if name not in posted]
+    return _fill_hidden(hidden) + fields
+
+
+def select_option(control: Control, value: str) -> str:
+    # matched as the browser path matches them: by value or text, then by
+    # the start of the text
+    want = value.lower()
+    for option_value, text in control.options:
+        if option_value.lower() == want or text.lower() == want:
+            return option_value
+    for option_value, text in control.options:
+        if text.lower().startswith(want):
+            return option_value
+    raise ValueError(f"{value!r} is not one of the options for {control.name}")
+
+
+def _lite_date(schema: FormSchema, element_id: str, value: str) -> list:
+    # Jotform's "lite mode" date box has no name of its own; its script
+    # copies the date into hidden month, day and year fields
+    number = element_id.removeprefix("lite_mode_")
+    parts = dict(zip(("month", "day", "year"), value.split("-")))
+    fields = []
+    for part, part_value in parts.items():
+        control = schema.controls.get(f"{part}_{number}")
+        if control is None or not control.name:
+            raise ReferenceError(f"form's {element_id} has no {part} field")
+        fields.append((control.name, part_value))
+    return fields
+
+
+def _fill_hidden(hidden: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    # Jotform's script fills in its spam check from the form id before
+    # submitting; without it a submission is dropped
+    form_id = next((value for name, value in hidden if name == "formID"), "")
+    return [
+        (name, f"{form_id}-{form_id}" if name == "simple_spc" and not value else value)
+        for name, value in hidden
+    ]
+
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.text = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "title"):
+            self._hidden += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "title") and self._hidden:
+            self._hidden -= 1
+
+    def handle_data(self, data):
+        if not self._hidden and data.strip():
+            self.text.append(data.strip())
+
+
+def confirmation_text(body: str) -> str | None:
+    """The text of a thank-you page, or None if it isn't one."""
+    parser = _TextParser()
+    parser.feed(body)
+    text = " ".join(parser.text)
+    lower = text.lower()
+    if any(confirmation in lower for confirmation in CONFIRMATIONS):
+        return text
+    return None
+
+
+class HttpSubmitter:
+    """Posts change forms straight to Jotform, many at a time.
+
+    Each form's page is read and checked once per submitter; after that a
+    change costs a single POST over a pooled keep-alive connection.  A form
+    whose fields can't all be mapped raises ReferenceError, as the browser
+    path does, and nothing is posted.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool | None = None,
+        form_urls: dict[str, str] | None = None,
+        fingerprints: FingerprintCache | None = None,
+    ):
+        self.pool = pool or ConnectionPool()
+        self.form_urls = {**FORM_URLS, **(form_urls or {})}
+        self.fingerprints = fingerprints or FINGERPRINTS
+        self._schemas: dict[str, asyncio.Future] = {}
+
+    async def schema(self, form: str) -> FormSchema:
+        # concurrent first submissions share one read of the form
+        if form not in self._schemas:
+            self._schemas[form] = asyncio.ensure_future(self._load_schema(form))
+        try:
+            return await asyncio.shield(self._schemas[form])
+        except (OSError, TimeoutError):
+            # let a later submission have another go at reading it; a form
+            # that doesn't match stays that way
+            self._schemas.pop(form, None)
+            raise
+
+    async def submit(self, plan: FormPlan, context: FormContext) -> str:
+        schema = await self.schema(plan.name)
+        fields = form_fields(schema, plan, context)
+        with span("http_submit", plan.name):
+            response = await self.pool.post_form(
+                schema.action,
+                fields,
+                {"Referer": schema.url, "Origin": _origin(schema.url)},
+            )
+        if response.status == 429 or response.status >= 500:
+            raise ConnectionError(f"HTTP {response.status} submitting {plan.name}")
+        body = response.body.decode(errors="replace")
+        confirmation = confirmation_text(body) if response.status == 200 else None
+        if confirmation is None:
+            raise RuntimeError(
+                f"{plan.name} form didn't confirm the submission"
+                f" (HTTP {response.status})"
+            )
+        return confirmation
+
+    async def execute_physical_group_change(
+        self, submitter, group, sections=None, today: str | None = None
+    ) -> str:
+        require_registered(group)
+        context = form_context(group, submitter, today, sections)
+        return await self.submit(FORM_PLANS["physical"], context)
+
+    async def execute_temporary_virtual_group_change(
+        self, submitter, group, today: str | None = None
+    ) -> str:
+        require_online(group)
+        context = form_context(group, submitter, today)
+        return await self.submit(FORM_PLANS["virtual"], context)
+
+    async def run_job(self, job: BatchJob) -> BatchResult:
+        start = time.perf_counter()
+        error = confirmation = None
+        try:
+            if job.form == VIRTUAL_FORM:
+                confirmation = await self.execute_temporary_virtual_group_change(
+                    job.submitter, job.group
+                )
+            else:
+                confirmation = await self.execute_physical_group_change(
+                    job.submitter, job.group, job.sections
+                )
+        except Exception as err:
+            error = err
+        transient = isinstance(error, (OSError, TimeoutError))
+        result = job_result(job, start, error, confirmation, transient=transient)
+        # nothing was posted, so a browser can safely have a go
+        result.fallback = isinstance(error, ReferenceError)
+        return result
+
+    async def close(self):
+        await self.pool.close()
+
+    async def __aenter__(self) -> "HttpSubmitter":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _load_schema(self, form: str) -> FormSchema:
+        plan = FORM_PLANS[form]
+        url = self.form_urls[form]
+        with span("page_ready", plan.name):
+            response = await self.pool.get(url)
+            _check_page(response, url)
+            if plan.frame_title:
+                url = frame_source(response.body.decode(errors="replace"), url, plan)
+                response = await self.pool.get(url)
+                _check_page(response, url)
+        schema = parse_form(response.body.decode(errors="replace"), url, plan)
+        if not self.fingerprints.verified(url):
+            with span("verify_form", plan.name):
+                self.fingerprints.check(url, plan, schema.signature())
+        return schema
+
+
+def _check_page(response, url: str):
+    if response.status != 200:
+        raise ConnectionError(f"HTTP {response.status} fetching {url}")
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HttpExecutor:
+    """Runs an HttpSubmitter's jobs on an event loop of its own.
+
+    `submit_job` can be called from any thread and returns a
+    concurrent.futures.Future, so batches can wait on HTTP submissions and
+    browser workers alike.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        form_urls: dict[str, str] | None = None,
+    ):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="http-submit", daemon=True
+        )
+        self._thread.start()
+        self.submitter = HttpSubmitter(
+            ConnectionPool(max_connections, max_per_host=max_connections), form_urls
+        )
+
+    def submit_job(self, job: BatchJob) -> concurrent.futures.Future:
+        return self._call(self.submitter.run_job(job))
+
+    def close(self):
+        self._call(self.submitter.close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "HttpExecutor":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _call(self, coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
@@ -0,0 +1,274 @@
+import hashlib
+import itertools
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .batch import BROWSER_BACKEND, DEFAULT_WORKERS, BatchJob, BatchResult, run_batch
+from .paths import state_path
+from .profiles import SessionProfile
+from .receipts import ReceiptStore
+from .scheduler import SubmissionScheduler
+from .snapshots import SnapshotStore
+from .wso_data import GroupData, SubmitterData
+
+JOB_DB = "jobs.db"
+
+PENDING = "pending"
+IN_FLIGHT = "in-flight"
+SUBMITTED = "submitted"
+FAILED = "failed"
+STATES = (PENDING, IN_FLIGHT, SUBMITTED, FAILED)
+
+LOCK_TIMEOUT = 30.0  # seconds to wait for another worker's write
+DEFAULT_LEASE = 300.0  # seconds a worker may hold a job without renewing
+DEFAULT_MAX_DELIVERIES = 3
+
+# the oldest pending job whose group has no other job in flight
+NEXT_PENDING = (
+    "SELECT id, payload FROM jobs WHERE state = ? AND ("
+    " wso_id IS NULL OR wso_id NOT IN ("
+    "  SELECT wso_id FROM jobs"
+    "  WHERE state = ? AND wso_id IS NOT NULL))"
+    " ORDER BY id LIMIT 1"
+)
+
+
+def job_payload(job: BatchJob) -> str:
+    return json.dumps(
+        {
+            "form": job.form,
+            "submitter": vars(job.submitter),
+            "group": job.group.to_dict(),
+        },
+        sort_keys=True,
+    )
+
+
+def job_from_payload(job_id: int, payload: str) -> BatchJob:
+    data = json.loads(payload)
+    return BatchJob(
+        submitter=SubmitterData(**data["submitter"]),
+        group=GroupData.from_dict(data["group"]),
+        form=data["form"],
+        job_id=job_id,
+    )
+
+
+class JobStore:
+    def __init__(self, path: str | Path | None = None, shared: bool = False):
+        self.path = str(path or state_path(JOB_DB))
+        self._db = sqlite3.connect(
+            self.path, isolation_level=None, timeout=LOCK_TIMEOUT
+        )
+        if shared:
+            # WAL needs memory shared between its users, which hosts using
+            # a database on network storage don't have
+            self._db.execute("PRAGMA journal_mode = DELETE")
+            self._db.execute("PRAGMA synchronous = FULL")
+        else:
+            # WAL with normal sync keeps each state change to a cheap append
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT NOT NULL,"
+            " form TEXT NOT NULL,"
+            " wso_id INTEGER,"
+            " payload TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " note TEXT NOT NULL DEFAULT '',"
+            " updated REAL NOT NULL,"
+            " owner TEXT,"
+            " lease_expires REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_group ON jobs (form, wso_id, id)"
+        )
+
+    def enqueue(self, jobs: Iterable[BatchJob]) -> int:
+        """Add jobs to the store; returns how many were added.
+
+        A job is left out if the latest job for its group and form, be it
+        pending, in flight or submitted, has just the same payload, so a
+        group that changes and then changes back is queued again.  The
+        store can't tell whether a job left in flight had its form
+        submitted; the receipts that `run_batch` checks are what keep such
+        a job from being submitted twice.
+        """
+        added = 0
+        now = time.time()
+        with self._db:
+            self._db.execute("BEGIN")
+            for job in jobs:
+                payload = job_payload(job)
+                key = hashlib.sha256(payload.encode()).hexdigest()
+                latest = self._db.execute(
+                    "SELECT key FROM jobs"
+                    " WHERE form = ? AND wso_id IS ? AND state != ?"
+                    " ORDER BY id DESC LIMIT 1",
+                    (job.form, job.group.wso_id, FAILED),
+                ).fetchone()
+                if latest and latest[0] == key:
+                    continue
+                self._db.execute(
+                    "INSERT INTO jobs (key, form, wso_id, payload, state, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, job.form, job.group.wso_id, payload, PENDING, now),
+                )
+                added += 1
+        return added
+
+    def resume(self, retry_failed: bool = False) -> int:
+        # jobs left in flight, unless a worker still holds a lease on them,
+        # were interrupted: maybe before their form was submitted, maybe
+        # after, in which case their receipt stops a second submission
+        now = time.time()
+        cursor = self._db.execute(
+            "UPDATE jobs SET state = ?, owner = NULL, lease_expires = NULL,"
+            " updated = ?"
+            " WHERE (state = ? AND (lease_expires IS NULL OR lease_expires < ?))"
+            " OR (state = ? AND ?)",
+            (PENDING, now, IN_FLIGHT, now, FAILED, retry_failed),
+        )
+        return cursor.rowcount
+
+    def claim_pending(self) -> Iterator[BatchJob]:
+        """Claim pending jobs, one at a time as the caller pulls them.
+
+        As with `lease_pending`, a job is never claimed while another job
+        for the same group is in flight, so the claims end once the only
+        jobs left wait on their group's.
+        """
+        while True:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                row = self._db.execute(NEXT_PENDING, (PENDING, IN_FLIGHT)).fetchone()
+                if row is None:
+                    return
+                job_id, payload = row
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, updated = ?"
+                    " WHERE id = ?",
+                    (IN_FLIGHT, time.time(), job_id),
+                )
+            yield job_from_payload(job_id, payload)
+
+    def lease_pending(
+        self,
+        owner: str,
+        duration: float = DEFAULT_LEASE,
+        max_deliveries: int = DEFAULT_MAX_DELIVERIES,
+    ) -> Iterator[BatchJob]:
+        """Lease jobs to `owner`, one at a time as the caller pulls them.
+
+        Several workers, on this host or others, can lease from the same
+        store.  A job is never leased while another job for the same group
+        is in flight, and a lease that isn't renewed by `heartbeat` runs
+        out, handing the job to the next worker to ask.  Ends once there
+        is nothing left that can be leased right now.
+        """
+        while True:
+            with self._db:
+                # taking the write lock first makes the pick and the lease
+                # one step for every worker sharing the store
+                self._db.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                self._expire_leases(now, max_deliveries)
+                row = self._db.execute(NEXT_PENDING, (PENDING, IN_FLIGHT)).fetchone()
+                if row is None:
+                    return
+                job_id, payload = row
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, owner = ?,"
+                    " lease_expires = ?, updated = ? WHERE id = ?",
+                    (IN_FLIGHT, owner, now + duration, now, job_id),
+                )
+            yield job_from_payload(job_id, payload)
+
+    def heartbeat(self, owner: str, duration: float = DEFAULT_LEASE) -> int:
+        """Renew all of `owner`'s leases; returns how many it still holds."""
+        now = time.time()
+        cursor = self._db.execute(
+            "UPDATE jobs SET lease_expires = ?"
+            " WHERE state = ? AND owner = ? AND lease_expires >= ?",
+            (now + duration, IN_FLIGHT, owner, now),
+        )
+        return cursor.rowcount
+
+    def _expire_leases(self, now: float, max_deliveries: int):
+        # a job whose leases keep running out is probably what is killing
+        # its workers, so it is only redelivered so many times
+        self._db.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END,"
+            " note = CASE WHEN attempts < ? THEN note ELSE ? END,"
+            " owner = NULL, lease_expires = NULL, updated = ?"
+            " WHERE state = ? AND lease_expires < ?",
+            (
+                max_deliveries,
+                PENDING,
+                FAILED,
+                max_deliveries,
+                f"lease expired {max_deliveries} times",
+                now,
+                IN_FLIGHT,
+                now,
+            ),
+        )
+
+    def finish(self, result: BatchResult, owner: str | None = None) -> bool:
+        """Record a job's outcome; False if `owner` had lost its lease."""
+        if result.job_id is None:
+            return True
+        note = result.error
+        if result.skipped:
+            note = "confirmed earlier" if result.receipt else "unchanged"
+        cursor = self._db.execute(
+            "UPDATE jobs SET state = ?, note = ?, owner = NULL, lease_expires = NULL,"
+            " updated = ? WHERE id = ? AND (? IS NULL OR owner = ?)",
+            (
+                SUBMITTED if result.ok else FAILED,
+                note,
+                time.time(),
+                result.job_id,
+                owner,
+                owner,
+            ),
+        )
+        return cursor.rowcount > 0
+
+    def counts(self) -> dict[str, int]:
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(
+            self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        )
+        return counts
+
+    def close(self):
+        self._db.close()
+
+
+def run_stored_jobs(
+    store: JobStore,
+    workers: int = DEFAULT_WORKERS,
+    snapshots: SnapshotStore | None = None,
+    scheduler: SubmissionScheduler | None = None,
+    profile: SessionProfile | None = None,
+    backend: str = BROWSER_BACKEND,
+    receipts: ReceiptStore | None = None,
+) -> Iterator[BatchResult]:
+    # jobs held back behind an earlier change to their group are claimed in
+    # the next round, once that change is finished
+    while (first := next(claimed := store.claim_pending(), None)) is not None:
+        jobs = itertools.chain((first,), claimed)
+        results = run_batch(
+            jobs, workers, snapshots, scheduler, profile, backend, receipts
+        )
+        for result in results:
+            store.finish(result)
+            yield result
@@ -0,0 +1,184 @@
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+# Process bookkeeping for browsers, read from /proc.  Where there is no
+# /proc (macOS, Windows) sizes are unknown and nothing is reaped.
+
+PROC = Path("/proc")
+# set in the environment of the drivers we start, and so of their Chromes:
+# the pid and start time of the process that started them
+OWNER_VARIABLE = "WSO_REGISTER_OWNER"
+WATCHDOG_INTERVAL = 30.0
+KILL_GRACE = 3.0
+
+
+def processes() -> dict[int, tuple[int, str]]:
+    """Every visible process, as pid: (parent pid, command name)."""
+    table = {}
+    for entry in PROC.glob("[0-9]*"):
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # the name is in parentheses and may itself contain them
+        name = stat[stat.index("(") + 1 : stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2 :].split()
+        table[int(entry.name)] = (int(fields[1]), name)
+    return table
+
+
+def process_tree(pid: int, table: dict | None = None) -> list[int]:
+    table = processes() if table is None else table
+    children: dict[int, list[int]] = {}
+    for child, (parent, _) in table.items():
+        children.setdefault(parent, []).append(child)
+    tree, pending = [], [pid] if pid in table else []
+    while pending:
+        tree.append(current := pending.pop())
+        pending.extend(children.get(current, ()))
+    return tree
+
+
+def process_start(pid: int) -> str | None:
+    # with the pid, tells a process apart from a later one given its pid
+    try:
+        stat = (PROC / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    return stat[stat.rindex(")") + 2 :].split()[19]
+
+
+def owner_marker() -> str:
+    return f"{os.getpid()}:{process_start(os.getpid())}"
+
+
+def browser_environment() -> dict[str, str]:
+    """The environment to start a driver in, marked as ours."""
+    return {**os.environ, OWNER_VARIABLE: owner_marker()}
+
+
+def process_owner(pid: int) -> tuple[int, str] | None:
+    """The pid and start time of whoever started a driver or its Chrome."""
+    try:
+        environment = (PROC / str(pid) / "environ").read_bytes().split(b"\0")
+    except OSError:
+        return None
+    prefix = f"{OWNER_VARIABLE}=".encode()
+    for variable in environment:
+        if variable.startswith(prefix):
+            owner, _, started = variable[len(prefix) :].decode().partition(":")
+            return int(owner), started
+    return None
+
+
+def tree_rss(pid: int) -> int | None:
+    """Resident memory of a process and all its descendants, in bytes."""
+    if not PROC.is_dir():
+        return None
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for member in process_tree(pid):
+        try:
+            total += int((PROC / str(member) / "statm").read_text().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total * page_size
+
+
+def alive(pid: int) -> bool:
+    try:
+        state = (PROC / str(pid) / "stat").read_text()
+    except OSError:
+        return False
+    # zombies are dead, just not yet collected by their parent
+    return state[state.rindex(")") + 2] != "Z"
+
+
+def kill_processes(pids: list[int], grace: float = KILL_GRACE):
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except OSError:
+                pass
+        deadline = time.monotonic() + grace
+        while (pids := [pid for pid in pids if alive(pid)]) and (
+            time.monotonic() < deadline
+        ):
+            time.sleep(0.05)
+        if not pids:
+            return
+
+
+def orphaned_browser_processes() -> list[int]:
+    """Drivers and Chromes this tool started whose starter has gone away."""
+    if not PROC.is_dir():
+        return []
+    uid = os.getuid()
+    orphans = []
+    table = processes()
+    for pid in table:
+        try:
+            if (PROC / str(pid)).stat().st_uid != uid or not alive(pid):
+                continue
+        except OSError:
+            continue
+        if (owner := process_owner(pid)) is None:
+            continue
+        owner_pid, started = owner
+        if owner_pid in table and process_start(owner_pid) == started:
+            continue
+        orphans.extend(process_tree(pid, table))
+    # a marked driver's Chromes are marked too
+    return list(dict.fromkeys(orphans))
+
+
+def reap_orphans() -> int:
+    if orphans := orphaned_browser_processes():
+        kill_processes(orphans)
+    return len(orphans)
+
+
+class Watchdog:
+    """Reaps orphaned browser processes every so often, in the background."""
+
+    def __init__(self, interval: float = WATCHDOG_INTERVAL):
+        self.interval = interval
+        self.reaped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="browser-watchdog", daemon=True
+        )
+
+    def start(self) -> "Watchdog":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reaped += reap_orphans()
+            except Exception:
+                # a bad /proc read mustn't end the watchdog
+                pass
+
+
+_watchdog: Watchdog | None = None
+_watchdog_lock = threading.Lock()
+
+
+def start_watchdog(interval: float = WATCHDOG_INTERVAL) -> Watchdog | None:
+    # one per process, and only where there is something it can do
+    global _watchdog
+    if not PROC.is_dir():
+        return None
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = Watchdog(interval).start()
+        return _watchdog
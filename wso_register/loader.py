@@ -0,0 +1,367 @@
+import csv
+import json
+import re
+import time
+import types
+from dataclasses import MISSING, dataclass, fields
+from pathlib import Path
+from typing import Iterator, TextIO
+from urllib.parse import urlsplit
+
+from .batch import FORMS, PHYSICAL_FORM, VIRTUAL_FORM, BatchJob
+from .wso_data import GroupData, SubmitterData
+
+CSV = "csv"
+JSON_LINES = "jsonl"
+JSON = "json"  # a job list or a meeting-listing (TSML) export
+FORMATS = (CSV, JSON_LINES, JSON)
+
+# what matters in finding where a JSON record that doesn't parse ends
+RECORD_TOKENS = re.compile(r'[][{},"]')
+JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+GROUP_FIELDS = {field.name: field for field in fields(GroupData)}
+REQUIRED_FIELDS = tuple(
+    name
+    for name, field in GROUP_FIELDS.items()
+    if field.default is MISSING and field.default_factory is MISSING
+)
+SUBMITTER_COLUMNS = {
+    "submitter_name": "name",
+    "submitter_phone": "phone",
+    "submitter_email": "email",
+}
+
+# meeting-listing type codes, from the 12 Step Meeting List plugin
+LISTING_PARTICIPANT_TYPES = {
+    "AC": "aca",
+    "LGBTQ": "lgbtqia+",
+    "M": "men",
+    "P": "parent",
+    "POC": "poc",
+    "W": "women",
+    "Y": "youth",
+}
+LISTING_OPTIONS = {
+    "ASL": "asl",
+    "BA": "child-care",
+    "BE": "beginner",
+    "FF": "fragrance-free",
+    "SM": "smoking",
+    "X": "ada",
+}
+LISTING_LANGUAGES = {"FR": "French", "S": "Spanish"}
+LISTING_PLATFORMS = {
+    "zoom.us": "Zoom",
+    "meet.google.com": "Google Meet",
+    "teams.microsoft.com": "Microsoft Teams",
+    "gotomeeting.com": "GoToMeeting",
+    "webex.com": "Webex",
+}
+
+
+class RecordError(ValueError):
+    pass
+
+
+@dataclass(kw_only=True)
+class Rejection:
+    record: int  # line number for CSV and JSON Lines, position otherwise
+    reason: str
+
+
+class RosterLoader:
+    def __init__(
+        self,
+        path: str | Path,
+        submitter: SubmitterData | None = None,
+        form: str = PHYSICAL_FORM,
+        file_format: str | None = None,
+    ):
+        self.path = Path(path)
+        self.submitter = submitter
+        self.form = form
+        self.file_format = file_format or guess_format(self.path)
+        self.accepted = 0
+        self.rejected: list[Rejection] = []
+        self.elapsed = 0.0
+
+    @property
+    def count(self) -> int:
+        return self.accepted + len(self.rejected)
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def __iter__(self) -> Iterator[BatchJob]:
+        start = time.perf_counter()
+        with self.path.open(newline="") as f:
+            for position, record in self._records(f):
+                try:
+                    job = self._job(record)
+                except (RecordError, TypeError, ValueError) as err:
+                    self.rejected.append(Rejection(record=position, reason=str(err)))
+                else:
+                    self.accepted += 1
+                    self.elapsed = time.perf_counter() - start
+                    yield job
+                    # don't charge the consumer's time to the loader
+                    start = time.perf_counter() - self.elapsed
+            self.elapsed = time.perf_counter() - start
+
+    def summary(self) -> str:
+        return (
+            f"{self.count} records in {self.elapsed:.2f}s ({self.rate:.0f}/s): "
+            f"{self.accepted} accepted, {len(self.rejected)} rejected"
+        )
+
+    def _records(self, f: TextIO) -> Iterator[tuple[int, dict]]:
+        if self.file_format == CSV:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, _csv_record(row)
+        elif self.file_format == JSON_LINES:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, _json_record(line)
+        elif self.file_format == JSON:
+            yield from enumerate(iter_json_array(f), start=1)
+        else:
+            raise ValueError(f"Unknown roster format: {self.file_format}")
+
+    def _job(self, record: dict | str) -> BatchJob:
+        if isinstance(record, str):
+            # JSON lines that don't parse are passed on as their error
+            raise RecordError(record)
+        if not isinstance(record, dict):
+            raise RecordError("record is not an object")
+        record = dict(record)
+        form = record.pop("form", None) or self.form
+        if form not in FORMS:
+            raise RecordError(f"unknown form: {form}")
+        if "slug" in record or "types" in record:
+            submitter_data = None
+            group_data = listing_group_data(record)
+        elif isinstance(record.get("group"), dict):
+            submitter_data = record.get("submitter")
+            group_data = record["group"]
+        else:
+            submitter_data = {
+                SUBMITTER_COLUMNS[key]: record.pop(key)
+                for key in list(record)
+                if key in SUBMITTER_COLUMNS and record[key]
+            } or record.pop("submitter", None)
+            group_data = record
+        group = validate_group(group_data)
+        if form == VIRTUAL_FORM and not group.online_platform:
+            raise RecordError("virtual form needs an online platform")
+        if submitter_data:
+            submitter = SubmitterData(**submitter_data)
+        elif self.submitter:
+            submitter = self.submitter
+        else:
+            raise RecordError("no submitter")
+        return BatchJob(submitter=submitter, group=group, form=form)
+
+
+def guess_format(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return CSV
+    if suffix in (".jsonl", ".ndjson"):
+        return JSON_LINES
+    return JSON
+
+
+def validate_group(data: dict) -> GroupData:
+    if unknown := sorted(set(data) - set(GROUP_FIELDS)):
+        raise RecordError(f"unknown fields: {', '.join(unknown)}")
+    if missing := [name for name in REQUIRED_FIELDS if data.get(name) in (None, "")]:
+        raise RecordError(f"missing fields: {', '.join(missing)}")
+    values = {
+        name: _coerce(name, GROUP_FIELDS[name].type, value)
+        for name, value in data.items()
+        if value is not None and value != ""
+    }
+    group = GroupData(**values)
+    if not group.wso_id:
+        raise RecordError("no WSO id")
+    if not 0 <= group.day_of_week <= 6:
+        raise RecordError(f"day_of_week out of range: {group.day_of_week}")
+    if not 0 <= group.start_hour <= 23:
+        raise RecordError(f"start_hour out of range: {group.start_hour}")
+    if not 0 <= group.start_minute <= 59:
+        raise RecordError(f"start_minute out of range: {group.start_minute}")
+    if group.duration <= 0:
+        raise RecordError(f"duration must be positive: {group.duration}")
+    if group.repeat_type not in ("weekly", "monthly"):
+        raise RecordError(f"unknown repeat_type: {group.repeat_type}")
+    return group
+
+
+def _coerce(name: str, field_type, value):
+    if isinstance(field_type, types.UnionType):
+        field_type = next(t for t in field_type.__args__ if t is not type(None))
+    base = getattr(field_type, "__origin__", field_type)
+    if base is set:
+        if isinstance(value, str):
+            value = [item.strip() for item in value.replace(";", ",").split(",")]
+        if not isinstance(value, (list, tuple, set)):
+            raise RecordError(f"{name} must be a list")
+        return {str(item) for item in value if item}
+    if base is bool:
+        if isinstance(value, str):
+            if value.strip().lower() in ("1", "true", "yes", "y"):
+                return True
+            if value.strip().lower() in ("0", "false", "no", "n"):
+                return False
+            raise RecordError(f"{name} must be true or false: {value!r}")
+        return bool(value)
+    if base is int:
+        if isinstance(value, bool):
+            raise RecordError(f"{name} must be a number: {value!r}")
+        try:
+            return int(value)
+        except ValueError:
+            raise RecordError(f"{name} must be a number: {value!r}")
+    return str(value)
+
+
+def _csv_record(row: dict) -> dict | str:
+    if None in row:
+        return f"{len(row[None])} more values than columns"
+    # a short row's missing values come through as None: they're left out,
+    # as empty ones are
+    return {key.strip(): (value or "").strip() for key, value in row.items() if key}
+
+
+def _json_record(line: str) -> dict | str:
+    try:
+        return json.loads(line)
+    except ValueError as err:
+        return f"invalid JSON: {err}"
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator:
+    # a record that doesn't parse comes through as its error, as a JSON
+    # line does, and the records after it are read as usual
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("JSON roster must be an array")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().removeprefix(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        if not buffer:
+            if not (buffer := f.read(chunk_size)):
+                raise ValueError("JSON roster ends in the middle of a record")
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            # cut off at the end of the chunk, or malformed: either way it
+            # ends at the first comma or bracket outside of it
+            scan = [0, 0]
+            while (end := _record_end(buffer, scan)) is None:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise ValueError("JSON roster ends in the middle of a record")
+                buffer += chunk
+            try:
+                item = json.loads(buffer[:end])
+            except ValueError as err:
+                item = f"invalid JSON: {err}"
+        yield item
+        buffer = buffer[end:]
+
+
+def _record_end(buffer: str, scan: list[int]) -> int | None:
+    # `scan` is where the last call got to, and how deep in brackets
+    position, depth = scan
+    while match := RECORD_TOKENS.search(buffer, position):
+        position = match.start()
+        if match[0] == '"':
+            if (string := JSON_STRING.match(buffer, position)) is None:
+                # cut off: scanned again once there's more
+                break
+            position = string.end()
+            continue
+        if match[0] in "[{":
+            depth += 1
+        elif depth == 0 and match[0] in ",]":
+            return position
+        elif match[0] in "]}":
+            depth = max(depth - 1, 0)
+        position += 1
+    else:
+        position = len(buffer)
+    scan[:] = position, depth
+    return None
+
+
+def listing_group_data(meeting: dict) -> dict:
+    codes = set(meeting.get("types") or [])
+    start_hour, start_minute = _listing_time(meeting.get("time"))
+    duration = 60
+    if end_time := meeting.get("end_time"):
+        end_hour, end_minute = _listing_time(end_time)
+        duration = (end_hour * 60 + end_minute - start_hour * 60 - start_minute) % (
+            24 * 60
+        ) or duration
+    data = {
+        "name": meeting.get("name"),
+        "listing_page": meeting.get("url"),
+        "wso_id": meeting.get("wso_id"),
+        "day_of_week": meeting.get("day"),
+        "start_hour": start_hour,
+        "start_minute": start_minute,
+        "duration": duration,
+        "members_only": "C" in codes,
+        "participant_types": {
+            LISTING_PARTICIPANT_TYPES[c]
+            for c in codes
+            if c in LISTING_PARTICIPANT_TYPES
+        },
+        "options": {LISTING_OPTIONS[c] for c in codes if c in LISTING_OPTIONS},
+        "language": next(
+            (LISTING_LANGUAGES[c] for c in codes if c in LISTING_LANGUAGES), None
+        ),
+        "public_email": meeting.get("email"),
+        "location_instructions": meeting.get("location_notes"),
+    }
+    if "TC" not in codes and (address := meeting.get("address")):
+        data.update(
+            physical_location=meeting.get("location") or address,
+            address_street_1=address,
+            address_city=meeting.get("city"),
+            address_state=meeting.get("state"),
+            address_zip=meeting.get("postal_code"),
+            address_country=meeting.get("country"),
+        )
+    if conference_url := meeting.get("conference_url"):
+        host = urlsplit(conference_url).hostname or ""
+        data.update(
+            online_platform=next(
+                (
+                    platform
+                    for domain, platform in LISTING_PLATFORMS.items()
+                    if host == domain or host.endswith("." + domain)
+                ),
+                "Other",
+            ),
+            online_url=conference_url,
+        )
+    return data
+
+
+def _listing_time(value: str | None) -> tuple[int, int]:
+    if not value:
+        raise RecordError("meeting has no time")
+    try:
+        hour, minute = value.split(":")[:2]
+        return int(hour), int(minute)
+    except ValueError:
+        raise RecordError(f"bad meeting time: {value!r}")
@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+STATE_DIR = Path(
+    os.environ.get("WSO_REGISTER_HOME", Path.home() / ".wso_register")
+).expanduser()
+
+
+def state_path(name: str) -> Path:
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    return STATE_DIR / name
@@ -1,303 +1,327 @@
-from datetime import datetime
+import time
+from typing import Collection, Generator, NamedTuple
 
-from selenium.common import TimeoutException
+from selenium.common import (
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.support.ui import WebDriverWait as driverWait
 
-from .setup import chrome_session
+from .fingerprint import FINGERPRINT_SCRIPT, FingerprintCache
+from .form_map import (
+    FORM_URLS,
+    PHYSICAL_GROUP_CHANGE_PLAN,
+    TEMP_VIRTUAL_GROUP_CHANGE_PLAN,
+    FormContext,
+    FormPlan,
+    PlanPage,
+    form_context,
+    require_online,
+    require_registered,
+)
+from .receipts import CONFIRMATIONS
+from .scheduler import AdaptiveTimeouts
+from .script_fill import fill_fields
+from .setup import SessionManager, browser_gone, single_session
+from .tracing import page as trace_page, span
 from .wso_data import GroupData, SubmitterData
 
-RECORDS_ENDPOINT = "https://al-anon.org/for-members/group-resources/group-records"
-PHYSICAL_GROUP_CHANGE_PATH = (
-    "/changes-existing-al-anon-group/group-records-change-form/"
-)
-TEMP_VIRTUAL_GROUP_CHANGE_ENDPOINT = "https://form.jotform.com/201006291804141"
 JOTFORM_TIMEOUT_SECONDS = 5.0
+SUBMIT_TIMEOUT_SECONDS = 20.0
+OUTCOME_RETRY_SECONDS = 0.1  # before looking again for a submission's outcome
+
+# each process learns how long each page takes to appear
+PAGE_TIMEOUTS = AdaptiveTimeouts(default=JOTFORM_TIMEOUT_SECONDS)
+# and how long Jotform takes to answer a submission
+OUTCOME_TIMEOUTS = AdaptiveTimeouts(default=SUBMIT_TIMEOUT_SECONDS)
+
+# What became of a submission: Jotform's thank-you page, once the form's
+# submit button has gone, or the validation errors it showed instead.
+OUTCOME_SCRIPT = """
+const outcome = (submitId, confirmations) => {
+  const shown = el => el.getClientRects().length > 0;
+  const errors = Array.from(document.querySelectorAll(
+      ".form-error-message, .form-button-error"))
+    .filter(shown).map(el => el.textContent.trim()).filter(Boolean);
+  if (errors.length) return {confirmed: false, text: errors.join(" ")};
+  const submit = document.getElementById(submitId);
+  if (submit && shown(submit)) return null;
+  const text = document.body ? document.body.innerText : "";
+  const lower = text.toLowerCase();
+  return confirmations.some(c => lower.includes(c))
+    ? {confirmed: true, text: text.trim()} : null;
+};
+"""
+CHECK_OUTCOME_SCRIPT = OUTCOME_SCRIPT + "return outcome(arguments[0], arguments[1]);"
+# Watches the page until there's an outcome, rather than polling for one.
+# The thank-you page is a new document, which ends the script; it is then
+# started again on that page.
+AWAIT_OUTCOME_SCRIPT = OUTCOME_SCRIPT + """
+const [submitId, confirmations, timeout] = arguments;
+const done = arguments[arguments.length - 1];
+const found = outcome(submitId, confirmations);
+if (found) {
+  done(found);
+} else {
+  const observer = new MutationObserver(() => {
+    const found = outcome(submitId, confirmations);
+    if (found) {
+      observer.disconnect();
+      clearTimeout(timer);
+      done(found);
+    }
+  });
+  observer.observe(document, {
+      childList: true, subtree: true, characterData: true, attributes: true});
+  const timer = setTimeout(() => {
+    observer.disconnect();
+    done(null);
+  }, timeout);
+}
+"""
+# and checks each form's structure the first time it loads it
+FINGERPRINTS = FingerprintCache()
+
+
+class Wait(NamedTuple):
+    """What filling in a form waits for before it can go on."""
+
+    key: str  # for its adaptive timeout and its trace
+    locator: tuple[str, str]
+    frame: bool = False  # switch into it once it's there
+    # for the outcome of submitting the form whose submit button this is
+    outcome: bool = False
+
+    @property
+    def timeouts(self) -> AdaptiveTimeouts:
+        return OUTCOME_TIMEOUTS if self.outcome else PAGE_TIMEOUTS
+
+    def condition(self):
+        if self.outcome:
+            return submission_outcome(self.locator[1])
+        if self.frame:
+            return ec.frame_to_be_available_and_switch_to_it(self.locator)
+        return ec.presence_of_element_located(self.locator)
+
+
+# Filling in a form yields each Wait and is sent back what the wait found,
+# or has the TimeoutException thrown into it; that way one thread can fill
+# in forms in several tabs, going to whichever is ready.  It returns the
+# text of the form's confirmation.
+FormSteps = Generator[Wait, WebElement | dict | bool | None, str | None]
+
+
+def execute_physical_group_change(
+    submitter: SubmitterData,
+    group: GroupData,
+    sessions: SessionManager | None = None,
+    batched: bool = True,
+    sections: Collection[str] | None = None,
+    start_url: str | None = None,
+) -> str | None:
+    require_registered(group)
+    start_url = start_url or FORM_URLS["physical"]
+    with sessions.session() if sessions else single_session() as driver:
+        return complete_physical_group_change(
+            driver, submitter, group, batched, sections, start_url
+        )
 
 
-def execute_physical_group_change(submitter: SubmitterData, group: GroupData):
-    if not group.wso_id:
-        raise ValueError("Cannot submit change form for non-registered group")
-    driver: ChromeDriver = chrome_session(
-        start_url=RECORDS_ENDPOINT + PHYSICAL_GROUP_CHANGE_PATH
+def execute_temporary_virtual_group_change(
+    submitter: SubmitterData,
+    group: GroupData,
+    sessions: SessionManager | None = None,
+    batched: bool = True,
+    start_url: str | None = None,
+) -> str | None:
+    require_online(group)
+    start_url = start_url or FORM_URLS["virtual"]
+    with sessions.session() if sessions else single_session() as driver:
+        return complete_temporary_virtual_group_change(
+            driver, submitter, group, batched, start_url
+        )
+
+
+def complete_physical_group_change(
+    driver: ChromeDriver,
+    submitter: SubmitterData,
+    group: GroupData,
+    batched: bool = True,
+    sections: Collection[str] | None = None,
+    start_url: str | None = None,
+) -> str | None:
+    context = form_context(group, submitter, sections=sections)
+    return fill_form(driver, PHYSICAL_GROUP_CHANGE_PLAN, context, batched, start_url)
+
+
+def complete_temporary_virtual_group_change(
+    driver: ChromeDriver,
+    submitter: SubmitterData,
+    group: GroupData,
+    batched: bool = True,
+    start_url: str | None = None,
+) -> str | None:
+    context = form_context(group, submitter)
+    return fill_form(
+        driver, TEMP_VIRTUAL_GROUP_CHANGE_PLAN, context, batched, start_url
     )
+
+
+def fill_form(
+    driver: ChromeDriver,
+    plan: FormPlan,
+    context: FormContext,
+    batched: bool = True,
+    url: str | None = None,
+) -> str | None:
+    return run_steps(driver, form_steps(driver, plan, context, batched, url))
+
+
+def run_steps(driver: ChromeDriver, steps: FormSteps) -> str | None:
+    # with a form to itself, the browser can simply block on each wait
+    found, error = None, None
+    while True:
+        try:
+            wait = steps.throw(error) if error else steps.send(found)
+        except StopIteration as stop:
+            return stop.value
+        found, error = None, None
+        try:
+            if wait.outcome:
+                found = await_outcome(driver, wait)
+            else:
+                found = wait_for(driver, wait.key, wait.condition())
+        except TimeoutException as err:
+            error = err
+
+
+def form_steps(
+    driver: ChromeDriver,
+    plan: FormPlan,
+    context: FormContext,
+    batched: bool = True,
+    url: str | None = None,
+) -> FormSteps:
+    with span("fill_form", plan.name):
+        if url:
+            yield from load_form(driver, plan, url)
+        else:
+            yield from switch_to_form(plan)
+        page = None
+        for page in plan.active_pages(context):
+            yield from fill_page(driver, page, context, batched)
+        if page is plan.pages[-1] and page.click:
+            return (yield from confirm_submission(plan, page))
+
+
+def load_form(driver: ChromeDriver, plan: FormPlan, url: str) -> FormSteps:
+    # "page ready" runs from asking for the page to its first field appearing
+    first_page = plan.pages[0].wait_id
+    with span("page_ready", plan.name):
+        driver.get(url)
+        yield from switch_to_form(plan)
+        try:
+            yield Wait(first_page, (By.ID, first_page))
+        except TimeoutException:
+            raise ReferenceError(f"{plan.name} form at {url} never showed {first_page}")
+    if not FINGERPRINTS.verified(url):
+        verify_form(driver, plan, url)
+
+
+def switch_to_form(plan: FormPlan) -> FormSteps:
+    if not plan.frame_title:
+        return
     try:
-        driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-            ec.frame_to_be_available_and_switch_to_it(
-                (By.XPATH, "//*[@title='Group Records Change']")
-            )
-        )
+        yield Wait("frame", (By.XPATH, f"//*[@title='{plan.frame_title}']"), True)
     except TimeoutException:
         raise ReferenceError(
-            "Group Records Change page doesn't have the correct structure"
+            f"{plan.frame_title} page doesn't have the correct structure"
         )
-    fill_physical_group_change_header(driver, group)
-    fill_physical_group_change_status(driver, group)
-    fill_physical_group_change_summary(driver, group)
-    fill_physical_group_change_name(driver, group)
-    fill_physical_group_change_participants(driver, group)
-    fill_physical_group_change_public_phone(driver, group)
-    fill_physical_group_change_details(driver, group)
-    if group.has_cma():
-        fill_physical_group_change_cma(driver, group)
-    if group.has_gr():
-        fill_physical_group_change_gr(driver, group)
-    submit_physical_group_change(driver, submitter)
-    driver.close()
-
-
-def execute_temporary_virtual_group_change(submitter: SubmitterData, group: GroupData):
-    if not group.wso_id:
-        raise ValueError("Cannot submit change form for non-registered group")
-    if not group.online_platform:
-        raise ValueError("Cannot submit virtual change form for a non-online group")
-    driver: ChromeDriver = chrome_session(start_url=TEMP_VIRTUAL_GROUP_CHANGE_ENDPOINT)
-    fill_virtual_group_change(driver, group)
-    submit_physical_group_change(driver, submitter)
-    driver.close()
-
-
-def fill_physical_group_change_header(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_97"))
-    )
-    group_name = driver.find_element(By.ID, "input_156")
-    group_name.send_keys(group.name)
-    wso_id_number = driver.find_element(By.ID, "input_13")
-    wso_id_number.send_keys(group.wso_id)
-    district_number = driver.find_element(By.ID, "input_16")
-    district_number.send_keys("26")
-    area_name = driver.find_element(By.ID, "input_17")
-    area_name.send_keys("California North")
-    next_button.click()
-
-
-def fill_physical_group_change_status(driver: ChromeDriver, _group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_98"))
-    )
-    status_change = driver.find_element(
-        By.XPATH, "//input[@type='radio' and @value='Change']"
-    )
-    status_change.click()
-    change_effective_date = driver.find_element(By.ID, "lite_mode_96")
-    change_effective_date.send_keys(datetime.today().strftime("%m-%d-%Y"))
-    next_button.click()
 
 
-def fill_physical_group_change_summary(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_19"))
-    )
-    name_address_change = driver.find_element(By.ID, "input_102_0")
-    participant_change = driver.find_element(By.ID, "input_102_1")
-    contact_change = driver.find_element(By.ID, "input_102_2")
-    details_change = driver.find_element(By.ID, "input_102_3")
-    cma_change = driver.find_element(By.ID, "input_102_4")
-    gr_change = driver.find_element(By.ID, "input_102_5")
-    name_address_change.click()
-    participant_change.click()
-    contact_change.click()
-    details_change.click()
-    if group.has_cma():
-        cma_change.click()
-    if group.has_gr():
-        gr_change.click()
-    next_button.click()
-
-
-def fill_physical_group_change_name(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_116"))
-    )
-    group_name = driver.find_element(By.ID, "input_21")
-    group_name.send_keys(group.name)
-    language_radio = driver.find_element(
-        By.XPATH, f"//input[@type='radio' and @value='{group.wso_language()}']"
-    )
-    language_radio.click()
-    meeting_place = driver.find_element(By.ID, "input_23")
-    meeting_place.send_keys(group.wso_meeting_place())
-    address_line_1 = driver.find_element(By.ID, "input_24_addr_line1")
-    address_line_1.send_keys(group.address_street_1)
-    address_line_2 = driver.find_element(By.ID, "input_24_addr_line2")
-    address_line_2.send_keys(group.address_street_2)
-    address_city = driver.find_element(By.ID, "input_80")
-    address_city.send_keys(group.wso_city())
-    address_state = driver.find_element(By.ID, "input_81")
-    address_state.send_keys(group.wso_state())
-    address_zip = driver.find_element(By.ID, "input_82")
-    address_zip.send_keys(group.wso_zip())
-    address_country = driver.find_element(By.ID, "input_83")
-    address_country.send_keys(group.wso_country())
-    address_email = driver.find_element(By.ID, "input_25")
-    address_email.send_keys(group.public_email)
-    next_button.click()
-
-
-def fill_physical_group_change_participants(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_134"))
-    )
-    if wso_pt := group.wso_participant_type():
-        checkbox = driver.find_element(
-            By.XPATH, f"//input[@type='checkbox' and @value='{wso_pt}']"
-        )
-        checkbox.click()
-    next_button.click()
+def fill_page(
+    driver: ChromeDriver, page: PlanPage, context: FormContext, batched: bool = True
+) -> FormSteps:
+    with trace_page(page.name), span("fill_page", page.name):
+        ready = yield Wait(page.wait_id, (By.ID, page.wait_id))
+        next_button = ready if page.click else None
+        fill_fields(driver, page.render(context), next_button, batched)
 
 
-def fill_physical_group_change_public_phone(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_135"))
-    )
-    if wso_pt := group.wso_participant_type():
-        checkbox = driver.find_element(
-            By.XPATH, f"//input[@type='checkbox' and @value='{wso_pt}']"
-        )
-        checkbox.click()
-    next_button.click()
+def confirm_submission(plan: FormPlan, page: PlanPage) -> FormSteps:
+    # the last page's button submitted the form; Jotform answers with a
+    # thank-you page or with validation errors
+    with span("confirm", plan.name):
+        try:
+            outcome = yield Wait(
+                f"submit:{plan.name}", (By.ID, page.wait_id), outcome=True
+            )
+        except TimeoutException:
+            # it may yet have gone through, so this isn't worth a retry
+            raise RuntimeError(f"{plan.name} form didn't confirm the submission")
+    if not outcome["confirmed"]:
+        raise ValueError(f"{plan.name} form rejected the submission: {outcome['text']}")
+    return outcome["text"]
 
 
-def fill_physical_group_change_details(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_133"))
-    )
-    wso_day, wso_hour, wso_minute, wso_am_pm = group.wso_schedule()
-    day_menu = driver.find_element(By.ID, "input_30")
-    day_menu.send_keys(wso_day)
-    start_hour_menu = driver.find_element(By.ID, "input_31")
-    start_hour_menu.send_keys(wso_hour)
-    start_minute_menu = driver.find_element(By.ID, "input_32")
-    start_minute_menu.send_keys(wso_minute)
-    am_pm_menu = driver.find_element(By.ID, "input_33")
-    am_pm_menu.send_keys(wso_am_pm)
-    attendees_radio = driver.find_element(
-        By.XPATH, f"//input[@type='radio' and @value='{group.wso_attendees()}']"
-    )
-    attendees_radio.click()
-    language_text = driver.find_element(By.ID, "input_78")
-    language_text.send_keys(group.wso_language(False))
-    member_count = driver.find_element(By.ID, "input_47")
-    member_count.send_keys("")
-    for wso_option in group.wso_options():
-        checkbox = driver.find_element(
-            By.XPATH, f"//input[@type='checkbox' and @value='{wso_option}']"
-        )
-        checkbox.click()
-    location_instructions = driver.find_element(By.ID, "input_39")
-    location_instructions.send_keys(group.wso_location())
-    next_button.click()
+def submission_outcome(submit_id: str):
+    # an expected condition, as for WebDriverWait
+    def condition(driver: ChromeDriver) -> dict | None:
+        return driver.execute_script(CHECK_OUTCOME_SCRIPT, submit_id, CONFIRMATIONS)
 
+    return condition
 
-def fill_physical_group_change_cma(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_64"))
-    )
-    first_name = driver.find_element(By.ID, "first_66")
-    first_name.send_keys(group.cma_first_name)
-    last_name = driver.find_element(By.ID, "last_66")
-    last_name.send_keys(group.cma_last_name)
-    street_address_1 = driver.find_element(By.ID, "input_67_addr_line1")
-    street_address_1.send_keys(group.cma_street_address_1)
-    street_address_2 = driver.find_element(By.ID, "input_67_addr_line2")
-    street_address_2.send_keys(group.cma_street_address_2)
-    city = driver.find_element(By.ID, "input_84")
-    city.send_keys(group.cma_city)
-    state = driver.find_element(By.ID, "input_85")
-    state.send_keys(group.cma_state)
-    zip_field = driver.find_element(By.ID, "input_86")
-    zip_field.send_keys(group.cma_zip)
-    country = driver.find_element(By.ID, "input_87")
-    country.send_keys(group.wso_cma_country())
-    area, number = group.wso_cma_phone()
-    phone_area = driver.find_element(By.ID, "input_68_area")
-    phone_area.send_keys(area)
-    phone_number = driver.find_element(By.ID, "input_68_phone")
-    phone_number.send_keys(number)
-    email = driver.find_element(By.ID, "input_69")
-    email.send_keys(group.cma_email)
-    next_button.click()
-
-
-def fill_physical_group_change_gr(driver: ChromeDriver, group: GroupData):
-    next_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "form-pagebreak-next_148"))
-    )
-    first_name = driver.find_element(By.ID, "first_74")
-    first_name.send_keys(group.gr_first_name)
-    last_name = driver.find_element(By.ID, "last_74")
-    last_name.send_keys(group.gr_last_name)
-    street_address_1 = driver.find_element(By.ID, "input_73_addr_line1")
-    street_address_1.send_keys(group.gr_street_address_1)
-    street_address_2 = driver.find_element(By.ID, "input_73_addr_line2")
-    street_address_2.send_keys(group.gr_street_address_2)
-    city = driver.find_element(By.ID, "input_88")
-    city.send_keys(group.gr_city)
-    state = driver.find_element(By.ID, "input_89")
-    state.send_keys(group.gr_state)
-    zip_field = driver.find_element(By.ID, "input_90")
-    zip_field.send_keys(group.gr_zip)
-    country = driver.find_element(By.ID, "input_91")
-    country.send_keys(group.wso_gr_country())
-    area, number = group.wso_gr_phone()
-    phone_area = driver.find_element(By.ID, "input_72_area")
-    phone_area.send_keys(area)
-    phone_number = driver.find_element(By.ID, "input_72_phone")
-    phone_number.send_keys(number)
-    email = driver.find_element(By.ID, "input_71")
-    email.send_keys(group.gr_email)
-    comments = driver.find_element(By.ID, "input_95")
-    comments.send_keys(group.gr_comment)
-    next_button.click()
-
-
-def submit_physical_group_change(driver: ChromeDriver, submitter: SubmitterData):
-    submit_button = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "input_2"))
-    )
-    submitted_by = driver.find_element(By.ID, "input_43")
-    submitted_by.send_keys(submitter.name)
-    submit_date = driver.find_element(By.ID, "lite_mode_44")
-    submit_date.send_keys(datetime.today().strftime("%m-%d-%Y"))
-    area, number = submitter.wso_phone()
-    phone_area = driver.find_element(By.ID, "input_45_area")
-    phone_area.send_keys(area)
-    phone_number = driver.find_element(By.ID, "input_45_phone")
-    phone_number.send_keys(number)
-    email = driver.find_element(By.ID, "input_46")
-    email.send_keys(submitter.email)
-    submit_button.click()
-
-
-def fill_virtual_group_change(driver: ChromeDriver, group: GroupData):
-    wso_id_number = driverWait(driver, JOTFORM_TIMEOUT_SECONDS).until(
-        ec.presence_of_element_located((By.ID, "input_13"))
-    )
-    wso_id_number.send_keys(group.wso_id)
-    group_name = driver.find_element(By.ID, "input_112")
-    group_name.send_keys(group.name)
-    address_city = driver.find_element(By.ID, "input_113")
-    address_city.send_keys(group.wso_city())
-    address_state = driver.find_element(By.ID, "input_114")
-    address_state.send_keys(group.wso_state())
-    district_number = driver.find_element(By.ID, "input_16")
-    district_number.send_keys("26")
-    area_name = driver.find_element(By.ID, "input_17")
-    area_name.send_keys("California North")
-    status_change = driver.find_element(
-        By.XPATH, "//input[@type='radio' and @value='Change']"
-    )
-    status_change.click()
-    change_effective_date = driver.find_element(By.ID, "lite_mode_96")
-    change_effective_date.send_keys(datetime.today().strftime("%m-%d-%Y"))
-    platform_name = driver.find_element(By.ID, "input_23")
-    platform_name.send_keys(group.online_platform)
-    meeting_info = driver.find_element(By.ID, "input_141")
-    meeting_info.send_keys(
-        f"This meeting meets {group.meeting_type()}.\n\n"
-        f"All details are at: {group.listing_page}"
-    )
-    pass
+
+def await_outcome(driver: ChromeDriver, wait: Wait) -> dict:
+    timeout = wait.timeouts.timeout(wait.key)
+    start = time.monotonic()
+    with span("wait", wait.key):
+        while (remaining := start + timeout - time.monotonic()) > 0:
+            try:
+                outcome = driver.execute_async_script(
+                    AWAIT_OUTCOME_SCRIPT,
+                    wait.locator[1],
+                    CONFIRMATIONS,
+                    int(remaining * 1000),
+                )
+            except (InvalidSessionIdException, NoSuchWindowException):
+                raise
+            except WebDriverException:
+                # the thank-you page replacing the form ends the script
+                # early, and is worth another look once it's in; a browser
+                # that has gone away isn't
+                if browser_gone(driver):
+                    raise
+                time.sleep(OUTCOME_RETRY_SECONDS)
+                continue
+            if outcome:
+                wait.timeouts.observe(wait.key, time.monotonic() - start)
+                return outcome
+    wait.timeouts.observe(wait.key, timeout)
+    raise TimeoutException(f"No outcome for {wait.key}")
+
+
+def verify_form(driver: ChromeDriver, plan: FormPlan, url: str):
+    # a renamed field fails here, not after waiting out its page's timeout
+    with span("verify_form", plan.name):
+        FINGERPRINTS.check(url, plan, driver.execute_script(FINGERPRINT_SCRIPT))
+
+
+def wait_for(driver: ChromeDriver, key: str, condition):
+    timeout = PAGE_TIMEOUTS.timeout(key)
+    start = time.monotonic()
+    try:
+        with span("wait", key):
+            result = driverWait(driver, timeout).until(condition)
+    except TimeoutException:
+        # a timeout is a latency of at least that long
+        PAGE_TIMEOUTS.observe(key, timeout)
+        raise
+    PAGE_TIMEOUTS.observe(key, time.monotonic() - start)
+    return result
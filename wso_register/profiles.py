@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+
+# browsers are replaced after this many forms, or once they grow this big
+DEFAULT_MAX_USES = 200
+DEFAULT_MAX_RSS_MB = 1024
+
+# Resources the forms don't need: anything matching these URL patterns is
+# never fetched by a lean session.
+NON_ESSENTIAL_RESOURCES = (
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.webp",
+    "*.svg",
+    "*.ico",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.mp4",
+    "*.webm",
+    "*.mp3",
+)
+THIRD_PARTY_HOSTS = (
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+    "*facebook.net*",
+    "*facebook.com/tr*",
+    "*hotjar.com*",
+    "*youtube.com*",
+    "*ytimg.com*",
+    "*vimeo.com*",
+    "*twitter.com*",
+    "*addtoany.com*",
+    "*gravatar.com*",
+)
+
+
+@dataclass(kw_only=True, frozen=True)
+class SessionProfile:
+    name: str
+    headless: bool = False
+    page_load_strategy: str = "normal"  # or "eager": don't wait for subresources
+    block_images: bool = False
+    blocked_urls: tuple[str, ...] = ()
+    # copy each session's profile from one Chrome has already initialized
+    user_data_template: bool = False
+    arguments: tuple[str, ...] = ()
+    max_uses: int | None = DEFAULT_MAX_USES
+    max_rss_mb: int | None = DEFAULT_MAX_RSS_MB
+
+
+DEFAULT_PROFILE = SessionProfile(name="default")
+LEAN_PROFILE = SessionProfile(
+    name="lean",
+    headless=True,
+    page_load_strategy="eager",
+    block_images=True,
+    blocked_urls=NON_ESSENTIAL_RESOURCES + THIRD_PARTY_HOSTS,
+    user_data_template=True,
+    arguments=(
+        "--disable-extensions",
+        "--disable-background-networking",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-sync",
+        "--metrics-recording-only",
+        "--mute-audio",
+        "--no-first-run",
+        "--window-size=1280,1024",
+    ),
+)
+PROFILES = {profile.name: profile for profile in (DEFAULT_PROFILE, LEAN_PROFILE)}
+
+
+def session_profile(name: str | None) -> SessionProfile:
+    if name is None:
+        return DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown session profile: {name}")
@@ -0,0 +1,154 @@
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Collection
+
+from .form_map import FORM_PLANS, form_context
+from .paths import state_path
+from .roster import RosterRow
+from .wso_data import GroupData, SubmitterData
+
+RECEIPT_DB = "receipts.db"
+# what Jotform's thank-you pages say, in lower case
+CONFIRMATIONS = ("thank you", "thankyou", "submission has been received")
+MAX_CONFIRMATION_LENGTH = 500
+
+
+@dataclasses.dataclass(kw_only=True)
+class Receipt:
+    wso_id: int
+    form: str
+    name: str
+    confirmation: str  # the thank-you page's text
+    confirmed_at: float  # seconds since the epoch
+    elapsed: float  # from starting on the form to its confirmation
+    digest: str  # of what was submitted
+
+
+def submission_digest(
+    form: str,
+    submitter: SubmitterData,
+    group: GroupData | RosterRow,
+    sections: Collection[str] | None = None,
+) -> str:
+    # what the form is filled in with, less the date, so a resubmission
+    # matches
+    plan = FORM_PLANS[form]
+    context = form_context(group, submitter, today="", sections=sections)
+    values = [
+        [page.name, [[field.target, field.value] for field in page.render(context)]]
+        for page in plan.active_pages(context)
+    ]
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def make_receipt(
+    form: str,
+    submitter: SubmitterData,
+    group: GroupData,
+    sections: Collection[str] | None,
+    confirmation: str,
+    elapsed: float,
+) -> Receipt:
+    return Receipt(
+        wso_id=group.wso_id,
+        form=form,
+        name=group.name,
+        confirmation=" ".join(confirmation.split())[:MAX_CONFIRMATION_LENGTH],
+        confirmed_at=time.time(),
+        elapsed=elapsed,
+        digest=submission_digest(form, submitter, group, sections),
+    )
+
+
+class ReceiptStore:
+    """Confirmed submissions, so a later run needn't make them again.
+
+    With `skip_confirmed` off, receipts are still recorded but a change
+    that was confirmed before is submitted again.
+    """
+
+    def __init__(self, path: str | Path | None = None, skip_confirmed: bool = True):
+        self.path = str(path or state_path(RECEIPT_DB))
+        self.skip_confirmed = skip_confirmed
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS receipts ("
+            " wso_id INTEGER NOT NULL,"
+            " form TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " confirmation TEXT NOT NULL,"
+            " confirmed_at REAL NOT NULL,"
+            " elapsed REAL NOT NULL,"
+            " PRIMARY KEY (wso_id, form, digest))"
+        )
+        self._db.commit()
+
+    def record(self, receipt: Receipt):
+        self._db.execute(
+            "INSERT OR REPLACE INTO receipts"
+            " (wso_id, form, digest, name, confirmation, confirmed_at, elapsed)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                receipt.wso_id,
+                receipt.form,
+                receipt.digest,
+                receipt.name,
+                receipt.confirmation,
+                receipt.confirmed_at,
+                receipt.elapsed,
+            ),
+        )
+        self._db.commit()
+
+    def confirmed(
+        self,
+        form: str,
+        submitter: SubmitterData,
+        group: GroupData | RosterRow,
+        sections: Collection[str] | None = None,
+    ) -> Receipt | None:
+        """The latest receipt for the group, if it was for just this change."""
+        row = self._db.execute(
+            "SELECT wso_id, form, name, confirmation, confirmed_at, elapsed, digest"
+            " FROM receipts WHERE wso_id = ? AND form = ?"
+            " ORDER BY confirmed_at DESC LIMIT 1",
+            (group.wso_id, form),
+        ).fetchone()
+        if row is None:
+            return None
+        receipt = self._receipt(row)
+        # an older receipt for it doesn't count once the group has changed
+        # since: the form now says something else
+        if receipt.digest != submission_digest(form, submitter, group, sections):
+            return None
+        return receipt
+
+    def receipts(self, wso_id: int | None = None) -> list[Receipt]:
+        rows = self._db.execute(
+            "SELECT wso_id, form, name, confirmation, confirmed_at, elapsed, digest"
+            " FROM receipts WHERE ? IS NULL OR wso_id = ?"
+            " ORDER BY confirmed_at",
+            (wso_id, wso_id),
+        )
+        return [self._receipt(row) for row in rows]
+
+    def close(self):
+        self._db.close()
+
+    @staticmethod
+    def _receipt(row) -> Receipt:
+        wso_id, form, name, confirmation, confirmed_at, elapsed, digest = row
+        return Receipt(
+            wso_id=wso_id,
+            form=form,
+            name=name,
+            confirmation=confirmation,
+            confirmed_at=confirmed_at,
+            elapsed=elapsed,
+            digest=digest,
+        )
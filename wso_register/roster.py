@@ -0,0 +1,203 @@
+import sys
+from array import array
+from dataclasses import fields
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from .wso_data import (
+    GroupData,
+    wso_country,
+    wso_language,
+    wso_options,
+    wso_participant_type,
+    wso_phone,
+    wso_schedule,
+)
+
+# plain ints and bools are packed into arrays, everything else is a list
+ARRAY_TYPECODES = {int: "l", bool: "b"}
+GROUP_FIELD_TYPES = {field.name: field.type for field in fields(GroupData)}
+SET_FIELDS = ("participant_types", "options")
+ROSTER_CHUNK_SIZE = 200  # groups normalized together
+
+Job = TypeVar("Job")
+
+
+class GroupRoster:
+    """Many groups stored column by column, with their WSO values precomputed."""
+
+    __slots__ = ("_columns", "_normalized", "_normalized_size", "_size")
+
+    def __init__(self, groups: Iterable[GroupData] = ()):
+        self._columns: dict[str, array | list] = {
+            name: (
+                array(ARRAY_TYPECODES[field_type])
+                if field_type in ARRAY_TYPECODES
+                else []
+            )
+            for name, field_type in GROUP_FIELD_TYPES.items()
+        }
+        self._normalized: dict[str, list] = {
+            name: [] for name in (*NORMALIZERS, *ROW_CHECKS)
+        }
+        self._normalized_size = 0
+        self._size = 0
+        self.extend(groups)
+
+    def append(self, group: GroupData):
+        for name, column in self._columns.items():
+            value = getattr(group, name)
+            if isinstance(value, str):
+                # rosters repeat the same cities, states and platforms a lot
+                value = sys.intern(value)
+            elif name in SET_FIELDS and value is not None:
+                value = frozenset(value)
+            column.append(value)
+        self._size += 1
+
+    def extend(self, groups: Iterable[GroupData]):
+        for group in groups:
+            self.append(group)
+
+    def normalize(self):
+        """Compute the WSO values of every group added since the last call."""
+        start, self._normalized_size = self._normalized_size, self._size
+        if start == self._size:
+            return
+        for name, (normalizer, columns) in NORMALIZERS.items():
+            cache = {}
+            values = self._normalized[name]
+            for key in zip(*(self._columns[column][start:] for column in columns)):
+                if (value := cache.get(key, cache)) is cache:
+                    value = cache[key] = normalizer(*key)
+                values.append(value)
+        rows = [RosterRow(self, index) for index in range(start, self._size)]
+        for name, check in ROW_CHECKS.items():
+            self._normalized[name].extend(bool(check(row)) for row in rows)
+
+    def group(self, index: int) -> GroupData:
+        values = {name: column[index] for name, column in self._columns.items()}
+        for name in SET_FIELDS:
+            if values[name] is not None:
+                values[name] = set(values[name])
+        for name, field_type in GROUP_FIELD_TYPES.items():
+            if field_type is bool:
+                values[name] = bool(values[name])
+        return GroupData(**values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> "RosterRow":
+        if not -self._size <= index < self._size:
+            raise IndexError("roster index out of range")
+        self.normalize()
+        return RosterRow(self, index % self._size)
+
+    def __iter__(self) -> Iterator["RosterRow"]:
+        self.normalize()
+        return (RosterRow(self, index) for index in range(self._size))
+
+
+# normalized columns: the function that computes each and the columns it needs
+NORMALIZERS: dict[str, tuple[Callable, tuple[str, ...]]] = {
+    "schedule": (wso_schedule, ("day_of_week", "start_hour", "start_minute")),
+    "language": (wso_language, ("language",)),
+    "language_text": (lambda language: wso_language(language, False), ("language",)),
+    "country": (wso_country, ("address_country",)),
+    "participant_type": (wso_participant_type, ("participant_types",)),
+    "options": (lambda options: frozenset(wso_options(options)), ("options",)),
+    "cma_phone": (wso_phone, ("cma_phone",)),
+    "gr_phone": (wso_phone, ("gr_phone",)),
+}
+# these need several columns, and the normalized ones above, so run per row
+ROW_CHECKS = {"has_cma": GroupData.has_cma, "has_gr": GroupData.has_gr}
+
+
+class RosterRow:
+    """A GroupData look-alike that reads one row of a normalized roster."""
+
+    __slots__ = ("_roster", "_index")
+
+    def __init__(self, roster: GroupRoster, index: int):
+        self._roster = roster
+        self._index = index
+
+    def _normalized(self, name: str):
+        return self._roster._normalized[name][self._index]
+
+    def wso_language(self, is_restricted: bool = True) -> str:
+        return self._normalized("language" if is_restricted else "language_text")
+
+    def wso_country(self) -> str:
+        return self._normalized("country")
+
+    def wso_participant_type(self) -> str | None:
+        return self._normalized("participant_type")
+
+    def wso_schedule(self) -> (str, str, str, str):
+        return self._normalized("schedule")
+
+    def wso_options(self) -> frozenset[str]:
+        return self._normalized("options")
+
+    def has_cma(self) -> bool:
+        return self._normalized("has_cma")
+
+    def wso_cma_country(self) -> str:
+        return self._normalized("country")
+
+    def wso_cma_phone(self) -> (str, str):
+        return self._normalized("cma_phone")
+
+    def has_gr(self) -> bool:
+        return self._normalized("has_gr")
+
+    def wso_gr_country(self) -> str:
+        return self._normalized("country")
+
+    def wso_gr_phone(self) -> (str, str):
+        return self._normalized("gr_phone")
+
+    # the rest are cheap enough to share with GroupData
+    meeting_type = GroupData.meeting_type
+    wso_meeting_place = GroupData.wso_meeting_place
+    wso_city = GroupData.wso_city
+    wso_state = GroupData.wso_state
+    wso_zip = GroupData.wso_zip
+    wso_attendees = GroupData.wso_attendees
+    wso_location = GroupData.wso_location
+
+    def group(self) -> GroupData:
+        return self._roster.group(self._index)
+
+
+def _column_property(name: str, field_type) -> property:
+    if field_type is bool:
+        return property(lambda row: bool(row._roster._columns[name][row._index]))
+    return property(lambda row: row._roster._columns[name][row._index])
+
+
+for _name, _type in GROUP_FIELD_TYPES.items():
+    setattr(RosterRow, _name, _column_property(_name, _type))
+
+
+def roster_rows(groups: list[GroupData]) -> list["RosterRow | GroupData"]:
+    """The groups as rows of one roster, normalized together.
+
+    If any of them can't be normalized, the groups are returned as they
+    are, so the bad one fails on its own when its form is rendered.
+    """
+    try:
+        return list(GroupRoster(groups))
+    except Exception:
+        return list(groups)
+
+
+def job_rows(
+    jobs: Iterable[Job], chunk_size: int = ROSTER_CHUNK_SIZE
+) -> Iterator[tuple[Job, "RosterRow | GroupData"]]:
+    """Each job with its group's roster row, a chunk of jobs at a time."""
+    jobs = iter(jobs)
+    while chunk := list(islice(jobs, chunk_size)):
+        yield from zip(chunk, roster_rows([job.group for job in chunk]))
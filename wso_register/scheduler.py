@@ -0,0 +1,149 @@
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+
+DEFAULT_RATE = 1.0  # submissions per second
+MIN_RATE = 0.05
+MAX_RATE = 20.0
+DEFAULT_MAX_ATTEMPTS = 4
+
+
+class TokenBucket:
+    """A token bucket whose rate rises with success and halves on failure."""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: float = 1.0,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        cooldown: float = 10.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.cooldown = cooldown
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._last_throttle = float("-inf")
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def delay(self) -> float:
+        self._refill()
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self._tokens -= 1
+
+    def acquire(self):
+        while (delay := self.delay()) > 0:
+            time.sleep(delay)
+        self.take()
+
+    # additive increase, multiplicative decrease, as in TCP congestion control
+    def succeeded(self):
+        self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def throttled(self):
+        # failures in one burst all report the same overload, so only
+        # back off once for them
+        now = time.monotonic()
+        if now - self._last_throttle >= self.cooldown:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._last_throttle = now
+
+
+class Backoff:
+    def __init__(self, base: float = 2.0, cap: float = 120.0):
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt: int) -> float:
+        # "full jitter": spread retries over the whole backoff window
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+
+class AdaptiveTimeouts:
+    """Per-page timeouts that track a high percentile of observed latency."""
+
+    def __init__(
+        self,
+        default: float,
+        floor: float = 2.0,
+        ceiling: float = 30.0,
+        percentile: float = 0.99,
+        headroom: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+    ):
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+        self._timeouts: dict[str, float] = {}
+
+    def timeout(self, key: str) -> float:
+        return self._timeouts.get(key, self.default)
+
+    def observe(self, key: str, seconds: float):
+        samples = self._samples.setdefault(key, deque(maxlen=self.window))
+        samples.append(seconds)
+        if len(samples) >= self.min_samples:
+            ordered = sorted(samples)
+            index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+            self._timeouts[key] = min(
+                self.ceiling, max(self.floor, ordered[index] * self.headroom)
+            )
+
+
+class SubmissionScheduler:
+    def __init__(
+        self,
+        bucket: TokenBucket | None = None,
+        backoff: Backoff | None = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.bucket = bucket or TokenBucket()
+        self.backoff = backoff or Backoff()
+        self.max_attempts = max_attempts
+        self._retries: list[tuple[float, int, object]] = []
+        self._sequence = itertools.count()
+
+    def retry(self, job) -> bool:
+        """Schedule another attempt at a job, if it has any left."""
+        if job.attempt + 1 >= self.max_attempts:
+            return False
+        job.attempt += 1
+        ready = time.monotonic() + self.backoff.delay(job.attempt)
+        heapq.heappush(self._retries, (ready, next(self._sequence), job))
+        return True
+
+    def ready_retry(self):
+        if self._retries and self._retries[0][0] <= time.monotonic():
+            return heapq.heappop(self._retries)[2]
+        return None
+
+    def has_retries(self) -> bool:
+        return bool(self._retries)
+
+    def wait_timeout(self, more_jobs: bool) -> float | None:
+        """How long until there is both a job to start and a token to start it."""
+        if more_jobs:
+            ready_in = 0.0
+        elif self._retries:
+            ready_in = max(0.0, self._retries[0][0] - time.monotonic())
+        else:
+            return None
+        return max(ready_in, self.bucket.delay())
@@ -0,0 +1,88 @@
+from typing import Sequence
+
+from selenium.common import JavascriptException
+from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
+from selenium.webdriver.remote.webelement import WebElement
+
+from .form_map import CHECKBOX, RADIO, Field
+from .tracing import traced
+
+# Sets every field on the page in one round trip, firing the events that
+# Jotform's validation listens for, then clicks the next button if all went
+# well.  Returns the indices of the fields it couldn't set.
+FILL_SCRIPT = """
+const [fields, nextButton] = arguments;
+const failed = [];
+const find = (by, target) => by === "id"
+  ? document.getElementById(target)
+  : document.evaluate(target, document, null,
+      XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const fire = (el, ...types) => types.forEach(
+  type => el.dispatchEvent(new Event(type, {bubbles: true})));
+fields.forEach(([kind, by, target, value], index) => {
+  try {
+    const el = find(by, target);
+    if (!el) {
+      failed.push(index);
+    } else if (kind === "radio" || kind === "checkbox") {
+      el.click();
+    } else if (kind === "select") {
+      if (value === "") return;
+      const want = value.toLowerCase();
+      const options = Array.from(el.options);
+      const match = options.find(o => o.value.toLowerCase() === want
+          || o.text.trim().toLowerCase() === want)
+        || options.find(o => o.text.trim().toLowerCase().startsWith(want));
+      if (!match) {
+        failed.push(index);
+        return;
+      }
+      el.value = match.value;
+      fire(el, "input", "change");
+    } else {
+      const proto = el instanceof HTMLTextAreaElement
+        ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+      const setValue = Object.getOwnPropertyDescriptor(proto, "value").set;
+      fire(el, "focus");
+      setValue.call(el, el.value + value);
+      fire(el, "input", "keyup", "change", "blur");
+    }
+  } catch (e) {
+    failed.push(index);
+  }
+});
+if (nextButton && !failed.length) nextButton.click();
+return failed;
+"""
+
+
+@traced
+def fill_fields(
+    driver: ChromeDriver,
+    fields: Sequence[Field],
+    next_button: WebElement | None = None,
+    batched: bool = True,
+):
+    failed = range(len(fields))
+    clicked = False
+    if batched:
+        try:
+            failed = driver.execute_script(
+                FILL_SCRIPT, [list(field) for field in fields], next_button
+            )
+            clicked = not failed
+        except JavascriptException:
+            pass
+    for index in failed:
+        fill_field(driver, fields[index])
+    if next_button is not None and not clicked:
+        next_button.click()
+
+
+@traced
+def fill_field(driver: ChromeDriver, field: Field):
+    element = driver.find_element(field.by, field.target)
+    if field.kind in (RADIO, CHECKBOX):
+        element.click()
+    else:
+        element.send_keys(field.value)
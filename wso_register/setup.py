@@ -1,12 +1,316 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit
+
 from selenium import webdriver
+from selenium.common import SessionNotCreatedException, WebDriverException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
 from webdriver_manager.chrome import ChromeDriverManager
 
+from .lifecycle import (
+    alive,
+    browser_environment,
+    kill_processes,
+    process_tree,
+    start_watchdog,
+    tree_rss,
+)
+from .paths import state_path
+from .profiles import DEFAULT_PROFILE, SessionProfile
+from .tracing import instrument, span, traced
+
+DRIVER_CACHE_FILE = "chromedriver.json"
+USER_DATA_TEMPLATES = "chrome-templates"
+
+# resolved once per process; the file cache makes it once per machine
+_chromedriver_path: str | None = None
+_chromedriver_lock = threading.Lock()
+_template_lock = threading.Lock()
+
+
+def chromedriver_path(refresh: bool = False) -> str:
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path and not refresh:
+            return _chromedriver_path
+        cache_file = state_path(DRIVER_CACHE_FILE)
+        path = None
+        if not refresh:
+            try:
+                path = json.loads(cache_file.read_text()).get("chromedriver")
+            except (OSError, ValueError):
+                pass
+        if not path or not os.access(path, os.X_OK):
+            path = ChromeDriverManager().install()
+            cache_file.write_text(json.dumps({"chromedriver": path}))
+        _chromedriver_path = path
+        return path
+
+
+def chrome_options(
+    profile: SessionProfile, user_data_dir: str | Path | None = None
+) -> webdriver.ChromeOptions:
+    options = webdriver.ChromeOptions()
+    options.page_load_strategy = profile.page_load_strategy
+    if profile.headless:
+        options.add_argument("--headless=new")
+    for argument in profile.arguments:
+        options.add_argument(argument)
+    if profile.block_images:
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+    return options
+
+
+def launch_chrome(options: webdriver.ChromeOptions) -> ChromeDriver:
+    # the marked environment is what lets the watchdog tell our browsers
+    # from anyone else's should we die without quitting them
+    environment = browser_environment()
+    try:
+        service = Service(chromedriver_path(), env=environment)
+        return webdriver.Chrome(service=service, options=options)
+    except SessionNotCreatedException:
+        # a cached driver no longer matches the installed Chrome
+        service = Service(chromedriver_path(refresh=True), env=environment)
+        return webdriver.Chrome(service=service, options=options)
+
 
-def chrome_session(start_url: str, wait: float | None = None) -> ChromeDriver:
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+def user_data_template(profile: SessionProfile) -> Path:
+    # Chrome spends a while setting up a new profile directory, so do that
+    # once per machine and start every session from a copy
+    template = state_path(USER_DATA_TEMPLATES) / profile.name
+    with _template_lock:
+        if not (template / "Local State").exists():
+            building = template.with_name(f"{template.name}.{os.getpid()}")
+            shutil.rmtree(building, ignore_errors=True)
+            driver = launch_chrome(chrome_options(profile, building))
+            driver.get("about:blank")
+            driver.quit()
+            try:
+                building.rename(template)
+            except OSError:
+                # another process finished its template first
+                shutil.rmtree(building, ignore_errors=True)
+    return template
+
+
+def session_user_data_dir(profile: SessionProfile) -> str:
+    directory = tempfile.mkdtemp(prefix="wso-register-chrome-")
+    shutil.copytree(
+        user_data_template(profile),
+        directory,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns("Singleton*", "lockfile", "*.lock"),
+    )
+    return directory
+
+
+def chrome_session(
+    start_url: str | None,
+    wait: float | None = None,
+    profile: SessionProfile | None = None,
+) -> ChromeDriver:
+    profile = profile or DEFAULT_PROFILE
+    user_data_dir = None
+    if profile.user_data_template:
+        user_data_dir = session_user_data_dir(profile)
+    with span("chrome_launch"):
+        driver = launch_chrome(chrome_options(profile, user_data_dir))
+    if user_data_dir:
+        # the copied profile goes away with the driver
+        weakref.finalize(driver, shutil.rmtree, user_data_dir, ignore_errors=True)
+    instrument(driver)
+    if profile.blocked_urls:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": list(profile.blocked_urls)}
+        )
     if wait:
         driver.implicitly_wait(wait)
-    driver.get(start_url)
+    if start_url:
+        driver.get(start_url)
     return driver
+
+
+def driver_pid(driver: ChromeDriver) -> int | None:
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return process.pid if process else None
+
+
+def browser_rss(driver: ChromeDriver) -> int | None:
+    """Memory used by the driver and every Chrome process under it, in bytes."""
+    pid = driver_pid(driver)
+    return tree_rss(pid) if pid else None
+
+
+def browser_gone(driver: ChromeDriver | None) -> bool:
+    # a quit or crashed browser can't even list its windows
+    if driver is None:
+        return True
+    try:
+        driver.window_handles
+    except WebDriverException:
+        return True
+    return False
+
+
+def quit_driver(driver: ChromeDriver):
+    # quit, unlike close, ends the driver and Chrome; whatever survives
+    # it anyway (a hung renderer, say) is killed
+    pid = driver_pid(driver)
+    pids = process_tree(pid) if pid else []
+    try:
+        driver.quit()
+    except Exception:
+        # it may already be gone, or have been shut down from elsewhere
+        pass
+    if survivors := [pid for pid in pids if alive(pid)]:
+        kill_processes(survivors)
+
+
+@contextmanager
+def single_session(profile: SessionProfile | None = None) -> Iterator[ChromeDriver]:
+    driver = chrome_session(start_url=None, profile=profile)
+    try:
+        yield driver
+    finally:
+        quit_driver(driver)
+
+
+@traced
+def reset_session(driver: ChromeDriver):
+    driver.switch_to.default_content()
+    origins = {urlsplit(driver.current_url)._replace(path="", query="", fragment="")}
+    try:
+        frame_urls = driver.execute_script(
+            "return Array.from(document.querySelectorAll('iframe'), f => f.src);"
+        )
+        origins.update(
+            urlsplit(url)._replace(path="", query="", fragment="")
+            for url in frame_urls or []
+        )
+    except WebDriverException:
+        pass
+    for origin in origins:
+        if origin.scheme in ("http", "https"):
+            driver.execute_cdp_cmd(
+                "Storage.clearDataForOrigin",
+                {"origin": origin.geturl(), "storageTypes": "all"},
+            )
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+
+
+class SessionManager:
+    def __init__(
+        self,
+        max_size: int = 1,
+        wait: float | None = None,
+        profile: SessionProfile | None = None,
+    ):
+        self.max_size = max_size
+        self.wait = wait
+        self.profile = profile or DEFAULT_PROFILE
+        self._idle: list[ChromeDriver] = []
+        self._uses: dict[ChromeDriver, int] = {}
+        self._count = 0
+        self._available = threading.Condition()
+        start_watchdog()
+
+    def acquire(self, start_url: str | None = None) -> ChromeDriver:
+        with self._available:
+            while not self._idle and self._count >= self.max_size:
+                self._available.wait()
+            if self._idle:
+                driver = self._idle.pop()
+            else:
+                driver = None
+                self._count += 1
+        if driver is None:
+            try:
+                driver = chrome_session(
+                    start_url=None, wait=self.wait, profile=self.profile
+                )
+            except Exception:
+                self._forget()
+                raise
+        if start_url:
+            try:
+                driver.get(start_url)
+            except Exception:
+                self.discard(driver)
+                raise
+        return driver
+
+    def release(self, driver: ChromeDriver):
+        with self._available:
+            uses = self._uses[driver] = self._uses.get(driver, 0) + 1
+        if self._worn_out(driver, uses):
+            self.discard(driver)
+            return
+        try:
+            reset_session(driver)
+        except WebDriverException:
+            self.discard(driver)
+            return
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def discard(self, driver: ChromeDriver):
+        with self._available:
+            self._uses.pop(driver, None)
+        quit_driver(driver)
+        self._forget()
+
+    def _worn_out(self, driver: ChromeDriver, uses: int) -> bool:
+        # Chrome's memory only grows over a long run, so start over now and then
+        if self.profile.max_uses and uses >= self.profile.max_uses:
+            return True
+        if self.profile.max_rss_mb:
+            rss = browser_rss(driver)
+            return rss is not None and rss > self.profile.max_rss_mb * 1024 * 1024
+        return False
+
+    def _forget(self):
+        with self._available:
+            self._count -= 1
+            self._available.notify()
+
+    @contextmanager
+    def session(self, start_url: str | None = None) -> Iterator[ChromeDriver]:
+        driver = self.acquire(start_url)
+        try:
+            yield driver
+        except BaseException:
+            # a failed form can leave the browser in any state
+            self.discard(driver)
+            raise
+        self.release(driver)
+
+    def warm(self, count: int = 1):
+        drivers = [self.acquire() for _ in range(min(count, self.max_size))]
+        for driver in drivers:
+            self.release(driver)
+
+    def close(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self.discard(driver)
+
+    def __enter__(self) -> "SessionManager":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,88 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from .form_map import FormPlan, form_context
+from .paths import state_path
+from .roster import RosterRow
+from .wso_data import GroupData
+
+SNAPSHOT_DB = "snapshots.db"
+
+
+def section_values(plan: FormPlan, group: GroupData | RosterRow) -> dict[str, list]:
+    # the date is left out so that resubmitting unchanged data is a no-op
+    context = form_context(group, None, today="")
+    return {
+        page.section: [[field.target, field.value] for field in page.render(context)]
+        for page in plan.active_pages(context)
+        if page.section
+    }
+
+
+class SnapshotStore:
+    def __init__(self, path: str | Path | None = None):
+        self.path = str(path or state_path(SNAPSHOT_DB))
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " wso_id INTEGER NOT NULL,"
+            " form TEXT NOT NULL,"
+            " sections TEXT NOT NULL,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (wso_id, form))"
+        )
+        self._db.commit()
+
+    def get(self, wso_id: int, form: str) -> dict[str, list] | None:
+        row = self._db.execute(
+            "SELECT sections FROM snapshots WHERE wso_id = ? AND form = ?",
+            (wso_id, form),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, plan: FormPlan, group: GroupData | RosterRow):
+        self._db.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+            (
+                group.wso_id,
+                plan.name,
+                json.dumps(section_values(plan, group)),
+                time.time(),
+            ),
+        )
+        self._db.commit()
+
+    def changed_sections(
+        self, plan: FormPlan, group: GroupData | RosterRow
+    ) -> frozenset[str] | None:
+        """The sections that need submitting, or None if nothing changed."""
+        previous = self.get(group.wso_id, plan.name) or {}
+        current = section_values(plan, group)
+        changed = frozenset(
+            section
+            for section, values in current.items()
+            if previous.get(section) != values
+        )
+        if not changed:
+            return None
+        return changed if plan.selective else plan.sections
+
+    def field_changes(self, plan: FormPlan, group: GroupData | RosterRow) -> list[str]:
+        """What would be entered differently from the last submission."""
+        previous = self.get(group.wso_id, plan.name) or {}
+        lines = []
+        for section, values in section_values(plan, group).items():
+            before = {target: value for target, value in previous.get(section, ())}
+            for target, value in values:
+                if target not in before:
+                    lines.append(f"{section}: {target}: {value!r}")
+                elif before[target] != value:
+                    lines.append(
+                        f"{section}: {target}: {before[target]!r} -> {value!r}"
+                    )
+        return lines
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,306 @@
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import parse_qsl, urlsplit
+
+from .wso_data import WSO_DAYS, GroupData
+
+# A local stand-in for the two change forms: the records page with its
+# "Group Records Change" iframe, and hand-made approximations of the
+# Jotform pages, with the element ids, page breaks and submit button the
+# plans expect.  Each page is only added to the document when the previous
+# page's Next button is clicked, and pages whose summary checkbox is
+# unchecked are skipped, as on the live form.  The pages themselves are
+# checked in under stand_in_forms, apart from the plans, so a plan that
+# doesn't match them fails.
+
+FORM_PAGES_DIR = Path(__file__).with_name("stand_in_forms")
+STAND_IN_FORMS = ("physical", "virtual")
+# which summary checkbox turns on each section's page
+SUMMARY_CHECKBOXES = {
+    "name_address": "input_102_0",
+    "participants": "input_102_1",
+    "contact": "input_102_2",
+    "details": "input_102_3",
+    "cma": "input_102_4",
+    "gr": "input_102_5",
+}
+
+RECORDS_PATH = "/group-records/change/"
+ASSET_PATH = "/assets/"
+FORM_PATH = "/jotform/"
+SUBMIT_PATH = "/submit/"
+
+PAGE_SCRIPT = """
+const delay = %(delay)d;
+const checkboxes = %(checkboxes)s;
+const pages = Array.from(document.querySelectorAll("template"));
+let current = -1;
+const wanted = template => {
+  const box = checkboxes[template.dataset.section];
+  return !box || !document.getElementById(box) ||
+    document.getElementById(box).checked;
+};
+const show = index => {
+  document.querySelectorAll(".form-section").forEach(
+    section => section.style.display = "none");
+  // pages without a Next button share the screen with the page after them
+  do {
+    const section = pages[index].content.firstElementChild.cloneNode(true);
+    document.getElementById("pages").appendChild(section);
+    current = index;
+  } while (pages[index].dataset.click === "0" && ++index < pages.length);
+};
+const next = () => {
+  let index = current + 1;
+  while (index < pages.length - 1 && !wanted(pages[index])) index++;
+  setTimeout(() => show(index), delay);
+};
+document.addEventListener("click", event => {
+  if (event.target.classList.contains("form-pagebreak-next")) next();
+});
+// as Jotform's lite mode date boxes do, which have no name of their own
+document.addEventListener("input", event => {
+  const number = event.target.id.match(/^lite_mode_(\\d+)$/);
+  if (!number) return;
+  const parts = event.target.value.split("-");
+  ["month", "day", "year"].forEach((part, index) => {
+    const field = document.getElementById(`${part}_${number[1]}`);
+    if (field) field.value = parts[index] || "";
+  });
+});
+show(0);
+"""
+
+
+# the kind of things a real page loads that the forms themselves don't need
+ASSETS = {
+    "banner.png": (
+        "image/png",
+        bytes.fromhex(
+            "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+            "1f15c4890000000d49444154789c6360000002000001e221bc33"
+            "0000000049454e44ae426082"
+        ),
+    ),
+    "theme.css": ("text/css", b"body { font-family: sans-serif; }\n"),
+    "tracker.js": ("application/javascript", b"window.tracked = true;\n"),
+}
+ASSET_TAGS = (
+    f"<link rel='stylesheet' href='{ASSET_PATH}theme.css'>"
+    f"<script async src='{ASSET_PATH}tracker.js'></script>"
+)
+BANNER_TAG = f"<img src='{ASSET_PATH}banner.png' alt='' width='1' height='1'>"
+
+
+def form_pages(form: str) -> str:
+    return (FORM_PAGES_DIR / f"{form}.html").read_text()
+
+
+def form_html(form: str, page_delay: int = 0) -> str:
+    script = PAGE_SCRIPT % {
+        "delay": page_delay,
+        "checkboxes": json.dumps(SUMMARY_CHECKBOXES),
+    }
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+        f"<title>{html.escape(form)} change form</title>{ASSET_TAGS}"
+        f"</head><body>{BANNER_TAG}\n"
+        f"<form id='{form}' method='post' action='{SUBMIT_PATH}{form}'>"
+        f"<div id='pages'></div>\n{form_pages(form)}</form>\n"
+        f"<script>{script}</script>\n</body></html>\n"
+    )
+
+
+def records_html(form_url: str) -> str:
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+        f"<title>Group Records Change Form</title>{ASSET_TAGS}</head><body>\n"
+        f"{BANNER_TAG}<h1>Group Records Change Form</h1>\n"
+        f"<iframe title='Group Records Change' src='{html.escape(form_url)}'"
+        " width='100%' height='900'></iframe>\n</body></html>\n"
+    )
+
+
+THANK_YOU_HTML = (
+    "<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>Thank You</title>"
+    "</head><body><div class='form-all thankyou'><h1>Thank You!</h1>"
+    "<p>Your submission has been received.</p></div></body></html>\n"
+)
+
+
+def listing_html(group: GroupData) -> str:
+    """A meeting-listing page for a group, with its schema.org Event."""
+    end = group.start_hour * 60 + group.start_minute + group.duration
+    event = {
+        "@context": "https://schema.org",
+        "@type": "Event",
+        "name": group.name,
+        "eventSchedule": {
+            "@type": "Schedule",
+            "repeatFrequency": "P1W",
+            "byDay": f"https://schema.org/{WSO_DAYS[group.day_of_week]}",
+            "startTime": f"{group.start_hour:02d}:{group.start_minute:02d}",
+            "endTime": f"{end // 60 % 24:02d}:{end % 60:02d}",
+        },
+        "location": [],
+    }
+    if group.physical_location:
+        event["location"].append(
+            {
+                "@type": "Place",
+                "name": group.physical_location,
+                "description": group.location_instructions,
+                "address": {
+                    "@type": "PostalAddress",
+                    "streetAddress": group.address_street_1,
+                    "addressLocality": group.address_city,
+                    "addressRegion": group.address_state,
+                    "postalCode": group.address_zip,
+                    "addressCountry": group.address_country,
+                },
+            }
+        )
+    if group.online_url:
+        event["location"].append({"@type": "VirtualLocation", "url": group.online_url})
+    if group.public_email:
+        event["organizer"] = {"@type": "Organization", "email": group.public_email}
+    # "</" would end the script element early
+    data = json.dumps(event, indent=1).replace("</", "<\\/")
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+        f"<title>{html.escape(group.name)}</title>\n"
+        f"<script type='application/ld+json'>\n{data}\n</script></head><body>\n"
+        f"<h1>{html.escape(group.name)}</h1>\n</body></html>\n"
+    )
+
+
+def write_listing_pages(groups: Iterable[GroupData], directory: Path) -> list[str]:
+    """Write each group's listing page under `directory`, for a static server.
+
+    Returns each page's path relative to the directory, as a URL path.
+    """
+    paths = []
+    for group in groups:
+        path = f"meeting-{group.wso_id}/index.html"
+        (directory / path).parent.mkdir(parents=True, exist_ok=True)
+        (directory / path).write_text(listing_html(group))
+        paths.append(path)
+    return paths
+
+
+class StandInServer:
+    """Serves the stand-in forms on localhost and records what is submitted."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        page_delay: int = 0,
+        asset_latency: float = 0.0,
+    ):
+        self.latency = latency  # seconds added to every response
+        self.asset_latency = asset_latency  # and again to images, styles, scripts
+        self.page_delay = page_delay  # milliseconds between form pages
+        self.submissions: list[dict] = []
+        self._received = threading.Condition()
+        self._pages = {
+            form: form_html(form, page_delay).encode() for form in STAND_IN_FORMS
+        }
+        self._server = ThreadingHTTPServer((host, port), _StandInHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def records_url(self) -> str:
+        return self.url + RECORDS_PATH
+
+    def form_url(self, form: str) -> str:
+        return f"{self.url}{FORM_PATH}{form}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stand-in", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def record(self, form: str, fields: list[tuple[str, str]]):
+        with self._received:
+            self.submissions.append({"form": form, "fields": fields})
+            self._received.notify_all()
+
+    def wait_for_submissions(self, count: int, timeout: float = 10.0) -> int:
+        with self._received:
+            self._received.wait_for(lambda: len(self.submissions) >= count, timeout)
+            return len(self.submissions)
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    server_version = "StandIn/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def stand_in(self) -> StandInServer:
+        return self.server.stand_in
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == RECORDS_PATH:
+            self._respond(200, records_html(self.stand_in.form_url("physical")))
+        elif path.startswith(FORM_PATH) and path[len(FORM_PATH) :] in STAND_IN_FORMS:
+            self._respond(200, self.stand_in._pages[path[len(FORM_PATH) :]])
+        elif path.startswith(ASSET_PATH) and path[len(ASSET_PATH) :] in ASSETS:
+            content_type, body = ASSETS[path[len(ASSET_PATH) :]]
+            time.sleep(self.stand_in.asset_latency)
+            self._respond(200, body, content_type)
+        else:
+            self._respond(404, "not found")
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        form = path[len(SUBMIT_PATH) :]
+        if not path.startswith(SUBMIT_PATH) or form not in STAND_IN_FORMS:
+            self._respond(404, "not found")
+            return
+        self.stand_in.record(form, parse_qsl(body, keep_blank_values=True))
+        self._respond(200, THANK_YOU_HTML)
+
+    def _respond(self, status: int, body: str | bytes, content_type: str = "text/html"):
+        if self.stand_in.latency:
+            time.sleep(self.stand_in.latency)
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
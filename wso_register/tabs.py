@@ -0,0 +1,355 @@
+import concurrent.futures
+import contextvars
+import dataclasses
+import queue
+import threading
+import time
+from typing import Callable
+
+from selenium.common import (
+    NoSuchElementException,
+    NoSuchFrameException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
+
+from .batch import DEFAULT_WORKERS, VIRTUAL_FORM, BatchJob, BatchResult, job_result
+from .form_map import (
+    FORM_URLS,
+    PHYSICAL_GROUP_CHANGE_PLAN,
+    TEMP_VIRTUAL_GROUP_CHANGE_PLAN,
+    form_context,
+    require_online,
+    require_registered,
+)
+from .lifecycle import start_watchdog
+from .physical_group import FormSteps, Wait, form_steps
+from .profiles import DEFAULT_PROFILE, SessionProfile
+from .setup import browser_gone, browser_rss, chrome_session, quit_driver
+from .tracing import TRACER
+
+DEFAULT_POLL = 0.05  # seconds between rounds of the tabs when none was ready
+# Chrome slows down tabs that aren't in front, and only one tab can be
+TAB_ARGUMENTS = (
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+)
+# a condition that isn't met yet may say so by raising one of these
+NOT_YET = (NoSuchElementException, NoSuchFrameException, StaleElementReferenceException)
+
+
+def tab_profile(profile: SessionProfile | None = None) -> SessionProfile:
+    profile = profile or DEFAULT_PROFILE
+    return dataclasses.replace(
+        profile,
+        # navigating a tab mustn't hold up the others while its page loads
+        page_load_strategy="none",
+        arguments=profile.arguments + TAB_ARGUMENTS,
+    )
+
+
+def job_steps(driver: ChromeDriver, job: BatchJob, url: str) -> FormSteps:
+    if job.form == VIRTUAL_FORM:
+        require_online(job.group)
+        plan = TEMP_VIRTUAL_GROUP_CHANGE_PLAN
+        context = form_context(job.group, job.submitter)
+    else:
+        require_registered(job.group)
+        plan = PHYSICAL_GROUP_CHANGE_PLAN
+        context = form_context(job.group, job.submitter, sections=job.sections)
+    return form_steps(driver, plan, context, url=url)
+
+
+@dataclasses.dataclass(kw_only=True)
+class _Tab:
+    handle: str
+    job: BatchJob
+    future: concurrent.futures.Future
+    steps: FormSteps
+    # each tab has its own trace context, as a thread would
+    context: contextvars.Context
+    start: float
+    wait: Wait | None = None
+    condition: Callable | None = None
+    waiting_since: float = 0.0
+    deadline: float = 0.0
+    frame: tuple[str, str] | None = None  # the form's frame, once entered
+
+
+class TabExecutor:
+    """Fills in many forms at once in one browser, each in a tab of its own.
+
+    A browser per form costs hundreds of megabytes; a tab costs a fraction
+    of that.  Rather than block on one tab's page, a single thread goes
+    round the tabs, moving each one on as what it waits for turns up.
+    `submit_job` can be called from any thread and returns a
+    concurrent.futures.Future, as HttpExecutor's does.
+    """
+
+    def __init__(
+        self,
+        tabs: int = DEFAULT_WORKERS,
+        profile: SessionProfile | None = None,
+        form_urls: dict[str, str] | None = None,
+        poll: float = DEFAULT_POLL,
+    ):
+        self.tabs = tabs
+        self.profile = tab_profile(profile)
+        self.form_urls = {**FORM_URLS, **(form_urls or {})}
+        self.poll = poll
+        self.launched = 0
+        self._jobs: queue.Queue = queue.Queue()
+        self._active: list[_Tab] = []
+        self._driver: ChromeDriver | None = None
+        self._home: str | None = None  # a blank tab that keeps the browser open
+        self._focus: str | None = None
+        self._uses = 0
+        self._retiring = False  # no new tabs until the browser is replaced
+        self._closed = False
+        # set once the tabs' thread has given up, so later jobs fail at once
+        self._failure: Exception | None = None
+        self._submitting = threading.Lock()
+        start_watchdog()
+        self._thread = threading.Thread(
+            target=self._run, name="browser-tabs", daemon=True
+        )
+        self._thread.start()
+
+    def submit_job(self, job: BatchJob) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self._submitting:
+            if self._failure is None:
+                self._jobs.put((job, future))
+                return future
+        future.set_result(self._browser_result(job, time.perf_counter(), self._failure))
+        return future
+
+    def close(self):
+        """Finish the jobs already submitted, then quit the browser."""
+        if not self._closed:
+            self._closed = True
+            self._jobs.put(None)
+            self._thread.join()
+
+    def __enter__(self) -> "TabExecutor":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        stopping = False
+        try:
+            while not stopping or self._active:
+                # a browser that has done its share is replaced once its
+                # tabs are done
+                if self._retiring and not self._active:
+                    self._quit()
+                while (
+                    not stopping
+                    and not self._retiring
+                    and len(self._active) < self.tabs
+                ):
+                    try:
+                        item = self._jobs.get(block=not self._active)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                    else:
+                        self._open(*item)
+                if not self._round():
+                    time.sleep(self.poll)
+        except Exception as err:
+            # nothing may be left waiting on a result that won't come, and
+            # close() may already have taken the sentinel, so don't block
+            self._browser_failed(err)
+            with self._submitting:
+                self._failure = err
+            while True:
+                try:
+                    item = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    job, future = item
+                    if future.set_running_or_notify_cancel():
+                        future.set_result(
+                            self._browser_result(job, time.perf_counter(), err)
+                        )
+            raise
+        finally:
+            self._quit()
+
+    def _open(self, job: BatchJob, future: concurrent.futures.Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        start = time.perf_counter()
+        try:
+            if self._driver is None:
+                self._launch()
+            # bad data fails here, before a tab is opened for it
+            steps = job_steps(self._driver, job, self.form_urls[job.form])
+            self._focus = None
+            self._driver.switch_to.new_window("tab")
+            handle = self._focus = self._driver.current_window_handle
+        except Exception as err:
+            future.set_result(self._result(job, start, err))
+            if isinstance(err, WebDriverException) and self._browser_gone():
+                self._browser_failed(err)
+            return
+        tab = _Tab(
+            handle=handle,
+            job=job,
+            future=future,
+            steps=steps,
+            context=contextvars.copy_context(),
+            start=start,
+        )
+        self._active.append(tab)
+        self._step(tab)
+
+    def _round(self) -> bool:
+        """Move on every tab that's ready; whether any was."""
+        progressed = False
+        for tab in list(self._active):
+            if tab not in self._active:
+                # finished, or failed along with its browser, this round
+                continue
+            try:
+                self._focus_on(tab)
+                found = tab.context.run(tab.condition, self._driver)
+            except NOT_YET:
+                found = False
+            except WebDriverException as err:
+                if self._browser_gone():
+                    self._browser_failed(err)
+                    return True
+                # a page part way through loading can refuse a command;
+                # if it keeps on refusing, the wait times out
+                found = False
+            now = time.monotonic()
+            if found:
+                progressed = True
+                self._waited(tab, now - tab.waiting_since)
+                if tab.wait.frame:
+                    tab.frame = tab.wait.locator
+                self._step(tab, found)
+            elif now >= tab.deadline:
+                progressed = True
+                self._waited(tab, now - tab.waiting_since)
+                error = TimeoutException(f"Timed out waiting for {tab.wait.key}")
+                self._step(tab, error=error)
+            if self._driver is None:
+                # a step found the browser gone and failed its tabs
+                return True
+        return progressed
+
+    def _step(self, tab: _Tab, found=None, error: Exception | None = None):
+        steps = tab.steps
+        try:
+            if error:
+                wait = tab.context.run(steps.throw, error)
+            else:
+                wait = tab.context.run(steps.send, found)
+        except StopIteration as stop:
+            self._done(tab, confirmation=stop.value)
+            return
+        except Exception as err:
+            if isinstance(err, WebDriverException) and self._browser_gone():
+                self._browser_failed(err)
+            else:
+                self._done(tab, err)
+            return
+        tab.wait = wait
+        # a submission's outcome is watched for with a quick look each
+        # round, like any other wait
+        tab.condition = wait.condition()
+        tab.waiting_since = time.monotonic()
+        tab.deadline = tab.waiting_since + wait.timeouts.timeout(wait.key)
+
+    def _focus_on(self, tab: _Tab):
+        # going to another tab leaves any frame, so go back into it
+        if self._focus == tab.handle:
+            return
+        self._focus = None
+        self._driver.switch_to.window(tab.handle)
+        if tab.frame:
+            self._driver.switch_to.frame(self._driver.find_element(*tab.frame))
+        self._focus = tab.handle
+
+    def _done(
+        self,
+        tab: _Tab,
+        error: Exception | None = None,
+        confirmation: str | None = None,
+    ):
+        self._active.remove(tab)
+        tab.context.run(tab.steps.close)
+        try:
+            self._driver.switch_to.window(tab.handle)
+            self._driver.close()
+            self._driver.switch_to.window(self._home)
+            self._focus = self._home
+        except WebDriverException:
+            self._focus = None
+        self._uses += 1
+        self._retiring = self._retiring or self._worn_out()
+        tab.future.set_result(self._result(tab.job, tab.start, error, confirmation))
+
+    @staticmethod
+    def _result(
+        job: BatchJob,
+        start: float,
+        error: Exception | None,
+        confirmation: str | None = None,
+    ) -> BatchResult:
+        # timeouts and browser hiccups, as opposed to bad data or a changed form
+        transient = isinstance(error, WebDriverException)
+        return job_result(job, start, error, confirmation, transient=transient)
+
+    @staticmethod
+    def _browser_result(job: BatchJob, start: float, error: Exception) -> BatchResult:
+        # whatever the error, the form failed with its browser, not for
+        # its data, so it is worth another go
+        return job_result(job, start, error, transient=True)
+
+    @staticmethod
+    def _waited(tab: _Tab, seconds: float):
+        tab.wait.timeouts.observe(tab.wait.key, seconds)
+        if TRACER.enabled:
+            TRACER.record(f"wait:{tab.wait.key}", seconds)
+
+    def _launch(self):
+        self._driver = chrome_session(start_url=None, profile=self.profile)
+        self._home = self._focus = self._driver.current_window_handle
+        self._uses = 0
+        self.launched += 1
+
+    def _worn_out(self) -> bool:
+        if self.profile.max_uses and self._uses >= self.profile.max_uses:
+            return True
+        if self.profile.max_rss_mb:
+            rss = browser_rss(self._driver)
+            return rss is not None and rss > self.profile.max_rss_mb * 1024 * 1024
+        return False
+
+    def _browser_gone(self) -> bool:
+        return browser_gone(self._driver)
+
+    def _browser_failed(self, error: Exception):
+        # every form in the browser goes with it; they can be retried
+        for tab in self._active:
+            tab.context.run(tab.steps.close)
+            tab.future.set_result(self._browser_result(tab.job, tab.start, error))
+        self._active.clear()
+        self._quit()
+
+    def _quit(self):
+        if self._driver is not None:
+            quit_driver(self._driver)
+        self._driver = self._home = self._focus = None
+        self._retiring = False
@@ -0,0 +1,182 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Iterator
+
+TRACE_ENV = "WSO_REGISTER_TRACE"
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "wso_register"
+
+# the page being filled in this thread or task, and its command count
+_current_page: ContextVar[list | None] = ContextVar("current_page", default=None)
+NO_SPAN = nullcontext()
+
+
+class Tracer:
+    """Collects step timings and per-page WebDriver command counts."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.samples: dict[str, list[float]] = {}
+        self.page_commands: dict[str, list[int]] = {}
+
+    def record(self, step: str, seconds: float):
+        self.samples.setdefault(step, []).append(seconds)
+
+    @contextmanager
+    def span(self, step: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(step, time.perf_counter() - start)
+
+    @contextmanager
+    def page(self, name: str) -> Iterator[None]:
+        token = _current_page.set([name, 0])
+        try:
+            yield
+        finally:
+            self.page_commands.setdefault(name, []).append(_current_page.get()[1])
+            _current_page.reset(token)
+
+    def command(self, name: str, seconds: float):
+        self.record(f"command:{name}", seconds)
+        if page := _current_page.get():
+            page[1] += 1
+
+    def drain(self) -> dict:
+        """Hand over everything recorded so far (e.g. to the parent process)."""
+        data = {"samples": self.samples, "page_commands": self.page_commands}
+        self.samples, self.page_commands = {}, {}
+        return data
+
+    def merge(self, data: dict):
+        for step, samples in data["samples"].items():
+            self.samples.setdefault(step, []).extend(samples)
+        for page, counts in data["page_commands"].items():
+            self.page_commands.setdefault(page, []).extend(counts)
+
+    def summary(self) -> dict:
+        return {
+            "steps": {
+                step: _distribution(samples)
+                for step, samples in sorted(self.samples.items())
+            },
+            "page_commands": {
+                page: _distribution(counts)
+                for page, counts in sorted(self.page_commands.items())
+            },
+        }
+
+    def write_json(self, path: str | Path):
+        _write_atomically(path, json.dumps(self.summary(), indent=2) + "\n")
+
+    def write_prometheus(self, path: str | Path):
+        summary = self.summary()
+        lines = []
+        for metric, label, help_text, distributions in (
+            (
+                "step_seconds",
+                "step",
+                "Time spent in each step of a form submission.",
+                summary["steps"],
+            ),
+            (
+                "page_commands",
+                "page",
+                "WebDriver commands sent while filling each form page.",
+                summary["page_commands"],
+            ),
+        ):
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+            for key, distribution in distributions.items():
+                labels = f'{label}="{_escape_label(key)}"'
+                for quantile in QUANTILES:
+                    value = distribution[_quantile_key(quantile)]
+                    lines.append(f'{name}{{{labels},quantile="{quantile}"}} {value}')
+                lines.append(f"{name}_sum{{{labels}}} {distribution['total']}")
+                lines.append(f"{name}_count{{{labels}}} {distribution['count']}")
+        _write_atomically(path, "\n".join(lines) + "\n")
+
+
+TRACER = Tracer(enabled=bool(os.environ.get(TRACE_ENV)))
+
+
+def enable():
+    # worker processes read the environment when they import this module
+    os.environ[TRACE_ENV] = "1"
+    TRACER.enabled = True
+
+
+def span(step: str, detail: str | None = None):
+    if not TRACER.enabled:
+        return NO_SPAN
+    return TRACER.span(f"{step}:{detail}" if detail else step)
+
+
+def page(name: str):
+    return TRACER.page(name) if TRACER.enabled else NO_SPAN
+
+
+def traced(function: Callable) -> Callable:
+    step = function.__name__
+
+    def wrapper(*args, **kwargs):
+        if not TRACER.enabled:
+            return function(*args, **kwargs)
+        with TRACER.span(step):
+            return function(*args, **kwargs)
+
+    wrapper.__name__ = step
+    wrapper.__doc__ = function.__doc__
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+def instrument(driver):
+    """Time every WebDriver command the driver sends, if tracing is on."""
+    if not TRACER.enabled or "execute" in vars(driver):
+        return driver
+    execute = driver.execute
+
+    def traced_execute(driver_command: str, params: dict | None = None):
+        start = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            TRACER.command(driver_command, time.perf_counter() - start)
+
+    driver.execute = traced_execute
+    return driver
+
+
+def _distribution(samples: list[float] | list[int]) -> dict:
+    ordered = sorted(samples)
+    distribution = {"count": len(ordered), "total": sum(ordered)}
+    for quantile in QUANTILES:
+        # nearest rank
+        index = max(0, math.ceil(quantile * len(ordered)) - 1)
+        distribution[_quantile_key(quantile)] = ordered[index]
+    return distribution
+
+
+def _quantile_key(quantile: float) -> str:
+    return f"p{quantile * 100:g}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _write_atomically(path: str | Path, text: str):
+    # the node exporter may read the textfile at any moment
+    path = Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(text)
+    temporary.replace(path)
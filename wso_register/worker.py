@@ -0,0 +1,139 @@
+import itertools
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Iterator
+
+from .batch import BROWSER_BACKEND, DEFAULT_WORKERS, BatchResult, run_batch
+from .jobs import DEFAULT_LEASE, IN_FLIGHT, PENDING, JobStore
+from .profiles import SessionProfile
+from .receipts import ReceiptStore
+from .scheduler import SubmissionScheduler
+from .snapshots import SnapshotStore
+
+DEFAULT_POLL = 10.0  # seconds between looks at an empty queue
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Heartbeat:
+    """Keeps renewing a worker's leases, in the background, until stopped."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        owner: str,
+        lease: float = DEFAULT_LEASE,
+        shared: bool = False,
+    ):
+        self.path = path
+        self.owner = owner
+        self.lease = lease
+        self.shared = shared
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="lease-heartbeat", daemon=True
+        )
+
+    def start(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # sqlite connections belong to the thread that made them
+        store = JobStore(self.path, shared=self.shared)
+        try:
+            # a few chances to renew before the lease runs out
+            while not self._stop.wait(self.lease / 3):
+                try:
+                    store.heartbeat(self.owner, self.lease)
+                except Exception:
+                    # a busy or briefly unreachable store; try next beat
+                    self.failures += 1
+        finally:
+            store.close()
+
+
+class Worker:
+    """Submits jobs leased from a job store that other workers may share.
+
+    Each worker, whether on this host or another with the store on shared
+    storage, leases jobs only as its browsers free up, so adding hosts adds
+    throughput.  Its leases are renewed while it runs; if it dies, they run
+    out and the jobs go to another worker.  A result is only recorded while
+    the worker still holds the job's lease, so a worker that stalled past
+    its lease can't overwrite the outcome of the job's next delivery.
+    """
+
+    def __init__(
+        self,
+        store_path: str | Path | None = None,
+        *,
+        shared: bool = False,
+        name: str | None = None,
+        lease: float = DEFAULT_LEASE,
+        poll: float = DEFAULT_POLL,
+        until_idle: bool = False,
+    ):
+        self.store = JobStore(store_path, shared=shared)
+        self.shared = shared
+        self.name = name or worker_name()
+        self.lease = lease
+        self.poll = poll
+        self.until_idle = until_idle
+        self.lost_leases = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Take no more jobs; those already leased are still finished."""
+        self._stop.set()
+
+    def run(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        snapshots: SnapshotStore | None = None,
+        scheduler: SubmissionScheduler | None = None,
+        profile: SessionProfile | None = None,
+        backend: str = BROWSER_BACKEND,
+        receipts: ReceiptStore | None = None,
+    ) -> Iterator[BatchResult]:
+        heartbeat = Heartbeat(self.store.path, self.name, self.lease, self.shared)
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                leased = itertools.takewhile(
+                    lambda _: not self._stop.is_set(),
+                    self.store.lease_pending(self.name, self.lease),
+                )
+                if (first := next(leased, None)) is None:
+                    if self.until_idle and self._idle():
+                        return
+                    self._stop.wait(self.poll)
+                    continue
+                # the browsers are only started once there is work for them
+                jobs = itertools.chain((first,), leased)
+                results = run_batch(
+                    jobs, workers, snapshots, scheduler, profile, backend, receipts
+                )
+                for result in results:
+                    if not self.store.finish(result, self.name):
+                        self.lost_leases += 1
+                    yield result
+        finally:
+            heartbeat.stop()
+
+    def close(self):
+        self.store.close()
+
+    def _idle(self) -> bool:
+        # jobs in flight elsewhere may yet come back to the queue
+        counts = self.store.counts()
+        return not counts[PENDING] and not counts[IN_FLIGHT]
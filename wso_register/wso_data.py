@@ -1,4 +1,91 @@
 from dataclasses import dataclass
+from types import MappingProxyType
+
+WSO_DAYS = (
+    "Sunday",
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+)
+# in priority order: a group gets the first of these that it lists
+WSO_PARTICIPANT_TYPES = MappingProxyType(
+    {
+        "parent": "Parents of Alcoholics",
+        "aca": "Adult Children",
+        "youth": "Young Adults",
+        "poc": "People of Color",
+        "women": "Women",
+        "men": "Men",
+        "lgbtqia+": "LGBTQIA+",
+    }
+)
+WSO_OPTIONS = MappingProxyType(
+    {
+        "intro": "Introductory",
+        "institution": "Limited Access",
+        "fragrance-free": "Fragrance Free",
+        "ada": "Handicap Access",
+        "child-care": "Child Care",
+        "asl": "Sign Language",
+        "smoking": "Smoking Permitted",
+        "beginner": "Beginners",
+    }
+)
+WSO_LANGUAGES = MappingProxyType({"spanish": "Spanish", "french": "French"})
+WSO_COUNTRIES = frozenset({"United States", "Canada", "Bermuda"})
+WSO_ATTENDEES = (
+    "Families and Friends only",
+    "Families, Friends, and Observers welcome",
+)
+
+
+def wso_phone(phone: str) -> (str, str):
+    digits = "".join(filter(str.isdigit, phone))
+    return digits[0:3], digits[3:]
+
+
+def wso_country(country: str | None) -> str:
+    return country if country in WSO_COUNTRIES else "United States"
+
+
+def wso_language(language: str | None, is_restricted: bool = True) -> str:
+    if not language:
+        return "English"
+    if wso := WSO_LANGUAGES.get(language.lower()):
+        return wso
+    return "English" if is_restricted else language
+
+
+def wso_schedule(day: int, hour: int, minute: int) -> (str, str, str, str):
+    wso_day = WSO_DAYS[day % 8]
+    wso_hour = hour % 12 if (hour % 12) != 0 else 12
+    wso_am_pm = "AM" if (hour % 24) < 12 else "PM"
+    # normalized down to the quarter hour
+    wso_minute = (minute % 60) // 15 * 15
+    return wso_day, str(wso_hour), str(wso_minute), wso_am_pm
+
+
+def wso_participant_type(participant_types: set[str] | None) -> str | None:
+    if not participant_types:
+        return None
+    listed = {pt.lower() for pt in participant_types}
+    for pt, wso_pt in WSO_PARTICIPANT_TYPES.items():
+        if pt in listed:
+            return wso_pt
+    return None
+
+
+def wso_options(options: set[str] | None) -> set[str]:
+    if not options:
+        return set()
+    return {
+        wso_option
+        for option in options
+        if (wso_option := WSO_OPTIONS.get(option.lower()))
+    }
 
 
 @dataclass(kw_only=True)
@@ -8,10 +95,7 @@ class SubmitterData:
     email: str = "webadmin@alanonbythebay.org"
 
     def wso_phone(self) -> (str, str):
-        digits = "".join(filter(str.isdigit, self.phone))
-        if not digits:
-            return "", ""
-        return digits[0:3], digits[3:]
+        return wso_phone(self.phone)
 
 
 @dataclass(kw_only=True)
@@ -81,6 +165,21 @@ class GroupData:
     gr_email: str = ""
     gr_comment: str = ""
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "GroupData":
+        data = dict(data)
+        for key in ("participant_types", "options"):
+            if data.get(key) is not None:
+                data[key] = set(data[key])
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        data = dict(vars(self))
+        for key in ("participant_types", "options"):
+            if data[key] is not None:
+                data[key] = sorted(data[key])
+        return data
+
     def meeting_type(self) -> str:
         if not self.physical_location:
             return "Online only"
@@ -90,15 +189,7 @@ class GroupData:
             return "both In-person and Online"
 
     def wso_language(self, is_restricted: bool = True) -> str:
-        if not self.language:
-            return "English"
-        if self.language.lower() == "spanish":
-            return "Spanish"
-        if self.language.lower() == "french":
-            return "French"
-        if is_restricted:
-            return "English"
-        return self.language
+        return wso_language(self.language, is_restricted)
 
     def wso_meeting_place(self) -> str:
         if not self.physical_location:
@@ -122,78 +213,19 @@ class GroupData:
         return self.address_zip
 
     def wso_country(self) -> str:
-        if not self.address_country:
-            return "United States"
-        if self.address_country == "Canada":
-            return "Canada"
-        if self.address_country == "Bermuda":
-            return "Bermuda"
-        return "United States"
+        return wso_country(self.address_country)
 
     def wso_participant_type(self) -> str | None:
-        if not self.participant_types:
-            return None
-        wso_types = {
-            "parent": "Parents of Alcoholics",
-            "aca": "Adult Children",
-            "youth": "Young Adults",
-            "poc": "People of Color",
-            "women": "Women",
-            "men": "Men",
-            "lgbtqia+": "LGBTQIA+",
-        }
-        for pt in self.participant_types:
-            if wso_pt := wso_types.get(pt.lower()):
-                return wso_pt
-        return None
+        return wso_participant_type(self.participant_types)
 
     def wso_attendees(self) -> str:
-        if self.members_only:
-            return "Families and Friends only"
-        return "Families, Friends, and Observers welcome"
+        return WSO_ATTENDEES[0] if self.members_only else WSO_ATTENDEES[1]
 
     def wso_schedule(self) -> (str, str, str, str):
-        wso_days = [
-            "Sunday",
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-        ]
-        wso_day = wso_days[self.day_of_week % 8]
-        wso_hour = self.start_hour % 12 if (self.start_hour % 12) != 0 else 12
-        wso_am_pm = "AM" if (self.start_hour % 24) < 12 else "PM"
-        wso_minute = self.start_minute % 60
-        if wso_minute < 15:
-            wso_minute = 0
-        elif wso_minute < 30:
-            wso_minute = 15
-        elif wso_minute < 45:
-            wso_minute = 30
-        else:
-            wso_minute = 45
-        return wso_day, str(wso_hour), str(wso_minute), wso_am_pm
+        return wso_schedule(self.day_of_week, self.start_hour, self.start_minute)
 
     def wso_options(self) -> set[str]:
-        if not self.options:
-            return set()
-        wso_options = {
-            "intro": "Introductory",
-            "institution": "Limited Access",
-            "fragrance-free": "Fragrance Free",
-            "ada": "Handicap Access",
-            "child-care": "Child Care",
-            "asl": "Sign Language",
-            "smoking": "Smoking Permitted",
-            "beginner": "Beginners",
-        }
-        result = set()
-        for option in self.options:
-            if wso_option := wso_options.get(option.lower()):
-                result.add(wso_option)
-        return result
+        return wso_options(self.options)
 
     def wso_location(self) -> str:
         result_lines: [str] = []
@@ -217,17 +249,10 @@ class GroupData:
         )
 
     def wso_cma_country(self) -> str:
-        if not self.address_country:
-            return "United States"
-        if self.address_country == "Canada":
-            return "Canada"
-        if self.address_country == "Bermuda":
-            return "Bermuda"
-        return "United States"
+        return wso_country(self.address_country)
 
     def wso_cma_phone(self) -> (str, str):
-        digits = "".join(filter(str.isdigit, self.cma_phone))
-        return digits[0:3], digits[3:]
+        return wso_phone(self.cma_phone)
 
     def has_gr(self) -> bool:
         return (
@@ -241,16 +266,7 @@ class GroupData:
         )
 
     def wso_gr_country(self) -> str:
-        if not self.address_country:
-            return "United States"
-        if self.address_country == "Canada":
-            return "Canada"
-        if self.address_country == "Bermuda":
-            return "Bermuda"
-        return "United States"
+        return wso_country(self.address_country)
 
     def wso_gr_phone(self) -> (str, str):
-        digits = "".join(filter(str.isdigit, self.gr_phone))
-        if not digits:
-            return "", ""
-        return digits[0:3], digits[3:]
+        return wso_phone(self.gr_phone)